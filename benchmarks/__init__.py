@@ -0,0 +1,4 @@
+"""
+Telegram Reviewer 效能基準包
+此包含以 python -m benchmarks.<名稱> 執行的效能量測腳本
+"""
@@ -0,0 +1,134 @@
+"""
+獲取迴圈日誌基準
+模擬 MessageFetcher.get_recent_messages 的熱點迴圈，比較每則訊息同步寫一行日誌與背景佇列加彙總進度日誌的吞吐量
+
+用法: python -m benchmarks.fetch_logging [--messages 數量] [--json]
+"""
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+from config.settings import LOG_FORMAT
+from config.constants import LOG_FORMAT_JSON, LOG_FORMAT_TEXT
+from src.utils.logger import DeferredFileHandler, ProgressLogger, configure_logging, shutdown_logging
+from src.ui.group_picker import display_width
+
+
+async def fake_messages(count: int, end_date: datetime):
+    """依時間倒序產生模擬的 Telethon 訊息"""
+    for i in range(count):
+        yield SimpleNamespace(id=count - i, date=end_date - timedelta(seconds=i), text=f"訊息 {i}")
+
+
+def build_logger(name: str, log_dir: Path) -> logging.Logger:
+    """建立與主程式相同配置（日誌檔加終端機）的日誌記錄器，終端機輸出導向檔案"""
+    log = logging.getLogger(name)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = DeferredFileHandler(log_dir / f"{name}.log")
+    console_handler = logging.StreamHandler(open(log_dir / f"{name}.console", 'w', encoding='utf-8'))
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    return log
+
+
+async def fetch_per_message(log, count: int) -> int:
+    """改版前：每則訊息同步寫一行日誌"""
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=365)
+    messages = []
+    async for message in fake_messages(count, end_date):
+        log.info(f"檢查訊息: {message.date}, 範圍: {start_date} 至 {end_date}, ID: {message.id}")
+        if message.date < start_date:
+            break
+        messages.append({'id': message.id, 'date': message.date, 'text': message.text})
+    log.info(f"成功獲取 {len(messages)} 條訊息")
+    return len(messages)
+
+
+async def fetch_aggregated(log, count: int) -> int:
+    """改版後：只輸出彙總的進度日誌"""
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=365)
+    messages = []
+    progress = ProgressLogger(log, "獲取訊息", 'fetch_progress', labels={'kept': '保留'}, group='benchmark')
+    async for message in fake_messages(count, end_date):
+        progress.update(kept=len(messages))
+        if message.date < start_date:
+            break
+        messages.append({'id': message.id, 'date': message.date, 'text': message.text})
+    progress.finish(kept=len(messages))
+    log.info(f"成功獲取 {len(messages)} 條訊息")
+    return len(messages)
+
+
+async def fetch_without_logging(log, count: int) -> int:
+    """不寫任何日誌，作為吞吐量上限的參考"""
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=365)
+    messages = []
+    async for message in fake_messages(count, end_date):
+        if message.date < start_date:
+            break
+        messages.append({'id': message.id, 'date': message.date, 'text': message.text})
+    return len(messages)
+
+
+def measure(name: str, fetch, count: int, log_dir: Path, log_format: str = None) -> float:
+    """執行一次模擬獲取並返回吞吐量（則/秒），包含寫出所有日誌的時間"""
+    log = build_logger(name, log_dir)
+    started = time.perf_counter()
+    if log_format is not None:
+        configure_logging(log_format, name=name)
+    asyncio.run(fetch(log, count))
+    if log_format is not None:
+        shutdown_logging(name=name)
+    for handler in log.handlers:
+        handler.flush()
+    elapsed = time.perf_counter() - started
+    for handler in list(log.handlers):
+        handler.close()
+        log.removeHandler(handler)
+    return count / elapsed
+
+
+def main(argv=None) -> int:
+    """執行獲取迴圈日誌基準
+
+    Args:
+        argv: 命令行參數
+
+    Returns:
+        int: 結束代碼
+    """
+    parser = argparse.ArgumentParser(description='比較獲取迴圈在不同日誌方式下的吞吐量')
+    parser.add_argument('--messages', type=int, default=100000, help='模擬的訊息數量 (預設: 100000)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        results = [
+            ('每則訊息同步寫日誌（改版前）', measure('per_message', fetch_per_message, args.messages, log_dir)),
+            ('背景佇列 + 彙總進度（文字）', measure('aggregated_text', fetch_aggregated, args.messages, log_dir, LOG_FORMAT_TEXT)),
+            ('背景佇列 + 彙總進度（JSON）', measure('aggregated_json', fetch_aggregated, args.messages, log_dir, LOG_FORMAT_JSON)),
+            ('不寫任何日誌（上限）', measure('no_logging', fetch_without_logging, args.messages, log_dir)),
+        ]
+
+    baseline = results[0][1]
+    print(f"模擬獲取 {args.messages:,} 則訊息：")
+    for label, rate in results:
+        padding = ' ' * (32 - display_width(label))
+        print(f"  {label}{padding}{rate:>12,.0f} 則/秒  ({rate / baseline:.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+匯入時間基準
+以 python -X importtime 量測匯入主程式的時間，超過預算或載入了重量級模組時以非零結束代碼結束
+
+用法: python -m benchmarks.import_time [--budget-ms 毫秒] [--runs 次數]
+"""
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# 匯入主程式（不含執行）的時間預算
+DEFAULT_BUDGET_MS = 150
+
+# 只有實際連線或分析時才需要的模組，匯入主程式時不應載入
+FORBIDDEN_MODULES = ['pandas', 'numpy', 'telethon', 'pyarrow']
+
+
+def measure_import(module: str = 'telegram_reviewer') -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    """在新的直譯器中匯入模組，並解析 -X importtime 的輸出
+
+    Args:
+        module: 要匯入的模組名稱
+
+    Returns:
+        Tuple[int, Dict[str, Tuple[int, int]]]: (模組的累計匯入時間（微秒）,
+            因匯入此模組而載入的各模組的 (累計匯入時間, 相對深度))
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"匯入 {module} 失敗:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # 格式: import time: self [us] | cumulative | imported package（以縮排表示巢狀匯入）
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, raw_name = line[len('import time:'):].split('|')
+        entries.append((raw_name.strip(), int(cumulative_us), (len(raw_name) - len(raw_name.lstrip())) // 2))
+
+    # 子模組在父模組之前輸出：從目標模組往前找，直到遇到同層或更外層的模組為止
+    index = max(i for i, (name, _, depth) in enumerate(entries) if name == module and depth == 0)
+    modules = {}
+    for name, cumulative_us, depth in reversed(entries[:index]):
+        if depth == 0:
+            break
+        modules.setdefault(name, (cumulative_us, depth))
+    return entries[index][1], modules
+
+
+def heavy_modules(modules: Dict[str, Tuple[int, int]]) -> List[str]:
+    """列出被載入的重量級模組"""
+    return [name for name in FORBIDDEN_MODULES if name in modules]
+
+
+def main(argv=None) -> int:
+    """執行匯入時間基準
+
+    Args:
+        argv: 命令行參數
+
+    Returns:
+        int: 結束代碼，0 表示在預算內且沒有載入重量級模組
+    """
+    parser = argparse.ArgumentParser(description='量測匯入主程式的時間')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'匯入時間預算（毫秒，預設: {DEFAULT_BUDGET_MS}）')
+    parser.add_argument('--runs', type=int, default=5, help='量測次數，取最小值 (預設: 5)')
+    parser.add_argument('--module', default='telegram_reviewer', help='要匯入的模組 (預設: telegram_reviewer)')
+    parser.add_argument('--top', type=int, default=10, help='列出最慢的頂層模組數量 (預設: 10)')
+    args = parser.parse_args(argv)
+
+    try:
+        runs = [measure_import(args.module) for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    total_us, best = min(runs, key=lambda run: run[0])
+    total_ms = total_us / 1000
+
+    print(f"匯入 {args.module}: {total_ms:.1f} ms（{len(runs)} 次中最快，預算 {args.budget_ms:.0f} ms）")
+    # 列出主程式直接匯入的模組中最慢的幾個
+    direct = [(us, name) for name, (us, depth) in best.items() if depth == 1]
+    for us, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    exit_code = 0
+    loaded = heavy_modules(best)
+    if loaded:
+        print(f"❌ 匯入時載入了重量級模組: {', '.join(loaded)}")
+        exit_code = 1
+    if total_ms > args.budget_ms:
+        print("❌ 匯入時間超過預算")
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
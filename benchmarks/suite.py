@@ -0,0 +1,496 @@
+"""
+端到端效能基準
+以模擬客戶端 (src/api/fake_client.py) 離線量測整個分析流程與各階段：獲取訊息的吞吐量、
+不同訊息量下的分析時間與記憶體峰值、各格式的保存時間與檔案大小、轉發 top-20 摘要的請求數與耗時，
+結果寫入 JSON 檔案並與基準線比較，超過退步門檻時以非零結束代碼結束
+
+用法:
+    python -m benchmarks.suite                                               # 執行並與 benchmarks/baseline.json 比較
+    python -m benchmarks.suite --update-baseline                             # 以本次結果作為新的基準線
+    python -m benchmarks.suite --stages fetch,analyze --threshold 10         # 只執行部分階段
+    python -m benchmarks.suite --sizes 10000,100000 --update-baseline        # 以較小的訊息量建立基準線
+"""
+import io
+import gc
+import sys
+import time
+import asyncio
+import logging
+import platform
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+from config.settings import LOG_FORMAT, BENCHMARKS_DIR
+from config.constants import LOG_FORMAT_TEXT, RESULTS_FORMATS, RESULTS_FORMAT_PARQUET, FORWARD_MODE_DIGEST
+from src.utils.logger import DeferredFileHandler, configure_logging, shutdown_logging
+from src.ui.group_picker import display_width
+from data.atomic_io import atomic_write_json, read_json
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# 預設的基準線檔案，可提交到版本庫作為團隊共用的比較基準
+DEFAULT_BASELINE = ROOT_DIR / 'benchmarks' / 'baseline.json'
+
+# 數值比基準線差超過此比例即視為退步
+DEFAULT_THRESHOLD = 0.2
+
+# 各階段
+STAGES = ['fetch', 'analyze', 'save', 'forward', 'pipeline']
+
+# 分析階段的訊息量
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# 分析用的訊息由此數量的合成訊息重複組成（經由真實的獲取流程產生，再改寫 ID）
+SEED_MESSAGES = 20000
+
+# 轉發的熱門訊息數
+FORWARD_TOP = 20
+
+# 不影響量測輸入的參數，與基準線不同時仍可比較（階段只決定有哪些量測值）
+COMPARABLE_PARAMETERS_IGNORED = ('stages', 'repeat')
+
+# 轉發時計為「發送」的請求類型
+SEND_METHODS = ['SendMessageRequest', 'ForwardMessagesRequest', 'SendMediaRequest', 'EditMessageRequest']
+
+
+class BenchmarkContext:
+    """基準共用的設定與暫存目錄"""
+
+    def __init__(self, args, work_dir: Path):
+        self.rtt = args.rtt_ms / 1000
+        self.repeat = max(1, args.repeat)
+        self.fetch_messages = args.fetch_messages
+        self.sizes = args.sizes
+        self.save_size = args.save_size
+        self.work_dir = work_dir
+        self._runs = 0
+        self._seed_messages = None
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, value: float, unit: str, better: str = 'lower'):
+        """記錄一個量測值
+
+        Args:
+            name: 名稱，例如 analyze.100000.seconds
+            value: 數值
+            unit: 單位
+            better: 'lower' 或 'higher'，比較基準線時哪個方向較好
+        """
+        self.metrics[name] = {'value': round(value, 6) if isinstance(value, float) else value,
+                              'unit': unit, 'better': better}
+
+    def new_run_dir(self) -> Path:
+        """每次執行使用新的目錄，避免快取與先前的結果互相影響"""
+        self._runs += 1
+        path = self.work_dir / f"run_{self._runs}"
+        path.mkdir()
+        return path
+
+    def create_services(self, messages: int):
+        """建立連接到模擬客戶端的服務（實體與對話列表快取放在暫存目錄）
+
+        Returns:
+            SimpleNamespace: history、client、client_manager、fetcher、analyzer、forwarder、run_dir
+        """
+        from src.api.fake_client import FakeTelegramClient, SyntheticHistory
+        from src.api.telegram_client import TelegramClientManager
+        from src.services.message_fetcher import MessageFetcher
+        from src.services.message_analyzer import MessageAnalyzer
+        from src.services.message_forwarder import MessageForwarder
+        from data.storage import EntityCache, DialogCache
+
+        run_dir = self.new_run_dir()
+        # 固定的種子與結束時間，每次執行產生相同的訊息
+        history = SyntheticHistory(title='基準群組', messages=messages, days=7, channel_id=1000000001, seed=1,
+                                   end_date=datetime(2025, 1, 1))
+        client = FakeTelegramClient([history], rtt=self.rtt)
+        client_manager = TelegramClientManager(
+            client=client, entity_cache=EntityCache(run_dir / 'entities.json'),
+            dialog_cache=DialogCache(run_dir / 'dialogs.json')
+        )
+        return SimpleNamespace(
+            history=history, client=client, client_manager=client_manager, run_dir=run_dir,
+            fetcher=MessageFetcher(client_manager, use_colors=False), analyzer=MessageAnalyzer(),
+            forwarder=MessageForwarder(client_manager, forward_mode=FORWARD_MODE_DIGEST)
+        )
+
+    def seed_messages(self) -> List[Dict[str, Any]]:
+        """經由獲取流程產生的合成訊息資料，作為各階段的輸入"""
+        if self._seed_messages is None:
+            services = self.create_services(SEED_MESSAGES)
+            self._seed_messages = asyncio.run(fetch_all(services))
+        return self._seed_messages
+
+    def messages(self, count: int) -> List[Dict[str, Any]]:
+        """取得指定數量的訊息資料；超過合成訊息數時重複使用並改寫 ID"""
+        seed = self.seed_messages()
+        return [dict(seed[index % len(seed)], id=index + 1) for index in range(count)]
+
+
+def fetch_args(top: int = FORWARD_TOP, save: bool = False, save_format: Optional[str] = None):
+    """涵蓋全部合成訊息的分析參數（合成訊息分布在 2025-01-01 之前的 7 天內）"""
+    return SimpleNamespace(
+        days=None, start_date=datetime(2024, 12, 24), end_date=datetime(2025, 1, 1), top=top,
+        rank_by='total_reactions', save=save, save_format=save_format
+    )
+
+
+async def fetch_all(services) -> List[Dict[str, Any]]:
+    """以 MessageFetcher 獲取合成群組的全部訊息"""
+    args = fetch_args()
+    return await services.fetcher.get_recent_messages(
+        services.history.entity, start_date=args.start_date, end_date=args.end_date
+    )
+
+
+def best_of(repeat: int, run, setup=None) -> Any:
+    """先不計時執行一次暖機（延遲載入的模組、首次配置），再執行多次並返回耗時最短的一次 (耗時, 結果)
+
+    Args:
+        repeat: 執行次數
+        run: 要計時的函數；有 setup 時以 setup 的結果為參數
+        setup: 每次執行前呼叫、不計入耗時的準備函數（可選）
+    """
+    run(setup()) if setup is not None else run()
+    best = None
+    for _ in range(repeat):
+        fixture = setup() if setup is not None else None
+        gc.collect()
+        started = time.perf_counter()
+        result = run(fixture) if setup is not None else run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result)
+    return best
+
+
+def path_size(path: Path) -> int:
+    """檔案或目錄（欄式格式）的總大小"""
+    path = Path(path)
+    if path.name == 'manifest.json':
+        path = path.parent
+    if path.is_dir():
+        return sum(item.stat().st_size for item in path.rglob('*') if item.is_file())
+    return path.stat().st_size
+
+
+def send_count(client) -> int:
+    """模擬客戶端收到的發送類請求數"""
+    return sum(client.request_counts[method] for method in SEND_METHODS)
+
+
+def bench_fetch(ctx: BenchmarkContext):
+    """get_recent_messages 對模擬客戶端的吞吐量"""
+    def run(services):
+        messages = asyncio.run(fetch_all(services))
+        return len(messages), sum(services.client.request_counts.values())
+
+    elapsed, (count, requests) = best_of(ctx.repeat, run, lambda: ctx.create_services(ctx.fetch_messages))
+    ctx.record('fetch.seconds', elapsed, 's')
+    ctx.record('fetch.messages_per_second', count / elapsed, 'msg/s', better='higher')
+    ctx.record('fetch.requests', requests, 'requests')
+
+
+def bench_analyze(ctx: BenchmarkContext):
+    """analyze_messages 在不同訊息量下的耗時與記憶體峰值
+
+    耗時與記憶體分開量測：tracemalloc 會使配置密集的程式慢好幾倍
+    """
+    from src.services.message_analyzer import MessageAnalyzer
+
+    analyzer = MessageAnalyzer()
+    for size in ctx.sizes:
+        messages = ctx.messages(size)
+        # 以預設參數綁定本輪的訊息，迴圈最後的 del 不會影響閉包
+        elapsed, _ = best_of(ctx.repeat,
+                             lambda messages=messages: analyzer.analyze_messages(messages, top_limit=FORWARD_TOP))
+        ctx.record(f"analyze.{size}.seconds", elapsed, 's')
+
+        gc.collect()
+        tracemalloc.start()
+        analyzer.analyze_messages(messages, top_limit=FORWARD_TOP)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        ctx.record(f"analyze.{size}.peak_mib", peak / 1048576, 'MiB')
+        del messages
+        gc.collect()
+
+
+def bench_save(ctx: BenchmarkContext):
+    """ResultsStorage 各格式的保存時間與檔案大小"""
+    from data.storage import ResultsStorage
+    from data.columnar import parquet_available
+    from src.services.message_analyzer import MessageAnalyzer
+
+    results = MessageAnalyzer().analyze_messages(ctx.messages(ctx.save_size), top_limit=FORWARD_TOP)
+    for output_format in RESULTS_FORMATS:
+        if output_format == RESULTS_FORMAT_PARQUET and not parquet_available():
+            continue
+
+        def run(storage):
+            return storage.save_analysis_results('基準群組', results, group_id=-1001000000001)
+
+        elapsed, path = best_of(ctx.repeat, run, lambda: ResultsStorage(ctx.new_run_dir(), output_format=output_format))
+        ctx.record(f"save.{output_format}.seconds", elapsed, 's')
+        ctx.record(f"save.{output_format}.bytes", path_size(path), 'bytes')
+
+
+def bench_forward(ctx: BenchmarkContext):
+    """以摘要模式轉發 top-20 熱門訊息的請求數與耗時（包括建立儲存群組）
+
+    逐則附加模式 (append) 在每則訊息之間刻意等待 1 秒以避免 FloodWait，耗時主要是等待，因此不列入
+    """
+    from src.services.analysis_pipeline import AnalysisPipeline
+    from src.services.message_analyzer import MessageAnalyzer
+
+    messages = ctx.seed_messages()
+    analysis = MessageAnalyzer().analyze_messages(messages, top_limit=FORWARD_TOP)
+    top_messages = AnalysisPipeline.build_top_messages(analysis, messages, FORWARD_TOP)
+
+    def run(services):
+        ok = asyncio.run(services.forwarder.forward_top_messages_to_storage_group(
+            services.history.entity, top_messages, 7, all_messages=messages, analysis_results=analysis
+        ))
+        if not ok:
+            raise RuntimeError("摘要轉發失敗")
+        return send_count(services.client), sum(services.client.request_counts.values())
+
+    elapsed, (sends, requests) = best_of(ctx.repeat, run, lambda: ctx.create_services(SEED_MESSAGES))
+    ctx.record('forward.digest.seconds', elapsed, 's')
+    ctx.record('forward.digest.sends', sends, 'requests')
+    ctx.record('forward.digest.requests', requests, 'requests')
+
+
+def bench_pipeline(ctx: BenchmarkContext):
+    """整個分析流程：獲取、分析、保存 (JSON) 與轉發摘要"""
+    from src.services.analysis_pipeline import AnalysisPipeline
+    from data.storage import ResultsStorage
+
+    def setup():
+        services = ctx.create_services(ctx.fetch_messages)
+        services.pipeline = AnalysisPipeline(
+            services.client_manager, services.fetcher, services.analyzer, services.forwarder,
+            ResultsStorage(services.run_dir / 'results')
+        )
+        return services
+
+    def run(services):
+        group = {'id': services.history.marked_id, 'name': services.history.title, 'entity': services.history.entity}
+        summary = asyncio.run(services.pipeline.run_group(group, fetch_args(save=True)))
+        if summary['status'] != 'ok':
+            raise RuntimeError(f"分析流程失敗: {summary}")
+        return sum(services.client.request_counts.values()), send_count(services.client)
+
+    elapsed, (requests, sends) = best_of(ctx.repeat, run, setup)
+    ctx.record('pipeline.seconds', elapsed, 's')
+    ctx.record('pipeline.requests', requests, 'requests')
+    ctx.record('pipeline.sends', sends, 'requests')
+
+
+BENCHMARKS = {
+    'fetch': bench_fetch,
+    'analyze': bench_analyze,
+    'save': bench_save,
+    'forward': bench_forward,
+    'pipeline': bench_pipeline,
+}
+
+
+@contextlib.contextmanager
+def quiet_application(log_dir: Path):
+    """執行期間將主程式的日誌只寫入暫存檔（仍經由背景佇列，與實際執行的成本相同），並隱藏進度輸出"""
+    app_logger = logging.getLogger('telegram_reviewer')
+    saved_handlers = app_logger.handlers[:]
+    file_handler = DeferredFileHandler(log_dir / 'benchmark.log')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    app_logger.handlers = [file_handler]
+    configure_logging(LOG_FORMAT_TEXT)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        shutdown_logging()
+        file_handler.close()
+        app_logger.handlers = saved_handlers
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[Dict[str, Any]]:
+    """與基準線比較
+
+    Args:
+        current: 本次的量測值
+        baseline: 基準線的量測值
+        threshold: 退步門檻（比例）
+
+    Returns:
+        List[Dict[str, Any]]: 每個共同量測值的比較結果，regressed 表示超過門檻
+    """
+    rows = []
+    for name, entry in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        value, base_value = entry['value'], base['value']
+        if base_value:
+            change = (value - base_value) / base_value
+        else:
+            change = 0.0 if value == base_value else float('inf')
+        worse = change if entry['better'] == 'lower' else -change
+        rows.append({'name': name, 'baseline': base_value, 'value': value, 'unit': entry['unit'],
+                     'change': change, 'regressed': worse > threshold})
+    return rows
+
+
+def parameter_mismatches(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """找出與基準線不同、會使量測值無法比較的參數
+
+    Args:
+        current: 本次的參數
+        baseline: 基準線的參數
+
+    Returns:
+        List[str]: 不同的參數說明，例如 "fetch_messages: 基準 50000，本次 5000"
+    """
+    return [
+        f"{key}: 基準 {baseline.get(key)}，本次 {value}"
+        for key, value in current.items()
+        if key not in COMPARABLE_PARAMETERS_IGNORED and baseline.get(key) != value
+    ]
+
+
+def format_value(value: float, unit: str) -> str:
+    """格式化量測值"""
+    if unit == 's':
+        return f"{value * 1000:,.1f} ms"
+    if unit == 'bytes':
+        return f"{value / 1024:,.1f} KiB"
+    if isinstance(value, float):
+        return f"{value:,.1f} {unit}"
+    return f"{value:,} {unit}"
+
+
+def print_report(metrics: Dict[str, Dict[str, Any]], rows: Optional[List[Dict[str, Any]]]):
+    """輸出量測結果，有基準線時一併列出變化"""
+    changes = {row['name']: row for row in rows or []}
+    width = max(display_width(name) for name in metrics) + 2
+    for name, entry in metrics.items():
+        line = f"  {name}{' ' * (width - display_width(name))}{format_value(entry['value'], entry['unit']):>18}"
+        row = changes.get(name)
+        if row is not None:
+            status = '退步' if row['regressed'] else ''
+            line += f"  基準 {format_value(row['baseline'], row['unit']):>18}  {row['change'] * 100:+7.1f}%  {status}"
+        print(line)
+
+
+def parse_sizes(value: str) -> List[int]:
+    """解析以逗號分隔的訊息量"""
+    try:
+        return [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"無效的訊息量: {value}")
+
+
+def parse_stages(value: str) -> List[str]:
+    """解析以逗號分隔的階段"""
+    stages = [item.strip() for item in value.split(',') if item.strip()]
+    invalid = [stage for stage in stages if stage not in STAGES]
+    if invalid:
+        raise argparse.ArgumentTypeError(f"無效的階段: {', '.join(invalid)}，可用階段: {', '.join(STAGES)}")
+    return stages
+
+
+def main(argv=None) -> int:
+    """執行端到端效能基準
+
+    Args:
+        argv: 命令行參數
+
+    Returns:
+        int: 結束代碼，0 為正常，1 為有量測值超過退步門檻，2 為參數與基準線不同而無法比較
+    """
+    parser = argparse.ArgumentParser(description='以模擬客戶端離線量測分析流程各階段的效能，並與基準線比較')
+    parser.add_argument('--stages', type=parse_stages, default=list(STAGES),
+                        help=f'要執行的階段，以逗號分隔 (預設: {",".join(STAGES)})')
+    parser.add_argument('--sizes', type=parse_sizes, default=list(DEFAULT_SIZES),
+                        help=f'分析階段的訊息量 (預設: {",".join(str(size) for size in DEFAULT_SIZES)})')
+    parser.add_argument('--fetch-messages', type=int, default=50000,
+                        help='獲取與完整流程的合成訊息數 (預設: 50000)')
+    parser.add_argument('--save-size', type=int, default=100000, help='保存階段的訊息量 (預設: 100000)')
+    parser.add_argument('--rtt-ms', type=float, default=0.0,
+                        help='模擬的請求往返延遲（毫秒）；預設 0 只量測本機處理成本，結果較穩定')
+    parser.add_argument('--repeat', type=int, default=3, help='每項量測的次數，取最快的一次 (預設: 3)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='結果檔案路徑 (預設: results/benchmarks/benchmark_<時間>.json)')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help=f'基準線檔案 (預設: {DEFAULT_BASELINE.relative_to(ROOT_DIR)})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD * 100,
+                        help=f'比基準線差超過此百分比即視為退步 (預設: {DEFAULT_THRESHOLD * 100:.0f})')
+    parser.add_argument('--update-baseline', action='store_true', help='以本次結果覆寫基準線')
+    args = parser.parse_args(argv)
+
+    started_at = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = BenchmarkContext(args, Path(tmp))
+        for stage in args.stages:
+            print(f"執行 {stage}...", file=sys.stderr)
+            with quiet_application(Path(tmp)):
+                BENCHMARKS[stage](ctx)
+
+    result = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'duration_seconds': round((datetime.now() - started_at).total_seconds(), 3),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'machine': platform.machine()},
+        'parameters': {'stages': args.stages, 'sizes': args.sizes, 'fetch_messages': args.fetch_messages,
+                       'save_size': args.save_size, 'rtt_ms': args.rtt_ms, 'repeat': args.repeat},
+        'metrics': ctx.metrics,
+    }
+    output = args.output or BENCHMARKS_DIR / f"benchmark_{started_at.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = None
+    mismatches = []
+    baseline = read_json(args.baseline) if args.baseline.exists() else None
+    if baseline is not None:
+        # 輸入的訊息量或延遲不同時，耗時、檔案大小與請求數都不能直接比較
+        mismatches = parameter_mismatches(result['parameters'], baseline.get('parameters', {}))
+    if baseline is not None and not mismatches:
+        rows = compare(ctx.metrics, baseline.get('metrics', {}), args.threshold / 100)
+        result['baseline'] = {'path': str(args.baseline), 'started_at': baseline.get('started_at'),
+                              'threshold_percent': args.threshold, 'comparison': rows}
+    atomic_write_json(output, result)
+
+    print(f"效能基準結果（{result['duration_seconds']:.1f} 秒）：")
+    print_report(ctx.metrics, rows)
+    print(f"結果已寫入 {output}")
+
+    if args.update_baseline:
+        atomic_write_json(args.baseline, {key: result[key] for key in ('started_at', 'environment', 'parameters', 'metrics')})
+        print(f"已更新基準線 {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"沒有基準線 ({args.baseline})，可加上 --update-baseline 建立")
+        return 0
+    if mismatches:
+        print(f"錯誤: 參數與基準線 ({args.baseline}) 不同，無法比較: {'; '.join(mismatches)}", file=sys.stderr)
+        print("請使用與基準線相同的參數執行，或加上 --update-baseline 重新建立基準線", file=sys.stderr)
+        return 2
+
+    regressions = [row for row in rows if row['regressed']]
+    if regressions:
+        print(f"{len(regressions)} 項量測比基準線差超過 {args.threshold:.0f}%: "
+              f"{', '.join(row['name'] for row in regressions)}")
+        return 1
+    print(f"沒有量測比基準線差超過 {args.threshold:.0f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,6 +10,16 @@ DEFAULT_MESSAGE_LIMIT = 1000
 DEFAULT_TOP_COUNT = 5
 DEFAULT_USE_HISTORY = None  # None 表示會詢問用戶，True 表示默認使用歷史記錄，False 表示默認不使用
 
+# 群組實體快取的有效時間（小時），過期的實體會在下次使用時批次重新獲取
+ENTITY_CACHE_TTL_HOURS = 24
+
+# 對話列表快取超過此時間（小時）後改為完整重新整理，以移除已離開的群組
+DIALOG_CACHE_MAX_AGE_HOURS = 24
+
+# 發送者資訊快取（常駐模式下跨多次分析保留）：超過有效時間重新獲取以反映改名，超過數量時移除最久未使用的項目
+SENDER_CACHE_TTL_HOURS = 24
+SENDER_CACHE_MAX_ENTRIES = 50000
+
 # 訊息類型定義
 MESSAGE_TYPE_TEXT = 'text'
 MESSAGE_TYPE_PHOTO = 'photo'
@@ -24,4 +34,89 @@ MESSAGE_TYPE_UNKNOWN = 'unknown'
 ANALYSIS_TYPE_REACTIONS = 'reactions'
 ANALYSIS_TYPE_REPLIES = 'replies'
 ANALYSIS_TYPE_FORWARDS = 'forwards'
-ANALYSIS_TYPE_VIEWS = 'views'
\ No newline at end of file
+ANALYSIS_TYPE_VIEWS = 'views'
+
+# 轉發模式
+FORWARD_MODE_DIGEST = 'digest'  # 將整份摘要打包為最少數量的訊息，媒體另行轉發
+FORWARD_MODE_APPEND = 'append'  # 每次分析都在儲存群組附加新的摘要，每則熱門訊息分開發送
+FORWARD_MODE_EDIT = 'edit'      # 就地編輯置頂摘要與固定的排名欄位
+FORWARD_MODES = [FORWARD_MODE_DIGEST, FORWARD_MODE_APPEND, FORWARD_MODE_EDIT]
+DEFAULT_FORWARD_MODE = FORWARD_MODE_DIGEST
+
+# 分析結果的保存格式
+RESULTS_FORMAT_JSON = 'json'        # 單一 JSON 檔案，適合小型報告
+RESULTS_FORMAT_NDJSON = 'ndjson'    # 每個表格一個 gzip 壓縮的 NDJSON 檔案
+RESULTS_FORMAT_PARQUET = 'parquet'  # 每個表格一個 Parquet 檔案（需安裝 pyarrow）
+RESULTS_FORMATS = [RESULTS_FORMAT_JSON, RESULTS_FORMAT_NDJSON, RESULTS_FORMAT_PARQUET]
+DEFAULT_RESULTS_FORMAT = RESULTS_FORMAT_JSON
+# 請求排程：FloodWait 不超過此秒數時自動等待並重試，超過則交由呼叫端處理（例如換帳號）
+FLOOD_RETRY_MAX_SECONDS = 300
+FLOOD_MAX_RETRIES = 3
+# 遇到 FloodWait 後同類請求之間的最小間隔（秒），會逐次加倍直到上限，成功後逐漸縮短
+REQUEST_PACING_MIN_INTERVAL = 0.5
+REQUEST_PACING_MAX_INTERVAL = 10
+
+# 即時收錄：首次追蹤群組時回補的天數，以及定期補抓遺漏訊息的間隔（分鐘）
+LIVE_BACKFILL_DAYS = 7
+LIVE_CATCH_UP_INTERVAL_MINUTES = 10
+
+# 日誌檔格式：text 為文字，json 為每行一個 JSON 物件（終端機輸出維持文字）
+LOG_FORMAT_TEXT = 'text'
+LOG_FORMAT_JSON = 'json'
+LOG_FORMATS = [LOG_FORMAT_TEXT, LOG_FORMAT_JSON]
+DEFAULT_LOG_FILE_FORMAT = LOG_FORMAT_TEXT
+
+# 進度日誌：熱點迴圈每處理此數量的項目、或至少每隔此秒數輸出一行彙總
+LOG_PROGRESS_EVERY = 5000
+LOG_PROGRESS_INTERVAL_SECONDS = 5
+
+# 效能分析 (--profile)：cpu 為 cProfile，memory 為 tracemalloc，loop 為事件迴圈慢回呼偵測
+PROFILE_CPU = 'cpu'
+PROFILE_MEMORY = 'memory'
+PROFILE_LOOP = 'loop'
+PROFILE_MODES = [PROFILE_CPU, PROFILE_MEMORY, PROFILE_LOOP]
+# 回呼佔用事件迴圈超過此秒數即回報
+PROFILE_SLOW_CALLBACK_SECONDS = 0.1
+# 報告中列出的函數與記憶體配置位置數量，以及 tracemalloc 保存的堆疊深度
+PROFILE_TOP_COUNT = 25
+PROFILE_TRACEMALLOC_FRAMES = 1
+
+# 模擬 Telegram 客戶端 (src/api/fake_client.py)：預設的往返延遲（秒）、每頁訊息與對話數、
+# 檔案分段大小與合成媒體大小（位元組）；每頁數量與分段大小與 Telegram 伺服器的上限相同
+FAKE_RTT_SECONDS = 0.05
+FAKE_PAGE_SIZE = 100
+FAKE_FILE_PART_BYTES = 512 * 1024
+FAKE_MEDIA_BYTES = 256 * 1024
+
+# 追蹤 (--trace)：最多保留的事件數，避免常駐模式長時間執行時無限增長
+TRACE_MAX_EVENTS = 500000
+
+# 執行鎖：持有者更新心跳的間隔，以及心跳超過多久未更新視為停滯（秒）
+RUN_LOCK_HEARTBEAT_SECONDS = 30
+RUN_LOCK_STALE_SECONDS = 300
+# 另一個執行正在進行時的處理方式：queue 將群組交給執行中的工作，skip 直接結束
+OVERLAP_QUEUE = 'queue'
+OVERLAP_SKIP = 'skip'
+OVERLAP_MODES = [OVERLAP_QUEUE, OVERLAP_SKIP]
+DEFAULT_OVERLAP_MODE = OVERLAP_QUEUE
+# 常駐服務檢查待處理群組的間隔（秒）
+PENDING_DRAIN_INTERVAL_SECONDS = 60
+
+# 內建排程器：未指定時的群組執行間隔（小時）、錯開執行時間的隨機抖動比例，以及檢查設定檔變更的間隔（秒）
+SCHEDULE_DEFAULT_INTERVAL_HOURS = 24
+SCHEDULE_JITTER_RATIO = 0.1
+SCHEDULE_RELOAD_SECONDS = 30
+
+# 工作佇列：租約長度（秒，工作者需在期限內送出心跳）、最多嘗試次數、失敗重試的退避時間（秒），以及沒有工作時的輪詢間隔（秒）
+JOB_LEASE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 60
+JOB_RETRY_MAX_SECONDS = 3600
+JOB_POLL_SECONDS = 10
+
+# 熱門訊息的排序指標
+RANK_METRICS = ['total_reactions', 'reply_count', 'views', 'forwards']
+DEFAULT_RANK_METRIC = 'total_reactions'
+
+# 批次模式：同時分析的群組數
+BATCH_DEFAULT_CONCURRENCY = 3
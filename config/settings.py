@@ -14,6 +14,24 @@ ROOT_DIR = Path(__file__).parent.parent.absolute()
 # 群組記錄文件路徑 - 保存在程式根目錄
 GROUP_HISTORY_FILE = ROOT_DIR / "telegram_reviewer_history.json"
 
+# 群組實體快取路徑 - 與群組記錄放在一起，保存 access hash 等實體資訊
+ENTITY_CACHE_FILE = ROOT_DIR / "telegram_reviewer_entities.json"
+
+# 對話列表快取路徑 - 保存篩選後的群組/頻道列表，讓選單可以立即顯示
+DIALOG_CACHE_FILE = ROOT_DIR / "telegram_reviewer_dialogs.json"
+
+# 轉發記錄簿路徑 - 記錄已複製到儲存群組的訊息，避免重複發送
+FORWARD_LEDGER_FILE = ROOT_DIR / "telegram_reviewer_forward_ledger.json"
+
+# 就地編輯摘要模式的欄位記錄路徑 - 記錄每個來源群組在儲存群組中的置頂摘要與排名欄位
+DIGEST_SLOTS_FILE = ROOT_DIR / "telegram_reviewer_digest_slots.json"
+
+# 工作佇列資料庫路徑 - 多個工作者程序（可位於不同主機的共用目錄）租用並執行的群組分析工作
+JOB_QUEUE_FILE = ROOT_DIR / "telegram_reviewer_jobs.db"
+
+# 即時收錄模式的本機訊息資料庫路徑 - 常駐服務收到的新訊息、編輯、刪除與反應更新
+LIVE_STORE_FILE = ROOT_DIR / "telegram_reviewer_live.db"
+
 # 日誌相關設定
 LOG_DIR = ROOT_DIR / "logs"
 LOG_LEVEL = logging.INFO
@@ -23,10 +41,38 @@ LOG_FILE = LOG_DIR / f"telegram_reviewer_{datetime.now().strftime('%Y-%m-%d')}.l
 # 結果輸出目錄
 RESULTS_DIR = ROOT_DIR / "results"
 
-# 建立必要的目錄
-for directory in [LOG_DIR, RESULTS_DIR]:
-    if not directory.exists():
-        directory.mkdir(exist_ok=True)
+# 分析結果索引路徑 - 記錄每次保存的結果摘要，供歷史與趨勢查詢
+RESULTS_CATALOG_FILE = RESULTS_DIR / "catalog.db"
+
+# 最近一次執行的 Prometheus 指標文字檔（可供 node_exporter 的 textfile collector 讀取）
+METRICS_PROM_FILE = RESULTS_DIR / "metrics.prom"
+
+# 效能分析報告目錄 (--profile)
+PROFILES_DIR = RESULTS_DIR / "profiles"
+
+# 追蹤檔案目錄 (--trace)，可在 chrome://tracing 或 Perfetto 開啟
+TRACES_DIR = RESULTS_DIR / "traces"
+
+# 效能基準結果目錄 (python -m benchmarks.suite)
+BENCHMARKS_DIR = RESULTS_DIR / "benchmarks"
+
+# 趨勢時間序列目錄 - 每個群組的分析摘要與每日訊息數
+TIMESERIES_DIR = RESULTS_DIR / "timeseries"
+
+
+def ensure_directories():
+    """建立必要的目錄
+
+    由程式入口在需要寫入檔案時呼叫，匯入設定模組本身不會有任何檔案系統副作用
+    """
+    for directory in [LOG_DIR, RESULTS_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Telegram 設定
-SESSION_NAME = 'telegram_reviewer_session'
\ No newline at end of file
+SESSION_NAME = 'telegram_reviewer_session'
+
+# 常駐服務的本機控制 socket 路徑
+DAEMON_SOCKET_PATH = ROOT_DIR / "telegram_reviewer.sock"
+
+# 內建排程器的設定檔路徑 - 每個群組的執行間隔、分析天數、熱門訊息數與是否轉發
+SCHEDULE_FILE = ROOT_DIR / "telegram_reviewer_schedule.json"
\ No newline at end of file
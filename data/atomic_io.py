@@ -0,0 +1,208 @@
+"""
+安全寫入模組
+提供原子寫入（寫入暫存檔後改名）、跨程序的檔案鎖，以及在背景執行緒依序寫入狀態檔案的單一寫入佇列
+"""
+
+import os
+import json
+import atexit
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只保留同一程序內的保護
+    fcntl = None
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+
+def _lock_path(path: Path) -> Path:
+    """取得檔案對應的鎖檔路徑
+
+    鎖放在獨立的 .lock 檔上，因為原子改名會替換資料檔本身，鎖在資料檔上會失效
+    """
+    return path.with_name(path.name + '.lock')
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False):
+    """取得檔案的建議鎖 (advisory lock)
+
+    Args:
+        path: 要保護的檔案路徑
+        shared: True 為共享鎖（讀取），False 為獨佔鎖（寫入）
+    """
+    path = Path(path)
+    if fcntl is None:
+        yield
+        return
+
+    with open(_lock_path(path), 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _write_replace(path: Path, text: str):
+    """將內容寫入同目錄的暫存檔並改名覆蓋目標檔案（呼叫端需持有鎖）"""
+    fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def atomic_write_text(path: Path, text: str):
+    """原子寫入文字檔：讀取者只會看到完整的舊內容或新內容
+
+    Args:
+        path: 目標檔案路徑
+        text: 檔案內容
+    """
+    path = Path(path)
+    with file_lock(path):
+        _write_replace(path, text)
+
+
+def atomic_write_json(path: Path, data: Any, **dump_kwargs):
+    """原子寫入 JSON 檔案
+
+    Args:
+        path: 目標檔案路徑
+        data: 要寫入的資料
+        **dump_kwargs: 傳給 json.dumps 的參數，預設 ensure_ascii=False、indent=2
+    """
+    dump_kwargs.setdefault('ensure_ascii', False)
+    dump_kwargs.setdefault('indent', 2)
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
+
+
+def read_json(path: Path) -> Any:
+    """讀取 JSON 檔案
+
+    原子寫入保證檔案內容完整，讀取時不需要取得鎖
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        Any: 檔案內容
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class StateWriter:
+    """單一寫入佇列
+
+    所有狀態檔案的寫入交給一個背景執行緒依序完成，呼叫端不必等待磁碟；
+    同一檔案尚未寫入的多次保存會合併為一次。合併模式 (merge) 在寫入時持有檔案鎖，
+    重新讀取磁碟上的內容並只更新本次變更的鍵，讓多個程序可以安全地共用同一個檔案
+    """
+
+    def __init__(self):
+        """初始化單一寫入佇列"""
+        self._pending: Dict[Path, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+
+    def submit(self, path: Path, data: Any, merge: bool = False):
+        """排入一次保存
+
+        Args:
+            path: 目標檔案路徑
+            data: 要寫入的資料（merge 為 True 時為要更新的鍵值）
+            merge: 是否與磁碟上的內容合併，而非整個覆蓋
+        """
+        path = Path(path)
+        # 立即序列化成快照，之後呼叫端修改資料不會影響本次寫入
+        snapshot = json.loads(json.dumps(data, ensure_ascii=False))
+
+        with self._condition:
+            pending = self._pending.get(path)
+            if merge and pending is not None:
+                # 與尚未寫入的內容合併（無論先前是整份覆蓋或合併）
+                pending['data'].update(snapshot)
+            else:
+                self._pending[path] = {'data': snapshot, 'merge': merge}
+            self._ensure_thread()
+            self._condition.notify_all()
+
+    def _ensure_thread(self):
+        """啟動背景寫入執行緒（呼叫端需持有 _condition）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='state-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """背景執行緒：依序寫入排隊中的檔案"""
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                path, job = next(iter(self._pending.items()))
+                del self._pending[path]
+                self._busy = True
+
+            try:
+                self._write(path, job['data'], job['merge'])
+            except Exception as e:
+                logger.error(f"寫入 {path} 失敗: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    @staticmethod
+    def _write(path: Path, data: Any, merge: bool):
+        """寫入單一檔案
+
+        Args:
+            path: 目標檔案路徑
+            data: 資料
+            merge: 是否與磁碟上的內容合併
+        """
+        with file_lock(path):
+            if merge and path.exists():
+                try:
+                    current = read_json(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"無法讀取 {path}，將以本次內容覆蓋: {e}")
+                    current = {}
+                current.update(data)
+                data = current
+            _write_replace(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待所有排隊中的寫入完成
+
+        Args:
+            timeout: 最長等待秒數，None 表示不限制
+
+        Returns:
+            bool: 是否全部寫入完成
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+
+# 整個程序共用的單一寫入佇列
+state_writer = StateWriter()
+
+# 程式結束前確保排隊中的狀態都已寫入
+atexit.register(state_writer.flush, 30)
@@ -0,0 +1,262 @@
+"""
+分析結果索引模組
+以 SQLite 記錄每次保存的分析結果摘要，查詢歷史與趨勢時不必開啟結果檔案
+"""
+
+import json
+import sqlite3
+import logging
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+
+# 從配置中導入
+from config.settings import RESULTS_CATALOG_FILE
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+# 索引中每則熱門訊息保留的內容長度
+TOP_TEXT_EXCERPT_LENGTH = 100
+
+# 可用於趨勢查詢的指標欄位
+CATALOG_METRICS = ['total_messages', 'unique_users', 'top_reactions']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id INTEGER,
+    group_name TEXT NOT NULL,
+    window_start TEXT,
+    window_end TEXT,
+    run_at TEXT NOT NULL,
+    total_messages INTEGER,
+    unique_users INTEGER,
+    top_reactions INTEGER,
+    top_messages TEXT,
+    format TEXT,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_runs_group_time ON runs (group_id, run_at);
+CREATE INDEX IF NOT EXISTS idx_runs_name_time ON runs (group_name, run_at);
+"""
+
+
+def _as_date_string(value: Any) -> Optional[str]:
+    """將日期值轉換為 YYYY-MM-DD 字串"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+class ResultsCatalog:
+    """分析結果索引，記錄群組、分析期間、執行時間、摘要數據與結果檔案位置"""
+
+    def __init__(self, db_file: Path = RESULTS_CATALOG_FILE):
+        """初始化分析結果索引
+
+        Args:
+            db_file: SQLite 資料庫路徑
+        """
+        self.db_file = db_file
+        self._conn = sqlite3.connect(str(db_file))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def summarize_top_messages(most_reactions: Any) -> List[Dict[str, Any]]:
+        """整理熱門訊息摘要
+
+        Args:
+            most_reactions: 熱門訊息表格（DataFrame 或記錄列表）
+
+        Returns:
+            List[Dict[str, Any]]: 每則熱門訊息的 id、反應數、使用者與內容摘要
+        """
+        if most_reactions is None:
+            return []
+        records = most_reactions.to_dict('records') if hasattr(most_reactions, 'to_dict') else list(most_reactions)
+        return [
+            {
+                'id': int(record.get('id')),
+                'total_reactions': int(record.get('total_reactions') or 0),
+                'display_name': record.get('display_name', ''),
+                'text': (record.get('text') or '')[:TOP_TEXT_EXCERPT_LENGTH]
+            }
+            for record in records
+            if record.get('id') is not None
+        ]
+
+    def record_run(self, path: Path, group_name: str, results: Any, group_id: Optional[int] = None,
+                   output_format: Optional[str] = None, run_at: Optional[datetime] = None) -> int:
+        """記錄一次保存的分析結果
+
+        Args:
+            path: 結果檔案路徑
+            group_name: 群組名稱
+            results: 分析結果（字典或 ColumnarResults）
+            group_id: 群組 ID（可選）
+            output_format: 保存格式
+            run_at: 執行時間，預設為現在
+
+        Returns:
+            int: 記錄 ID
+        """
+        top_messages = self.summarize_top_messages(results.get('most_reactions'))
+        period = results.get('period') or {}
+        unique_users = results.get('unique_users')
+
+        with self._conn:
+            cursor = self._conn.execute(
+                """INSERT OR REPLACE INTO runs
+                   (group_id, group_name, window_start, window_end, run_at, total_messages, unique_users,
+                    top_reactions, top_messages, format, path)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    group_id, group_name,
+                    _as_date_string(period.get('start')), _as_date_string(period.get('end')),
+                    (run_at or datetime.now()).isoformat(timespec='seconds'),
+                    results.get('total_messages'),
+                    int(unique_users) if unique_users is not None else None,
+                    max((msg['total_reactions'] for msg in top_messages), default=0),
+                    json.dumps(top_messages, ensure_ascii=False),
+                    output_format, str(path)
+                )
+            )
+        return cursor.lastrowid
+
+    def _group_condition(self, group: Optional[Any]) -> tuple:
+        """依群組 ID 或名稱產生查詢條件
+
+        Args:
+            group: 群組 ID、名稱，None 表示所有群組
+
+        Returns:
+            tuple: (SQL 條件, 參數列表)
+        """
+        if group is None:
+            return '1 = 1', []
+        try:
+            return 'group_id = ?', [int(group)]
+        except (TypeError, ValueError):
+            return 'group_name = ?', [group]
+
+    def history(self, group: Optional[Any] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """查詢分析記錄
+
+        Args:
+            group: 群組 ID 或名稱（可選）
+            since: 執行時間下限（可選）
+            until: 執行時間上限（可選）
+            limit: 最多返回筆數（可選）
+
+        Returns:
+            List[Dict[str, Any]]: 依執行時間倒序的分析記錄，top_messages 已解析為列表
+        """
+        condition, params = self._group_condition(group)
+        if since is not None:
+            condition += ' AND run_at >= ?'
+            params.append(since.isoformat(timespec='seconds'))
+        if until is not None:
+            condition += ' AND run_at <= ?'
+            params.append(until.isoformat(timespec='seconds'))
+        sql = f'SELECT * FROM runs WHERE {condition} ORDER BY run_at DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        runs = []
+        for row in self._conn.execute(sql, params):
+            run = dict(row)
+            run['top_messages'] = json.loads(run['top_messages']) if run['top_messages'] else []
+            runs.append(run)
+        return runs
+
+    def trend(self, group: Any, metric: str = 'total_messages', since: Optional[datetime] = None,
+              until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """查詢群組指標隨時間的變化
+
+        Args:
+            group: 群組 ID 或名稱
+            metric: 指標名稱，必須是 CATALOG_METRICS 之一
+            since: 執行時間下限（可選）
+            until: 執行時間上限（可選）
+
+        Returns:
+            List[Dict[str, Any]]: 依執行時間排序的 run_at、window_start、window_end 與指標值
+        """
+        if metric not in CATALOG_METRICS:
+            raise ValueError(f"未知的指標: {metric}，可用指標: {', '.join(CATALOG_METRICS)}")
+
+        condition, params = self._group_condition(group)
+        if since is not None:
+            condition += ' AND run_at >= ?'
+            params.append(since.isoformat(timespec='seconds'))
+        if until is not None:
+            condition += ' AND run_at <= ?'
+            params.append(until.isoformat(timespec='seconds'))
+        rows = self._conn.execute(
+            f'SELECT run_at, window_start, window_end, {metric} AS value FROM runs WHERE {condition} ORDER BY run_at',
+            params
+        )
+        return [dict(row) for row in rows]
+
+    def groups(self) -> List[Dict[str, Any]]:
+        """列出索引中的群組
+
+        Returns:
+            List[Dict[str, Any]]: 每個群組的 ID、名稱、記錄數與最後執行時間
+        """
+        rows = self._conn.execute(
+            """SELECT group_id, group_name, COUNT(*) AS runs, MAX(run_at) AS last_run_at
+               FROM runs GROUP BY group_id, group_name ORDER BY last_run_at DESC"""
+        )
+        return [dict(row) for row in rows]
+
+    def rebuild(self, results_dir: Path) -> int:
+        """掃描結果目錄，將尚未索引的結果檔案加入索引
+
+        Args:
+            results_dir: 結果存儲目錄
+
+        Returns:
+            int: 新加入的記錄數
+        """
+        from data.columnar import MANIFEST_FILE, ColumnarResults
+
+        indexed = {row['path'] for row in self._conn.execute('SELECT path FROM runs')}
+        added = 0
+        for path in sorted(results_dir.glob('analysis_*')):
+            if path.is_dir():
+                path = path / MANIFEST_FILE
+                if not path.exists():
+                    continue
+            elif path.suffix != '.json':
+                continue
+            if str(path) in indexed:
+                continue
+
+            try:
+                if path.name == MANIFEST_FILE:
+                    results = ColumnarResults(path.parent)
+                    output_format = results.format
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        results, output_format = json.load(f), 'json'
+                # 檔名格式為 analysis_<群組名稱>_<YYYYmmdd>_<HHMMSS>
+                stem = path.parent.name if path.name == MANIFEST_FILE else path.stem
+                name_part, date_part, time_part = stem[len('analysis_'):].rsplit('_', 2)
+                run_at = datetime.strptime(f"{date_part}{time_part}", '%Y%m%d%H%M%S')
+                self.record_run(path, name_part, results, output_format=output_format, run_at=run_at)
+                added += 1
+            except Exception as e:
+                logger.warning(f"無法索引結果檔案 {path}: {e}")
+        return added
+
+    def close(self):
+        """關閉資料庫連線"""
+        self._conn.close()
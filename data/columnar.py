@@ -0,0 +1,153 @@
+"""
+欄式結果存儲模組
+將分析結果中的每個表格直接由 DataFrame 寫成獨立檔案（壓縮 NDJSON 或 Parquet），並提供延遲讀取的載入器
+"""
+
+import json
+import logging
+import importlib.util
+from collections.abc import Mapping
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator
+
+from data.atomic_io import atomic_write_json, read_json
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+# 每個結果目錄中記錄表格清單與純量結果的檔案
+MANIFEST_FILE = 'manifest.json'
+
+# 各格式的表格副檔名
+TABLE_EXTENSIONS = {
+    'ndjson': '.ndjson.gz',
+    'parquet': '.parquet',
+}
+
+
+def parquet_available() -> bool:
+    """檢查是否安裝了寫入 Parquet 所需的 pyarrow（可選依賴）"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def json_default(value: Any) -> Any:
+    """json.dump 無法直接處理的型別（日期、numpy 數值等）的轉換函數
+
+    Args:
+        value: 待轉換的值
+
+    Returns:
+        Any: 可序列化的值
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy 純量
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_columnar(output_dir: Path, results: Dict[str, Any], table_format: str) -> Path:
+    """將分析結果寫成欄式格式
+
+    DataFrame 以 pandas 內建的寫入器直接輸出，不經過逐列的 Python 轉換；
+    其餘純量結果（總訊息數、期間等）寫入 manifest.json
+
+    Args:
+        output_dir: 結果目錄（會自動建立）
+        results: 分析結果數據
+        table_format: 表格格式，'ndjson' 或 'parquet'
+
+    Returns:
+        Path: manifest.json 的路徑
+    """
+    import pandas as pd
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    extension = TABLE_EXTENSIONS[table_format]
+
+    tables = {}
+    scalars = {}
+    for key, value in results.items():
+        if not isinstance(value, pd.DataFrame):
+            scalars[key] = value
+            continue
+
+        table_path = output_dir / f"{key}{extension}"
+        if table_format == 'parquet':
+            # 巢狀的物件欄位（發送者、反應列表）鍵值不固定，先轉為 JSON 字串
+            frame = value.copy()
+            for column in frame.columns[frame.dtypes == object]:
+                if frame[column].map(lambda item: isinstance(item, (dict, list))).any():
+                    frame[column] = frame[column].map(lambda item: json.dumps(item, ensure_ascii=False, default=json_default))
+            frame.to_parquet(table_path, index=False)
+        else:
+            value.to_json(table_path, orient='records', lines=True, date_format='iso',
+                          force_ascii=False, compression='gzip')
+        tables[key] = {'file': table_path.name, 'rows': len(value)}
+
+    manifest = {'format': table_format, 'tables': tables, 'scalars': scalars}
+    # manifest 最後以原子寫入產生，讀取者看到 manifest 時所有表格都已寫完
+    manifest_path = output_dir / MANIFEST_FILE
+    atomic_write_json(manifest_path, manifest, default=json_default)
+    return manifest_path
+
+
+class ColumnarResults(Mapping):
+    """欄式分析結果的延遲載入器
+
+    純量結果在建立時從 manifest 讀取，表格在第一次存取時才讀入（Parquet 使用 memory map）
+    """
+
+    def __init__(self, output_dir: Path):
+        """初始化載入器
+
+        Args:
+            output_dir: 結果目錄（或其中的 manifest.json）
+        """
+        output_dir = Path(output_dir)
+        if output_dir.name == MANIFEST_FILE:
+            output_dir = output_dir.parent
+        self.output_dir = output_dir
+
+        manifest = read_json(output_dir / MANIFEST_FILE)
+        self.format = manifest['format']
+        self.tables = manifest['tables']
+        self.scalars = manifest['scalars']
+        self._loaded = {}
+
+    def _load_table(self, key: str):
+        """讀取單一表格
+
+        Args:
+            key: 表格名稱
+
+        Returns:
+            pd.DataFrame: 表格內容
+        """
+        import pandas as pd
+
+        table_path = self.output_dir / self.tables[key]['file']
+        if self.format == 'parquet':
+            return pd.read_parquet(table_path, memory_map=True)
+        if self.tables[key]['rows'] == 0:
+            return pd.DataFrame()
+        return pd.read_json(table_path, orient='records', lines=True, compression='gzip')
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.scalars:
+            return self.scalars[key]
+        if key not in self.tables:
+            raise KeyError(key)
+        if key not in self._loaded:
+            self._loaded[key] = self._load_table(key)
+        return self._loaded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.scalars
+        yield from self.tables
+
+    def __len__(self) -> int:
+        return len(self.scalars) + len(self.tables)
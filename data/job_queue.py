@@ -0,0 +1,303 @@
+"""
+工作佇列模組
+以 SQLite 保存群組分析工作，多個工作者程序以租約方式領取工作、送出心跳，失敗時依退避時間重試
+"""
+
+import json
+import time
+import sqlite3
+import logging
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+
+# 從配置中導入
+from config.settings import JOB_QUEUE_FILE
+from config.constants import (
+    JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS
+)
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+# 工作狀態
+JOB_QUEUED = 'queued'
+JOB_LEASED = 'leased'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_STATUSES = [JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_FAILED]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id INTEGER NOT NULL,
+    group_name TEXT NOT NULL,
+    argv TEXT NOT NULL,
+    forward INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_id, status);
+"""
+
+
+def retry_delay(attempts: int, base=JOB_RETRY_BASE_SECONDS, maximum=JOB_RETRY_MAX_SECONDS) -> float:
+    """計算第 attempts 次失敗後的重試等待時間（指數退避）
+
+    Args:
+        attempts: 已嘗試次數
+        base: 第一次失敗後的等待秒數
+        maximum: 等待秒數上限
+
+    Returns:
+        float: 等待秒數
+    """
+    return min(maximum, base * 2 ** max(0, attempts - 1))
+
+
+class JobQueue:
+    """群組分析工作佇列
+
+    領取工作時以 BEGIN IMMEDIATE 取得寫入鎖，同一工作只會租給一個工作者；
+    租約到期仍未送出心跳的工作（工作者異常結束）會被其他工作者重新領取。
+    資料庫使用預設的 rollback journal 而非 WAL，放在多台主機共用的目錄時鎖仍然有效
+    """
+
+    def __init__(self, db_file: Path = JOB_QUEUE_FILE):
+        """初始化工作佇列
+
+        Args:
+            db_file: SQLite 資料庫路徑
+        """
+        self.db_file = Path(db_file)
+        # 自行控制交易，領取工作時才能使用 BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.db_file), timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """將資料列轉換為工作字典"""
+        job = dict(row)
+        job['argv'] = json.loads(job['argv'])
+        job['forward'] = bool(job['forward'])
+        job['group'] = {'id': job['group_id'], 'name': job['group_name']}
+        if job['result']:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def enqueue(self, group: Dict[str, Any], argv: List[str], forward: bool = True,
+                max_attempts: int = JOB_MAX_ATTEMPTS) -> Optional[int]:
+        """加入一個群組分析工作
+
+        同一群組已有等待中的工作時不重複加入
+
+        Args:
+            group: 群組信息（需包含 id 與 name）
+            argv: 分析參數（與命令行相同）
+            forward: 是否轉發熱門訊息
+            max_attempts: 最多嘗試次數
+
+        Returns:
+            Optional[int]: 工作 ID，已有等待中的工作時返回 None
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE group_id = ? AND status = ?", (group['id'], JOB_QUEUED)
+            ).fetchone()
+            if existing is not None:
+                self._conn.execute("COMMIT")
+                return None
+            cursor = self._conn.execute(
+                """
+                INSERT INTO jobs (group_id, group_name, argv, forward, status, max_attempts,
+                                  available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (group['id'], group['name'], json.dumps(argv, ensure_ascii=False), int(forward),
+                 JOB_QUEUED, max_attempts, now, now, now)
+            )
+            self._conn.execute("COMMIT")
+            return cursor.lastrowid
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def lease(self, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """領取一個可執行的工作
+
+        Args:
+            owner: 工作者識別（例如 主機名稱:pid）
+            lease_seconds: 租約長度（秒）
+
+        租約過期的工作視為一次失敗的嘗試：已達嘗試次數上限時標記為失敗而不再領取，
+        避免每次都讓工作者當掉或卡住的工作被無限重新領取
+
+        Returns:
+            Optional[Dict[str, Any]]: 工作內容，沒有可執行的工作時返回 None
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)
+                    ORDER BY available_at, job_id LIMIT 1
+                    """,
+                    (JOB_QUEUED, now, JOB_LEASED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                if row['status'] != JOB_LEASED:
+                    break
+
+                if row['attempts'] < row['max_attempts']:
+                    logger.warning(f"工作 {row['job_id']} 的租約已過期（原工作者 {row['lease_owner']}），重新領取")
+                    break
+                logger.warning(f"工作 {row['job_id']} 的租約已過期（原工作者 {row['lease_owner']}），"
+                               f"已達嘗試次數上限 {row['max_attempts']}，標記為失敗")
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL,
+                                    updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (JOB_FAILED, f"租約過期（工作者 {row['lease_owner']} 未回報結果）", now, row['job_id'])
+                )
+
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (JOB_LEASED, owner, now + lease_seconds, now, row['job_id'])
+            )
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row['job_id'],)).fetchone()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._row_to_job(row)
+
+    def heartbeat(self, job_id: int, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """延長工作的租約
+
+        Args:
+            job_id: 工作 ID
+            owner: 工作者識別
+            lease_seconds: 從現在起的租約長度（秒）
+
+        Returns:
+            bool: 是否仍持有租約（租約過期且已被其他工作者領取時為 False）
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, JOB_LEASED, owner)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """標記工作完成
+
+        Args:
+            job_id: 工作 ID
+            owner: 工作者識別
+            result: 工作結果摘要
+
+        Returns:
+            bool: 是否更新成功（租約已被其他工作者取得時為 False）
+        """
+        cursor = self._conn.execute(
+            """
+            UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE job_id = ? AND status = ? AND lease_owner = ?
+            """,
+            (JOB_DONE, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+             time.time(), job_id, JOB_LEASED, owner)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str, retry_after: Optional[float] = None) -> Optional[str]:
+        """標記工作失敗，未超過嘗試次數時依退避時間重新排入佇列
+
+        Args:
+            job_id: 工作 ID
+            owner: 工作者識別
+            error: 錯誤訊息
+            retry_after: 最少等待秒數（例如 FloodWait 的限制時間）
+
+        Returns:
+            Optional[str]: 更新後的狀態（queued 或 failed），租約已被其他工作者取得時返回 None
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (job_id, JOB_LEASED, owner)
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+
+            status = JOB_FAILED if row['attempts'] >= row['max_attempts'] else JOB_QUEUED
+            delay = max(retry_delay(row['attempts']), retry_after or 0)
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL,
+                                lease_expires = NULL, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (status, now + delay, error, now, job_id)
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def counts(self) -> Dict[str, int]:
+        """統計各狀態的工作數
+
+        Returns:
+            Dict[str, int]: 狀態對應的工作數
+        """
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status"):
+            counts[row['status']] = row['total']
+        return counts
+
+    def jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """列出工作
+
+        Args:
+            status: 只列出此狀態的工作（可選）
+            limit: 最多筆數
+
+        Returns:
+            List[Dict[str, Any]]: 依更新時間由新到舊排序的工作
+        """
+        if status is None:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY updated_at DESC LIMIT ?", (limit,))
+        else:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (status, limit)
+            )
+        return [self._row_to_job(row) for row in rows]
+
+    def close(self):
+        """關閉資料庫連線"""
+        self._conn.close()
@@ -0,0 +1,301 @@
+"""
+即時收錄資料庫模組
+以 SQLite 保存常駐服務即時收到的訊息與每日統計，讓報告不必重新獲取整段期間的訊息
+"""
+
+import json
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable
+from pathlib import Path
+
+# 從配置中導入
+from config.settings import LIVE_STORE_FILE
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    text TEXT,
+    sender TEXT,
+    reactions TEXT,
+    total_reactions INTEGER NOT NULL DEFAULT 0,
+    reply_count INTEGER NOT NULL DEFAULT 0,
+    views INTEGER,
+    forwards INTEGER,
+    has_media INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_date ON messages (chat_id, date);
+
+CREATE TABLE IF NOT EXISTS chat_state (
+    chat_id INTEGER PRIMARY KEY,
+    covered_since INTEGER,
+    last_message_id INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    chat_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, day)
+);
+"""
+
+
+def _to_timestamp(value: datetime) -> int:
+    """將日期轉換為 UTC 時間戳（未帶時區的日期視為 UTC）"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _day_of(timestamp: int) -> str:
+    """取得時間戳所在的日期（UTC）"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+
+class LiveMessageStore:
+    """即時收錄資料庫，保存訊息內容並維護每個群組的每日訊息數與反應數"""
+
+    def __init__(self, db_file: Path = LIVE_STORE_FILE):
+        """初始化即時收錄資料庫
+
+        Args:
+            db_file: SQLite 資料庫路徑
+        """
+        self.db_file = db_file
+        self._conn = sqlite3.connect(str(db_file))
+        self._conn.row_factory = sqlite3.Row
+        # WAL 模式讓寫入不阻擋讀取報告
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def upsert_message(self, chat_id: int, message: Dict[str, Any]):
+        """新增或更新一則訊息，並同步調整每日統計
+
+        Args:
+            chat_id: 群組 ID
+            message: 訊息資料（與 MessageFetcher 產生的格式相同）
+        """
+        timestamp = _to_timestamp(message['date'])
+        total_reactions = int(message.get('total_reactions') or 0)
+
+        with self._conn:
+            previous = self._conn.execute(
+                'SELECT date, total_reactions, deleted FROM messages WHERE chat_id = ? AND id = ?',
+                (chat_id, message['id'])
+            ).fetchone()
+
+            self._conn.execute(
+                """INSERT OR REPLACE INTO messages
+                   (chat_id, id, date, text, sender, reactions, total_reactions, reply_count,
+                    views, forwards, has_media, deleted)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (
+                    chat_id, message['id'], timestamp, message.get('text'),
+                    json.dumps(message.get('sender'), ensure_ascii=False),
+                    json.dumps(message.get('reactions') or [], ensure_ascii=False),
+                    total_reactions, int(message.get('reply_count') or 0),
+                    message.get('views'), message.get('forwards'), int(bool(message.get('has_media')))
+                )
+            )
+
+            if previous is None or previous['deleted']:
+                self._add_daily(chat_id, timestamp, 1, total_reactions)
+            else:
+                self._add_daily(chat_id, previous['date'], 0, total_reactions - previous['total_reactions'])
+
+            self._conn.execute(
+                """INSERT INTO chat_state (chat_id, last_message_id, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT(chat_id) DO UPDATE SET
+                       last_message_id = MAX(last_message_id, excluded.last_message_id),
+                       updated_at = excluded.updated_at""",
+                (chat_id, message['id'], _to_timestamp(datetime.now(timezone.utc)))
+            )
+
+    def update_reactions(self, chat_id: int, message_id: int, reactions: List[Dict[str, Any]], total_reactions: int):
+        """更新訊息的反應，並同步調整每日統計
+
+        Args:
+            chat_id: 群組 ID
+            message_id: 訊息 ID
+            reactions: 反應列表
+            total_reactions: 反應總數
+
+        Returns:
+            bool: 訊息是否已收錄（未收錄的訊息不會新增）
+        """
+        with self._conn:
+            previous = self._conn.execute(
+                'SELECT date, total_reactions FROM messages WHERE chat_id = ? AND id = ? AND deleted = 0',
+                (chat_id, message_id)
+            ).fetchone()
+            if previous is None:
+                return False
+
+            self._conn.execute(
+                'UPDATE messages SET reactions = ?, total_reactions = ? WHERE chat_id = ? AND id = ?',
+                (json.dumps(reactions, ensure_ascii=False), total_reactions, chat_id, message_id)
+            )
+            self._add_daily(chat_id, previous['date'], 0, total_reactions - previous['total_reactions'])
+        return True
+
+    def mark_deleted(self, chat_id: Optional[int], message_ids: Iterable[int]):
+        """將訊息標記為已刪除，並從每日統計中扣除
+
+        Args:
+            chat_id: 群組 ID；一般群組的刪除事件不含群組 ID，此時為 None
+            message_ids: 訊息 ID 列表
+        """
+        message_ids = list(message_ids)
+        if not message_ids:
+            return
+
+        placeholders = ','.join('?' * len(message_ids))
+        if chat_id is not None:
+            condition, params = f'chat_id = ? AND id IN ({placeholders})', [chat_id] + message_ids
+        else:
+            # 一般群組的訊息 ID 在帳號內唯一，排除超級群組和頻道 (-100 開頭) 即可
+            condition, params = f'chat_id > -1000000000000 AND id IN ({placeholders})', message_ids
+
+        with self._conn:
+            rows = self._conn.execute(
+                f'SELECT chat_id, date, total_reactions FROM messages WHERE deleted = 0 AND {condition}', params
+            ).fetchall()
+            for row in rows:
+                self._add_daily(row['chat_id'], row['date'], -1, -row['total_reactions'])
+            self._conn.execute(f'UPDATE messages SET deleted = 1 WHERE {condition}', params)
+
+    def _add_daily(self, chat_id: int, timestamp: int, messages: int, reactions: int):
+        """調整每日統計
+
+        Args:
+            chat_id: 群組 ID
+            timestamp: 訊息時間戳
+            messages: 訊息數變化
+            reactions: 反應數變化
+        """
+        if not messages and not reactions:
+            return
+        self._conn.execute(
+            """INSERT INTO daily_stats (chat_id, day, messages, reactions) VALUES (?, ?, ?, ?)
+               ON CONFLICT(chat_id, day) DO UPDATE SET
+                   messages = messages + excluded.messages,
+                   reactions = reactions + excluded.reactions""",
+            (chat_id, _day_of(timestamp), messages, reactions)
+        )
+
+    def get_state(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        """取得群組的收錄狀態
+
+        Args:
+            chat_id: 群組 ID
+
+        Returns:
+            Optional[Dict[str, Any]]: covered_since（完整收錄的起始時間）與 last_message_id，未收錄過則返回 None
+        """
+        row = self._conn.execute('SELECT * FROM chat_state WHERE chat_id = ?', (chat_id,)).fetchone()
+        if row is None:
+            return None
+        state = dict(row)
+        if state['covered_since'] is not None:
+            state['covered_since'] = datetime.fromtimestamp(state['covered_since'], timezone.utc)
+        return state
+
+    def set_covered_since(self, chat_id: int, covered_since: datetime):
+        """記錄群組從哪個時間點開始已完整收錄
+
+        Args:
+            chat_id: 群組 ID
+            covered_since: 完整收錄的起始時間
+        """
+        with self._conn:
+            self._conn.execute(
+                """INSERT INTO chat_state (chat_id, covered_since) VALUES (?, ?)
+                   ON CONFLICT(chat_id) DO UPDATE SET covered_since = excluded.covered_since""",
+                (chat_id, _to_timestamp(covered_since))
+            )
+
+    def covers(self, chat_id: int, start_date: datetime) -> bool:
+        """檢查指定的起始時間之後的訊息是否都已收錄
+
+        Args:
+            chat_id: 群組 ID
+            start_date: 分析的起始時間
+
+        Returns:
+            bool: 是否可以直接使用資料庫中的訊息
+        """
+        state = self.get_state(chat_id)
+        if not state or state['covered_since'] is None:
+            return False
+        if start_date.tzinfo is None:
+            start_date = start_date.replace(tzinfo=timezone.utc)
+        return state['covered_since'] <= start_date
+
+    def get_messages(self, chat_id: int, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """取得期間內的訊息（格式與 MessageFetcher 相同，按時間倒序）
+
+        Args:
+            chat_id: 群組 ID
+            start_date: 開始時間
+            end_date: 結束時間
+
+        Returns:
+            List[Dict[str, Any]]: 訊息列表
+        """
+        rows = self._conn.execute(
+            """SELECT * FROM messages
+               WHERE chat_id = ? AND date BETWEEN ? AND ? AND deleted = 0 AND text IS NOT NULL AND text != ''
+               ORDER BY date DESC, id DESC""",
+            (chat_id, _to_timestamp(start_date), _to_timestamp(end_date))
+        ).fetchall()
+        return [
+            {
+                'id': row['id'],
+                'date': datetime.fromtimestamp(row['date'], timezone.utc),
+                'text': row['text'],
+                'sender': json.loads(row['sender']) if row['sender'] else None,
+                'reactions': json.loads(row['reactions']) if row['reactions'] else [],
+                'total_reactions': row['total_reactions'],
+                'reply_count': row['reply_count'],
+                'views': row['views'],
+                'forwards': row['forwards'],
+                'has_media': bool(row['has_media'])
+            }
+            for row in rows
+        ]
+
+    def get_daily_stats(self, chat_id: int, start_day: Optional[str] = None,
+                        end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """取得群組的每日訊息數與反應數
+
+        Args:
+            chat_id: 群組 ID
+            start_day: 起始日期 (YYYY-MM-DD，可選)
+            end_day: 結束日期 (YYYY-MM-DD，可選)
+
+        Returns:
+            List[Dict[str, Any]]: 依日期排序的 day、messages、reactions
+        """
+        rows = self._conn.execute(
+            """SELECT day, messages, reactions FROM daily_stats
+               WHERE chat_id = ? AND day >= ? AND day <= ? ORDER BY day""",
+            (chat_id, start_day or '0000-00-00', end_day or '9999-99-99')
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """關閉資料庫連線"""
+        self._conn.close()
@@ -3,13 +3,23 @@
 處理本地數據的讀取和存儲功能
 """
 
-import json
 import logging
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from collections.abc import Mapping
+from typing import List, Dict, Any, Optional, Iterable
 from pathlib import Path
 
 # 從配置中導入
-from config.settings import GROUP_HISTORY_FILE
+from config.settings import (
+    GROUP_HISTORY_FILE, ENTITY_CACHE_FILE, DIALOG_CACHE_FILE, FORWARD_LEDGER_FILE, DIGEST_SLOTS_FILE,
+    RESULTS_CATALOG_FILE
+)
+from config.constants import (
+    RESULTS_FORMAT_JSON, RESULTS_FORMAT_NDJSON, RESULTS_FORMAT_PARQUET, DEFAULT_RESULTS_FORMAT
+)
+from data.columnar import MANIFEST_FILE, ColumnarResults, write_columnar, parquet_available, json_default
+from data.catalog import ResultsCatalog
+from data.atomic_io import atomic_write_json, read_json, state_writer
 
 # 設定日誌
 logger = logging.getLogger(__name__)
@@ -29,8 +39,7 @@ class GroupHistoryManager:
         """
         if GROUP_HISTORY_FILE.exists():
             try:
-                with open(GROUP_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return read_json(GROUP_HISTORY_FILE)
             except Exception as e:
                 logger.error(f"載入群組歷史記錄失敗: {e}")
         return []
@@ -55,58 +64,487 @@ class GroupHistoryManager:
                     'type': group['type']
                 })
                 
-            with open(GROUP_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(simplified_groups, f, ensure_ascii=False, indent=2)
+            atomic_write_json(GROUP_HISTORY_FILE, simplified_groups)
             return True
         except Exception as e:
             logger.error(f"保存群組歷史記錄失敗: {e}")
             return False
 
 
+class EntityCache:
+    """群組實體快取
+    保存群組/頻道的 access hash、類型、名稱與成員數，讓之後的執行不必重新解析實體
+    """
+    
+    def __init__(self, cache_file: Path = ENTITY_CACHE_FILE):
+        """初始化群組實體快取
+        
+        Args:
+            cache_file: 快取檔案路徑
+        """
+        self.cache_file = cache_file
+        self._records = self._load()
+        self._changed = set()  # 尚未保存的群組 ID
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """從檔案載入快取
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 以群組 ID 為鍵的實體記錄
+        """
+        if self.cache_file.exists():
+            try:
+                return read_json(self.cache_file)
+            except Exception as e:
+                logger.error(f"載入群組實體快取失敗: {e}")
+        return {}
+    
+    def get(self, entity_id: int) -> Optional[Dict[str, Any]]:
+        """取得實體記錄
+        
+        Args:
+            entity_id: 群組 ID（與對話列表相同的帶標記 ID）
+            
+        Returns:
+            Optional[Dict[str, Any]]: 實體記錄，不存在則返回 None
+        """
+        return self._records.get(str(entity_id))
+    
+    @staticmethod
+    def is_fresh(record: Dict[str, Any], ttl_hours: float) -> bool:
+        """檢查記錄是否仍在有效時間內
+        
+        Args:
+            record: 實體記錄
+            ttl_hours: 有效時間（小時）
+            
+        Returns:
+            bool: 是否仍有效
+        """
+        try:
+            refreshed_at = datetime.fromisoformat(record['refreshed_at'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.now() - refreshed_at < timedelta(hours=ttl_hours)
+    
+    def update(self, entity_id: int, record: Dict[str, Any]):
+        """新增或更新實體記錄
+        
+        Args:
+            entity_id: 群組 ID
+            record: 實體記錄（id、peer_id、access_hash、type、title、participants_count 等）
+        """
+        record = dict(record)
+        record['refreshed_at'] = datetime.now().isoformat()
+        self._records[str(entity_id)] = record
+        self._changed.add(str(entity_id))
+    
+    def save(self) -> bool:
+        """將快取寫回檔案
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        if not self._changed:
+            return True
+        try:
+            # 只合併本次變更的記錄，不覆蓋其他程序同時寫入的記錄
+            state_writer.submit(self.cache_file, {key: self._records[key] for key in self._changed}, merge=True)
+            self._changed.clear()
+            return True
+        except Exception as e:
+            logger.error(f"保存群組實體快取失敗: {e}")
+            return False
+
+
+class DialogCache:
+    """對話列表快取
+    保存篩選後的群組/頻道列表與最新的置頂訊息時間，供增量更新使用
+    """
+    
+    def __init__(self, cache_file: Path = DIALOG_CACHE_FILE):
+        """初始化對話列表快取
+        
+        Args:
+            cache_file: 快取檔案路徑
+        """
+        self.cache_file = cache_file
+        data = self._load()
+        self.dialogs: List[Dict[str, Any]] = data.get('dialogs', [])
+        self.updated_at: Optional[str] = data.get('updated_at')
+        self.full_refresh_at: Optional[str] = data.get('full_refresh_at')
+    
+    def _load(self) -> Dict[str, Any]:
+        """從檔案載入快取
+        
+        Returns:
+            Dict[str, Any]: 快取內容
+        """
+        if self.cache_file.exists():
+            try:
+                return read_json(self.cache_file)
+            except Exception as e:
+                logger.error(f"載入對話列表快取失敗: {e}")
+        return {}
+    
+    @property
+    def offset_date(self) -> Optional[str]:
+        """快取中最新的訊息時間，比這更新的對話才需要重新獲取"""
+        dates = [d['top_message_date'] for d in self.dialogs if d.get('top_message_date')]
+        return max(dates) if dates else None
+    
+    def needs_full_refresh(self, max_age_hours: float) -> bool:
+        """檢查是否需要完整重新整理
+        
+        Args:
+            max_age_hours: 上次完整重新整理後的最長有效時間（小時）
+            
+        Returns:
+            bool: 是否需要完整重新整理
+        """
+        if not self.dialogs or not self.full_refresh_at:
+            return True
+        try:
+            full_refresh_at = datetime.fromisoformat(self.full_refresh_at)
+        except ValueError:
+            return True
+        return datetime.now() - full_refresh_at >= timedelta(hours=max_age_hours)
+    
+    def replace(self, dialogs: List[Dict[str, Any]]):
+        """以完整重新整理的結果取代快取
+        
+        Args:
+            dialogs: 群組/頻道列表
+        """
+        self.dialogs = list(dialogs)
+        self.updated_at = self.full_refresh_at = datetime.now().isoformat()
+    
+    def merge(self, updated: List[Dict[str, Any]]):
+        """合併增量更新的對話，依最新訊息時間重新排序
+        
+        Args:
+            updated: 有新訊息的群組/頻道列表
+        """
+        by_id = {d['id']: d for d in self.dialogs}
+        for dialog in updated:
+            by_id[dialog['id']] = dialog
+        self.dialogs = sorted(by_id.values(), key=lambda d: d.get('top_message_date') or '', reverse=True)
+        self.updated_at = datetime.now().isoformat()
+    
+    def save(self) -> bool:
+        """將快取寫回檔案
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        try:
+            state_writer.submit(self.cache_file, {
+                'updated_at': self.updated_at,
+                'full_refresh_at': self.full_refresh_at,
+                'dialogs': self.dialogs
+            })
+            return True
+        except Exception as e:
+            logger.error(f"保存對話列表快取失敗: {e}")
+            return False
+
+
+class ForwardLedger:
+    """轉發記錄簿
+    記錄 (來源群組, 訊息 ID, 儲存群組) 與儲存群組中對應訊息 ID 的關係，
+    讓重疊的分析區間不必重複複製相同的熱門訊息；同一則訊息發布到不同的儲存群組（例如批次模式的 forward_to）各自記錄
+    """
+    
+    def __init__(self, ledger_file: Path = FORWARD_LEDGER_FILE):
+        """初始化轉發記錄簿
+        
+        Args:
+            ledger_file: 記錄簿檔案路徑
+        """
+        self.ledger_file = ledger_file
+        self._entries = self._load()
+        self._changed = set()  # 尚未保存的記錄鍵值
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """從檔案載入記錄簿
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 以 "來源群組:訊息ID:儲存群組" 為鍵的記錄（舊版本的記錄為 "來源群組:訊息ID"）
+        """
+        if self.ledger_file.exists():
+            try:
+                return read_json(self.ledger_file)
+            except Exception as e:
+                logger.error(f"載入轉發記錄簿失敗: {e}")
+        return {}
+    
+    @staticmethod
+    def _make_key(source_id: int, message_id: int, storage_id: int) -> str:
+        """建立記錄鍵值"""
+        return f"{int(source_id)}:{int(message_id)}:{int(storage_id)}"
+    
+    @staticmethod
+    def _same_storage(recorded_id: int, storage_id: int) -> bool:
+        """舊版本記錄的儲存群組 ID 是否為同一個群組（創建當次可能記錄為不帶 -100 標記的頻道 ID）"""
+        marked = str(int(storage_id))
+        return int(recorded_id) == int(storage_id) or (marked.startswith('-100') and str(int(recorded_id)) == marked[4:])
+    
+    def get(self, source_id: int, message_id: int, storage_id: int) -> Optional[Dict[str, Any]]:
+        """查詢訊息發布到指定儲存群組的記錄
+        
+        Args:
+            source_id: 來源群組 ID
+            message_id: 來源訊息 ID
+            storage_id: 儲存群組 ID（帶標記的 ID）
+            
+        Returns:
+            Optional[Dict[str, Any]]: 轉發記錄，若從未發布到此儲存群組則返回 None
+        """
+        if source_id is None or message_id is None or storage_id is None:
+            return None
+        key = self._make_key(source_id, message_id, storage_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        
+        # 舊版本的記錄不含儲存群組，只在發布到同一個儲存群組時沿用，並改存為新的鍵值
+        legacy = self._entries.get(f"{int(source_id)}:{int(message_id)}")
+        if legacy is None or not self._same_storage(legacy.get('storage_id', 0), storage_id):
+            return None
+        entry = self._entries[key] = dict(legacy, storage_id=int(storage_id))
+        self._changed.add(key)
+        return entry
+    
+    def is_forwarded(self, source_id: int, message_id: int, storage_id: int) -> bool:
+        """檢查訊息是否已發布到指定的儲存群組"""
+        return self.get(source_id, message_id, storage_id) is not None
+    
+    def filter_unforwarded(self, source_id: int, message_ids: Iterable[int], storage_id: int) -> List[int]:
+        """過濾出尚未轉發到指定儲存群組的訊息 ID，可在獲取原始訊息前先行判斷
+        
+        Args:
+            source_id: 來源群組 ID
+            message_ids: 訊息 ID 列表
+            storage_id: 儲存群組 ID
+            
+        Returns:
+            List[int]: 尚未轉發過的訊息 ID
+        """
+        return [mid for mid in message_ids if not self.is_forwarded(source_id, mid, storage_id)]
+    
+    def record(self, source_id: int, message_id: int, storage_id: int,
+               storage_message_ids: List[int], stats: Optional[Dict[str, Any]] = None):
+        """記錄一則新發布的訊息
+        
+        Args:
+            source_id: 來源群組 ID
+            message_id: 來源訊息 ID
+            storage_id: 儲存群組 ID
+            storage_message_ids: 儲存群組中對應的訊息 ID 列表
+            stats: 發布當下的統計數據 (反應總數、回覆數、排名)
+        """
+        now = datetime.now().isoformat()
+        key = self._make_key(source_id, message_id, storage_id)
+        self._entries[key] = {
+            'source_id': int(source_id),
+            'message_id': int(message_id),
+            'storage_id': int(storage_id),
+            'storage_message_ids': [int(mid) for mid in storage_message_ids],
+            'first_forwarded': now,
+            'last_seen': now,
+            'times_seen': 1,
+            'stats': stats or {}
+        }
+        self._changed.add(key)
+    
+    def touch(self, source_id: int, message_id: int, storage_id: int, stats: Optional[Dict[str, Any]] = None):
+        """更新既有記錄的最後出現時間與統計數據
+        
+        Args:
+            source_id: 來源群組 ID
+            message_id: 來源訊息 ID
+            storage_id: 儲存群組 ID
+            stats: 本次的統計數據
+        """
+        entry = self.get(source_id, message_id, storage_id)
+        if entry is None:
+            return
+        entry['last_seen'] = datetime.now().isoformat()
+        entry['times_seen'] = entry.get('times_seen', 1) + 1
+        if stats:
+            entry['stats'] = stats
+        self._changed.add(self._make_key(source_id, message_id, storage_id))
+    
+    def save(self) -> bool:
+        """將記錄簿寫回檔案
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        if not self._changed:
+            return True
+        try:
+            state_writer.submit(self.ledger_file, {key: self._entries[key] for key in self._changed}, merge=True)
+            self._changed.clear()
+            return True
+        except Exception as e:
+            logger.error(f"保存轉發記錄簿失敗: {e}")
+            return False
+
+
+class DigestSlotStore:
+    """就地編輯摘要的欄位記錄
+    記錄每個來源群組在儲存群組中的置頂摘要訊息與各排名欄位的訊息 ID 及目前內容
+    """
+    
+    def __init__(self, slots_file: Path = DIGEST_SLOTS_FILE):
+        """初始化欄位記錄
+        
+        Args:
+            slots_file: 欄位記錄檔案路徑
+        """
+        self.slots_file = slots_file
+        self._states = self._load()
+        self._changed = set()  # 尚未保存的來源群組 ID
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """從檔案載入欄位記錄
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 以來源群組 ID 為鍵的欄位狀態
+        """
+        if self.slots_file.exists():
+            try:
+                return read_json(self.slots_file)
+            except Exception as e:
+                logger.error(f"載入摘要欄位記錄失敗: {e}")
+        return {}
+    
+    def get(self, source_id: int) -> Optional[Dict[str, Any]]:
+        """取得來源群組的欄位狀態
+        
+        Args:
+            source_id: 來源群組 ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 欄位狀態，若尚未建立則返回 None
+        """
+        if source_id is None:
+            return None
+        return self._states.get(str(source_id))
+    
+    def set(self, source_id: int, state: Dict[str, Any]):
+        """更新來源群組的欄位狀態
+        
+        Args:
+            source_id: 來源群組 ID
+            state: 欄位狀態
+        """
+        if source_id is None:
+            return
+        self._states[str(source_id)] = state
+        self._changed.add(str(source_id))
+    
+    def save(self) -> bool:
+        """將欄位記錄寫回檔案
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        if not self._changed:
+            return True
+        try:
+            state_writer.submit(self.slots_file, {key: self._states[key] for key in self._changed}, merge=True)
+            self._changed.clear()
+            return True
+        except Exception as e:
+            logger.error(f"保存摘要欄位記錄失敗: {e}")
+            return False
+
+
 class ResultsStorage:
     """分析結果存儲管理器
     用於保存和讀取分析結果
     """
     
-    def __init__(self, results_dir: Path):
+    def __init__(self, results_dir: Path, output_format: str = DEFAULT_RESULTS_FORMAT, catalog=None):
         """初始化結果存儲管理器
         
         Args:
             results_dir: 結果存儲目錄
+            output_format: 輸出格式，json 為單一 JSON 檔案，ndjson/parquet 為每個表格一個檔案的欄式格式
+            catalog: 分析結果索引實例（可選），預設使用結果目錄中的 catalog.db
         """
         self.results_dir = results_dir
         self.results_dir.mkdir(exist_ok=True)
+        self.output_format = output_format
+        self.catalog = catalog if catalog is not None else ResultsCatalog(results_dir / RESULTS_CATALOG_FILE.name)
     
-    def save_analysis_results(self, group_name: str, results: Dict[str, Any]) -> Optional[Path]:
-        """保存分析結果到文件
+    def save_analysis_results(self, group_name: str, results: Dict[str, Any], group_id: Optional[int] = None) -> Optional[Path]:
+        """保存分析結果到文件，並更新分析結果索引
         
         Args:
             group_name: 群組名稱
             results: 分析結果數據
+            group_id: 群組 ID（可選），記錄在索引中
             
         Returns:
-            Optional[Path]: 保存的文件路徑
+            Optional[Path]: 保存的文件路徑（欄式格式為結果目錄中的 manifest.json）
         """
-        from datetime import datetime
         
         # 創建安全的文件名
         safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in group_name)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_name = f"analysis_{safe_name}_{timestamp}.json"
-        file_path = self.results_dir / file_name
+        
+        output_format = self.output_format
+        if output_format == RESULTS_FORMAT_PARQUET and not parquet_available():
+            logger.warning("未安裝 pyarrow，無法輸出 Parquet，改用壓縮 NDJSON 格式")
+            output_format = RESULTS_FORMAT_NDJSON
         
         try:
-            # 轉換日期對象為字符串
-            serializable_results = self._prepare_for_serialization(results)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(serializable_results, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"分析結果已保存到 {file_path}")
-            return file_path
+            if output_format != RESULTS_FORMAT_JSON:
+                file_path = write_columnar(
+                    self.results_dir / f"analysis_{safe_name}_{timestamp}", results, output_format
+                )
+                logger.info(f"分析結果已保存到 {file_path.parent} ({output_format})")
+            else:
+                file_path = self.results_dir / f"analysis_{safe_name}_{timestamp}.json"
+                
+                # 轉換日期對象為字符串
+                serializable_results = self._prepare_for_serialization(results)
+                
+                atomic_write_json(file_path, serializable_results, default=json_default)
+                
+                logger.info(f"分析結果已保存到 {file_path}")
         except Exception as e:
             logger.error(f"保存分析結果失敗: {e}")
             return None
+        
+        # 索引失敗不影響已保存的結果檔案
+        try:
+            self.catalog.record_run(file_path, group_name, results, group_id=group_id, output_format=output_format)
+        except Exception as e:
+            logger.warning(f"更新分析結果索引失敗: {e}")
+        return file_path
+    
+    @staticmethod
+    def load_analysis_results(path: Path) -> Optional[Mapping]:
+        """讀取保存的分析結果
+        
+        Args:
+            path: save_analysis_results 返回的路徑（JSON 檔案、manifest.json 或結果目錄）
+            
+        Returns:
+            Optional[Mapping]: 分析結果；欄式格式的表格會在第一次存取時才讀取
+        """
+        path = Path(path)
+        try:
+            if path.is_dir() or path.name == MANIFEST_FILE:
+                return ColumnarResults(path)
+            return read_json(path)
+        except Exception as e:
+            logger.error(f"讀取分析結果失敗: {e}")
+            return None
     
     def _prepare_for_serialization(self, data: Any) -> Any:
         """將數據準備為可序列化的格式
@@ -117,7 +555,6 @@ class ResultsStorage:
         Returns:
             Any: 可序列化的數據
         """
-        from datetime import datetime
         import pandas as pd
         
         if isinstance(data, dict):
@@ -0,0 +1,198 @@
+"""
+趨勢時間序列模組
+以固定長度的二進位記錄附加保存每次分析的摘要數據與每日訊息數，供儀表板快速讀取長期趨勢
+"""
+
+import struct
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+
+# 從配置中導入
+from config.settings import TIMESERIES_DIR
+
+# 設定日誌
+logger = logging.getLogger(__name__)
+
+# 每次分析的記錄：時間戳、總訊息數、獨立使用者數、最高反應數
+_RUN_RECORD = struct.Struct('<qIII')
+RUN_FIELDS = ['total_messages', 'unique_users', 'top_reactions']
+
+# 每日記錄：日期（1970-01-01 起的天數）、訊息數
+_DAILY_RECORD = struct.Struct('<iI')
+
+_EPOCH_DAY = date(1970, 1, 1)
+
+# 降採樣時可用的彙總方式
+AGGREGATIONS = {
+    'mean': lambda values: sum(values) / len(values),
+    'max': max,
+    'min': min,
+    'sum': sum,
+    'last': lambda values: values[-1],
+}
+
+
+def downsample(points: List[Dict[str, Any]], key: str, bucket_size: float,
+               fields: List[str], agg: str = 'mean') -> List[Dict[str, Any]]:
+    """將依 key 排序的資料點分組彙總
+
+    Args:
+        points: 資料點列表（需已依 key 排序）
+        key: 分組依據的欄位（數值）
+        bucket_size: 每組的大小（與 key 相同單位）
+        fields: 要彙總的欄位
+        agg: 彙總方式，AGGREGATIONS 之一
+
+    Returns:
+        List[Dict[str, Any]]: 每組一個資料點，key 為該組的起始值，count 為該組的資料點數
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"未知的彙總方式: {agg}，可用方式: {', '.join(AGGREGATIONS)}")
+    aggregate = AGGREGATIONS[agg]
+
+    buckets = []
+    current_start = None
+    current = []
+    for point in points:
+        start = point[key] - point[key] % bucket_size
+        if start != current_start and current:
+            buckets.append((current_start, current))
+            current = []
+        current_start = start
+        current.append(point)
+    if current:
+        buckets.append((current_start, current))
+
+    return [
+        dict({key: start, 'count': len(items)},
+             **{field: aggregate([item[field] for item in items]) for field in fields})
+        for start, items in buckets
+    ]
+
+
+class MetricSeries:
+    """趨勢時間序列存儲
+
+    每個群組兩個只會附加的檔案：<群組ID>.runs.bin 保存每次分析的摘要，
+    <群組ID>.daily.bin 保存每日訊息數（同一天有多筆時取最大值）
+    """
+
+    def __init__(self, series_dir: Path = TIMESERIES_DIR):
+        """初始化趨勢時間序列存儲
+
+        Args:
+            series_dir: 時間序列檔案目錄
+        """
+        self.series_dir = series_dir
+        self.series_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, group_id: int, kind: str) -> Path:
+        """取得群組的時間序列檔案路徑"""
+        return self.series_dir / f"{group_id}.{kind}.bin"
+
+    @staticmethod
+    def _append(path: Path, data: bytes):
+        """以單次寫入附加記錄（O_APPEND 下小於 PIPE_BUF 的寫入不會與其他程序交錯）"""
+        with open(path, 'ab') as f:
+            f.write(data)
+
+    @staticmethod
+    def _read(path: Path, record: struct.Struct) -> List[tuple]:
+        """讀取所有完整的記錄（忽略異常中斷留下的不完整結尾）"""
+        if not path.exists():
+            return []
+        data = path.read_bytes()
+        usable = len(data) - len(data) % record.size
+        return list(record.iter_unpack(data[:usable]))
+
+    def append_run(self, group_id: int, analysis_results: Dict[str, Any], run_at: Optional[datetime] = None):
+        """附加一次分析的摘要數據與每日訊息數
+
+        Args:
+            group_id: 群組 ID
+            analysis_results: 分析結果字典
+            run_at: 執行時間，預設為現在
+        """
+        run_at = run_at or datetime.now(timezone.utc)
+        most_reactions = analysis_results.get('most_reactions')
+        top_reactions = 0
+        if most_reactions is not None and len(most_reactions) > 0:
+            top_reactions = int(most_reactions['total_reactions'].max())
+
+        self._append(self._path(group_id, 'runs'), _RUN_RECORD.pack(
+            int(run_at.timestamp()),
+            int(analysis_results.get('total_messages') or 0),
+            int(analysis_results.get('unique_users') or 0),
+            top_reactions
+        ))
+
+        messages_per_day = analysis_results.get('messages_per_day')
+        if messages_per_day is not None and len(messages_per_day) > 0:
+            data = b''.join(
+                _DAILY_RECORD.pack((day - _EPOCH_DAY).days, int(count))
+                for day, count in zip(messages_per_day['date_day'], messages_per_day['count'])
+            )
+            self._append(self._path(group_id, 'daily'), data)
+
+    def runs(self, group_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             bucket: Optional[timedelta] = None, agg: str = 'mean') -> List[Dict[str, Any]]:
+        """查詢每次分析的摘要數據
+
+        Args:
+            group_id: 群組 ID
+            start: 起始時間（可選）
+            end: 結束時間（可選）
+            bucket: 降採樣的時間間隔（可選），例如 timedelta(days=7) 為每週一點
+            agg: 降採樣的彙總方式
+
+        Returns:
+            List[Dict[str, Any]]: 依時間排序的 timestamp、total_messages、unique_users、top_reactions
+        """
+        # 記錄依附加順序保存，多個程序同時寫入時可能有些微亂序，排序後再二分搜尋範圍
+        records = sorted(self._read(self._path(group_id, 'runs'), _RUN_RECORD))
+        timestamps = [record[0] for record in records]
+        low = bisect_left(timestamps, int(start.timestamp())) if start else 0
+        high = bisect_right(timestamps, int(end.timestamp())) if end else len(records)
+
+        points = [dict(zip(['timestamp'] + RUN_FIELDS, record)) for record in records[low:high]]
+        if bucket:
+            points = downsample(points, 'timestamp', int(bucket.total_seconds()), RUN_FIELDS, agg)
+        for point in points:
+            point['time'] = datetime.fromtimestamp(point['timestamp'], timezone.utc)
+        return points
+
+    def daily(self, group_id: int, start_day: Optional[date] = None, end_day: Optional[date] = None,
+              bucket_days: Optional[int] = None, agg: str = 'sum') -> List[Dict[str, Any]]:
+        """查詢每日訊息數
+
+        Args:
+            group_id: 群組 ID
+            start_day: 起始日期（可選）
+            end_day: 結束日期（可選）
+            bucket_days: 降採樣的天數（可選），例如 7 為每週一點
+            agg: 降採樣的彙總方式
+
+        Returns:
+            List[Dict[str, Any]]: 依日期排序的 day、count
+        """
+        # 同一天被多次分析時取最大值：分析期間頭尾的日期只涵蓋部分時段，數值會偏低
+        counts = {}
+        for day_number, count in self._read(self._path(group_id, 'daily'), _DAILY_RECORD):
+            counts[day_number] = max(count, counts.get(day_number, 0))
+        low = (start_day - _EPOCH_DAY).days if start_day else None
+        high = (end_day - _EPOCH_DAY).days if end_day else None
+
+        points = [
+            {'day_number': day_number, 'messages': count}
+            for day_number, count in sorted(counts.items())
+            if (low is None or day_number >= low) and (high is None or day_number <= high)
+        ]
+        if bucket_days:
+            points = downsample(points, 'day_number', bucket_days, ['messages'], agg)
+        return [
+            {'day': _EPOCH_DAY + timedelta(days=point['day_number']), 'count': point['messages']}
+            for point in points
+        ]
@@ -99,11 +99,53 @@ if [[ "$SAVE_RESULT" == "yes" ]]; then
     CMD="$CMD --save"
 fi
 
+# 常駐模式：由常駐服務維持連線，定時任務只負責提交工作
+read -p "是否使用常駐模式（保持 Telegram 連線，定時任務只提交工作）？(yes/no，預設: no): " USE_DAEMON
+USE_DAEMON=${USE_DAEMON:-no}
+DAEMON_CMD=""
+if [[ "$USE_DAEMON" == "yes" ]]; then
+    CMD="$CMD --submit"
+    DAEMON_CMD="cd \"$SCRIPT_DIR\" && nohup \"$VENV_DIR/bin/python3\" telegram_reviewer.py --daemon >> \"$SCRIPT_DIR/logs/daemon.log\" 2>&1 &"
+    echo -e "${YELLOW}📋 已設定：定時任務將提交工作給常駐服務${NC}"
+fi
+
+# 內建排程器：由常駐服務依設定檔錯開執行各群組，取代 crontab 的定時任務
+read -p "是否使用內建排程器取代 crontab（各群組錯開執行，修改設定檔即時生效）？(yes/no，預設: no): " USE_SCHEDULER
+USE_SCHEDULER=${USE_SCHEDULER:-no}
+if [[ "$USE_SCHEDULER" == "yes" ]]; then
+    SCHEDULE_CONFIG="$SCRIPT_DIR/telegram_reviewer_schedule.json"
+    read -p "每個群組多少小時執行一次？(預設: 24): " INTERVAL_HOURS
+    INTERVAL_HOURS=${INTERVAL_HOURS:-24}
+    if [ -f "$SCHEDULE_CONFIG" ]; then
+        echo -e "${YELLOW}📋 保留現有的排程設定檔: $SCHEDULE_CONFIG${NC}"
+    else
+        SAVE_JSON=$([[ "$SAVE_RESULT" == "yes" ]] && echo true || echo false)
+        cat > "$SCHEDULE_CONFIG" << EOF
+{
+  "defaults": {
+    "interval_hours": $INTERVAL_HOURS,
+    "days": $DAYS,
+    "top": $TOP_COUNT,
+    "forward": true,
+    "save": $SAVE_JSON
+  }
+}
+EOF
+        echo -e "${GREEN}✅ 已建立排程設定檔: $SCHEDULE_CONFIG（未列出 groups 時使用歷史群組）${NC}"
+    fi
+    DAEMON_CMD="cd \"$SCRIPT_DIR\" && nohup \"$VENV_DIR/bin/python3\" telegram_reviewer.py --schedule \"$SCHEDULE_CONFIG\" >> \"$SCRIPT_DIR/logs/daemon.log\" 2>&1 &"
+    # 排程器取代定時任務，不再詢問 cron 頻率
+    SCHEDULE="no"
+    SCHEDULE_DESC="內建排程器，每 $INTERVAL_HOURS 小時"
+fi
+
 # 詢問是否設定定時任務
-echo
-echo -e "${BLUE}⏱️ 設定定時執行：${NC}"
-read -p "是否需要定時執行此工具？(yes/no，預設: yes): " SCHEDULE
-SCHEDULE=${SCHEDULE:-yes}
+if [[ "$USE_SCHEDULER" != "yes" ]]; then
+    echo
+    echo -e "${BLUE}⏱️ 設定定時執行：${NC}"
+    read -p "是否需要定時執行此工具？(yes/no，預設: yes): " SCHEDULE
+    SCHEDULE=${SCHEDULE:-yes}
+fi
 
 if [[ "$SCHEDULE" == "yes" ]]; then
     echo -e "${YELLOW}🕒 請選擇執行頻率：${NC}"
@@ -151,6 +193,12 @@ if [[ "$SCHEDULE" == "yes" ]]; then
     TEMP_CRON=$(mktemp)
     crontab -l > "$TEMP_CRON" 2>/dev/null
     
+    # 常駐模式需在開機時啟動常駐服務
+    if [[ -n "$DAEMON_CMD" ]] && ! grep -qF -- "--daemon" "$TEMP_CRON"; then
+        echo "# Telegram Reviewer 自動分析 - 常駐服務" >> "$TEMP_CRON"
+        echo "@reboot $DAEMON_CMD" >> "$TEMP_CRON"
+    fi
+    
     # 檢查是否已經有相同的 cron 任務
     if grep -qF "$CMD" "$TEMP_CRON"; then
         echo -e "${YELLOW}⚠️ 已存在相同的定時任務，跳過添加。${NC}"
@@ -168,6 +216,26 @@ if [[ "$SCHEDULE" == "yes" ]]; then
     rm "$TEMP_CRON"
 fi
 
+# 內建排程器在開機時啟動
+if [[ "$USE_SCHEDULER" == "yes" ]]; then
+    TEMP_CRON=$(mktemp)
+    crontab -l > "$TEMP_CRON" 2>/dev/null
+    if ! grep -qF -- "--schedule" "$TEMP_CRON"; then
+        echo "# Telegram Reviewer 自動分析 - 內建排程器" >> "$TEMP_CRON"
+        echo "@reboot $DAEMON_CMD" >> "$TEMP_CRON"
+        crontab "$TEMP_CRON"
+    fi
+    rm "$TEMP_CRON"
+fi
+
+# 啟動常駐服務
+if [[ -n "$DAEMON_CMD" ]]; then
+    mkdir -p "$SCRIPT_DIR/logs"
+    echo -e "${YELLOW}🚀 正在啟動常駐服務...${NC}"
+    eval "$DAEMON_CMD"
+    echo -e "${GREEN}✅ 常駐服務已在背景執行，日誌: logs/daemon.log${NC}"
+fi
+
 # 詢問是否立即執行
 echo
 read -p "是否立即執行一次分析？(yes/no，預設: yes): " RUN_NOW
@@ -186,6 +254,8 @@ DAYS=$DAYS
 TOP_COUNT=$TOP_COUNT
 USE_HISTORY=$USE_HISTORY
 SAVE_RESULT=$SAVE_RESULT
+USE_DAEMON=$USE_DAEMON
+USE_SCHEDULER=$USE_SCHEDULER
 SCHEDULE=$SCHEDULE
 SCHEDULE_DESC="$SCHEDULE_DESC"
 LAST_SETUP=$(date +%Y-%m-%d)
@@ -1,6 +1,29 @@
 """
 API 模組
 此包含所有與外部 API 相關的功能
+
+各類別在第一次被存取時才匯入，匯入此包本身不會載入 Telethon
 """
 
-from src.api.telegram_client import TelegramClientManager
\ No newline at end of file
+from importlib import import_module
+
+_EXPORTS = {
+    'TelegramClientManager': 'src.api.telegram_client',
+    'TelegramClientPool': 'src.api.client_pool',
+    'FakeTelegramClient': 'src.api.fake_client',
+    'SyntheticHistory': 'src.api.fake_client',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
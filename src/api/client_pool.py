@@ -0,0 +1,209 @@
+"""
+Telegram 客戶端池模組
+管理多個已授權的帳號，將請求分配給目前最不受 FloodWait 限制的帳號
+"""
+import time
+import asyncio
+from collections import Counter
+from typing import Dict, List, Any, Optional
+
+from telethon import utils
+from telethon.tl.types import PeerChannel
+
+# 更新導入路徑
+from config.settings import ROOT_DIR
+from src.utils.logger import logger
+from src.api.telegram_client import TelegramClientManager
+from data.storage import EntityCache, DialogCache
+
+
+class TelegramClientPool:
+    """多帳號客戶端池，提供與 TelegramClientManager 相容的介面
+
+    第一個帳號為主要帳號，負責對話列表、儲存群組等操作；
+    獲取訊息時則在所有屬於該群組成員的帳號中挑選限制最少的帳號
+    """
+
+    def __init__(self, managers: List[TelegramClientManager]):
+        """初始化客戶端池
+
+        Args:
+            managers: 客戶端管理器列表，第一個為主要帳號
+        """
+        if not managers:
+            raise ValueError("客戶端池至少需要一個帳號")
+        self.managers = managers
+        self.primary = managers[0]
+        # 各帳號加入的群組 ID（主要帳號不需記錄，群組列表本來就來自主要帳號）
+        self._membership: Dict[str, set] = {}
+        # 各帳號目前正在處理的請求數量
+        self._in_flight = Counter()
+
+    @classmethod
+    def from_session_names(cls, primary: TelegramClientManager, session_names: List[str]) -> 'TelegramClientPool':
+        """以額外的會話名稱建立客戶端池
+
+        每個額外帳號使用自己的實體與對話列表快取，因為 access hash 只對取得它的帳號有效
+
+        Args:
+            primary: 主要帳號的客戶端管理器
+            session_names: 額外帳號的會話名稱列表
+
+        Returns:
+            TelegramClientPool: 客戶端池
+        """
+        managers = [primary]
+        for name in session_names:
+            managers.append(TelegramClientManager(
+                session_name=name,
+                entity_cache=EntityCache(ROOT_DIR / f"{name}_entities.json"),
+                dialog_cache=DialogCache(ROOT_DIR / f"{name}_dialogs.json"),
+                phone=lambda name=name: input(f"請輸入帳號 {name} 的手機號碼: ")
+            ))
+        return cls(managers)
+
+    # 以下屬性與方法委派給主要帳號，讓客戶端池可以直接取代 TelegramClientManager
+
+    @property
+    def client(self):
+        """主要帳號的 Telegram 客戶端"""
+        return self.primary.client
+
+    @property
+    def me(self):
+        """主要帳號的登入用戶資訊"""
+        return self.primary.me
+
+    async def connect(self):
+        """連接所有帳號並載入額外帳號的群組成員資訊
+
+        Returns:
+            bool: 主要帳號是否為新建立的連接
+        """
+        connected = await self.primary.connect()
+        for manager in self.managers[1:]:
+            try:
+                await manager.connect()
+                dialogs = await manager.refresh_dialogs()
+                self._membership[manager.session_name] = {dialog['id'] for dialog in dialogs}
+                logger.info(f"帳號 {manager.session_name} 已加入客戶端池，可存取 {len(dialogs)} 個群組或頻道")
+            except Exception as e:
+                logger.error(f"帳號 {manager.session_name} 連接失敗，將不會使用此帳號: {e}")
+                self._membership[manager.session_name] = set()
+        return connected
+
+    async def get_all_dialogs(self):
+        """獲取主要帳號的所有群組和頻道"""
+        return await self.primary.get_all_dialogs()
+
+    def get_cached_dialogs(self):
+        """取得主要帳號的對話列表快取"""
+        return self.primary.get_cached_dialogs()
+
+    async def refresh_dialogs(self):
+        """增量更新主要帳號的對話列表"""
+        return await self.primary.refresh_dialogs()
+
+    async def get_entity(self, entity_id):
+        """以主要帳號獲取實體"""
+        return await self.primary.get_entity(entity_id)
+
+    async def resolve_entities(self, entity_ids: List[int]) -> Dict[int, Any]:
+        """以主要帳號批次解析實體"""
+        return await self.primary.resolve_entities(entity_ids)
+
+    def report_flood(self, seconds):
+        """記錄主要帳號遇到的 FloodWait 限制"""
+        self.primary.report_flood(seconds)
+
+    def get_request_stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """取得各帳號的請求統計
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, Any]]]: 會話名稱對應該帳號各請求類型的統計
+        """
+        return {manager.session_name: manager.get_request_stats() for manager in self.managers}
+
+    def log_request_stats(self, reset=False):
+        """將各帳號的請求統計寫入日誌
+
+        Args:
+            reset: 寫入後是否清除統計
+        """
+        for manager in self.managers:
+            manager.log_request_stats(reset)
+
+    async def close(self):
+        """關閉所有帳號的連接"""
+        for manager in self.managers:
+            await manager.close()
+
+    def _candidates(self, entity) -> List[TelegramClientManager]:
+        """列出可以存取指定群組的帳號
+
+        一般群組 (Chat) 的訊息 ID 依帳號而不同，因此只使用主要帳號；
+        超級群組和頻道的訊息 ID 在所有成員間一致，可以分給任何已加入的帳號
+
+        Args:
+            entity: 群組實體
+
+        Returns:
+            List[TelegramClientManager]: 可用的帳號列表
+        """
+        if entity is None:
+            return [self.primary]
+        try:
+            peer = utils.get_peer(entity)
+        except Exception:
+            return [self.primary]
+        if not isinstance(peer, PeerChannel):
+            return [self.primary]
+
+        group_id = utils.get_peer_id(peer)
+        return [self.primary] + [
+            manager for manager in self.managers[1:]
+            if group_id in self._membership.get(manager.session_name, ())
+        ]
+
+    async def acquire(self, entity=None):
+        """挑選目前最不受限制的帳號
+
+        優先選擇未受 FloodWait 限制且進行中請求最少的帳號；所有帳號都受限制時，等待最早解除的帳號
+
+        Args:
+            entity: 要存取的群組實體（可選）
+
+        Returns:
+            tuple: (客戶端管理器, 該帳號可用的實體)
+        """
+        candidates = self._candidates(entity)
+
+        while True:
+            now = time.monotonic()
+            manager = min(candidates, key=lambda m: (max(m.flood_until - now, 0), self._in_flight[m.session_name]))
+            wait = manager.flood_until - now
+            if wait <= 0:
+                break
+            logger.warning(f"所有可用帳號都在 FloodWait 限制中，等待 {wait:.0f} 秒")
+            await asyncio.sleep(wait)
+
+        peer = entity
+        if manager is not self.primary and entity is not None:
+            # 額外帳號需要使用自己的 access hash
+            group_id = utils.get_peer_id(entity)
+            peer = (await manager.resolve_entities([group_id])).get(group_id)
+            if peer is None:
+                logger.warning(f"帳號 {manager.session_name} 無法解析群組 {group_id}，改用主要帳號")
+                manager, peer = self.primary, entity
+
+        self._in_flight[manager.session_name] += 1
+        return manager, peer
+
+    def release(self, manager: Optional[TelegramClientManager]):
+        """歸還由 acquire 取得的帳號
+
+        Args:
+            manager: 客戶端管理器
+        """
+        if manager is not None and self._in_flight[manager.session_name] > 0:
+            self._in_flight[manager.session_name] -= 1
@@ -0,0 +1,624 @@
+"""
+模擬 Telegram 客戶端模組
+在程序內模擬本專案用到的 TelegramClient 方法，以合成的歷史訊息回應，
+可設定往返延遲、每頁數量與 FloodWait，讓效能量測與回歸測試不需要真實帳號
+
+用法:
+    client = FakeTelegramClient([SyntheticHistory(title='模擬群組', messages=50000)], rtt=0.05)
+    client_manager = TelegramClientManager(client=client)
+
+所有請求都以真實的 Telethon 請求類型經由 _call 發送，因此 RequestScheduler 的排程、
+FloodWait 重試與執行指標（rpc_calls、rpc_seconds）都與連線到 Telegram 時相同
+"""
+import os
+import random
+import asyncio
+import itertools
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Union
+
+from telethon import utils
+from telethon.errors import FloodWaitError, ChatForwardsRestrictedError
+from telethon.tl import types
+from telethon.tl.functions.channels import GetChannelsRequest, GetMessagesRequest
+from telethon.tl.functions.contacts import ResolveUsernameRequest
+from telethon.tl.functions.messages import (
+    GetHistoryRequest, GetDialogsRequest, SendMessageRequest, EditMessageRequest,
+    UpdatePinnedMessageRequest, ForwardMessagesRequest, SendMediaRequest
+)
+from telethon.tl.functions.upload import GetFileRequest, SaveFilePartRequest
+from telethon.tl.functions.users import GetUsersRequest
+
+# 更新導入路徑
+from config.constants import FAKE_RTT_SECONDS, FAKE_PAGE_SIZE, FAKE_FILE_PART_BYTES, FAKE_MEDIA_BYTES
+
+# 合成訊息使用的表情符號
+REACTION_EMOJIS = ['👍', '❤️', '🔥', '😂', '😮', '😢', '🎉', '👏']
+
+# 未指定頻道 ID 時依序分配
+_channel_ids = itertools.count(1000000001)
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value: int) -> float:
+    """splitmix64：將整數雜湊為 [0, 1) 的均勻亂數
+
+    每則訊息的內容只由種子與訊息 ID 決定，可以任意順序、重複產生而結果不變，
+    且比為每則訊息建立 random.Random 快得多
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (value ^ (value >> 31)) / 18446744073709551616.0
+
+
+class FakeMessage:
+    """模擬的訊息，提供 MessageFetcher 與 MessageForwarder 讀取的屬性"""
+
+    __slots__ = ('id', 'chat_id', 'date', 'message', 'sender_id', 'sender', 'reactions', 'replies',
+                 'views', 'forwards', 'media', 'web_preview', 'media_size', '_client')
+
+    def __init__(self, client, message_id: int, chat_id: int, date: datetime, text: str = '', sender=None,
+                 reactions=None, replies=None, views: int = 0, forwards: int = 0, media=None, media_size: int = 0):
+        self._client = client
+        self.id = message_id
+        self.chat_id = chat_id
+        self.date = date
+        self.message = text
+        self.sender = sender
+        self.sender_id = sender.id if sender is not None else None
+        self.reactions = reactions
+        self.replies = replies
+        self.views = views
+        self.forwards = forwards
+        self.media = media
+        self.media_size = media_size
+        self.web_preview = None
+
+    @property
+    def text(self) -> str:
+        """訊息文字"""
+        return self.message
+
+    async def get_sender(self):
+        """取得發送者；與 Telethon 相同，歷史訊息的每頁已包含發送者，不需額外請求"""
+        return self.sender
+
+    async def download_media(self, file=None, **kwargs):
+        """下載訊息中的媒體"""
+        return await self._client.download_media(self, file, **kwargs)
+
+    def __repr__(self):
+        return f"FakeMessage(id={self.id}, chat_id={self.chat_id}, date={self.date:%Y-%m-%d %H:%M})"
+
+
+class FakeDialog:
+    """模擬的對話列表項目"""
+
+    def __init__(self, entity, date: Optional[datetime]):
+        self.entity = entity
+        self.id = utils.get_peer_id(entity)
+        self.name = self.title = entity.title
+        self.date = date
+        self.pinned = False
+        self.is_user = False
+        self.is_group = bool(getattr(entity, 'megagroup', False))
+        self.is_channel = True
+
+
+class SyntheticHistory:
+    """合成的群組歷史訊息
+
+    訊息 ID 為 1 到 messages，時間平均分布在結束時間之前的 days 天內（ID 越大越新）；
+    發送者、反應數、回覆數與媒體都由種子與訊息 ID 決定，反應與回覆數為長尾分布（少數訊息特別熱門）
+    """
+
+    def __init__(self, title: str = '模擬群組', messages: int = 10000, senders: int = 500, days: float = 7,
+                 end_date: Optional[datetime] = None, reaction_ratio: float = 0.3, reaction_alpha: float = 1.5,
+                 reply_ratio: float = 0.2, media_ratio: float = 0.1, text_ratio: float = 0.95,
+                 media_bytes: int = FAKE_MEDIA_BYTES, channel_id: Optional[int] = None, seed: int = 0):
+        """初始化合成歷史
+
+        Args:
+            title: 群組名稱
+            messages: 訊息數量
+            senders: 不同發送者的數量（發送次數依排名遞減，少數人發送大部分訊息）
+            days: 訊息分布的天數
+            end_date: 最新一則訊息的時間，預設為現在
+            reaction_ratio: 有反應的訊息比例
+            reaction_alpha: 反應數的 Pareto 分布參數，越小則熱門訊息的反應越多
+            reply_ratio: 有回覆的訊息比例
+            media_ratio: 包含媒體的訊息比例
+            text_ratio: 有文字的訊息比例（其餘為只有媒體或空白的訊息，獲取時會被略過）
+            media_bytes: 每個媒體檔案的大小
+            channel_id: 頻道 ID（不含 -100 前綴），預設依序分配
+            seed: 亂數種子
+        """
+        self.title = title
+        self.messages = messages
+        self.days = days
+        self.end_date = end_date or datetime.now(timezone.utc).replace(microsecond=0)
+        if self.end_date.tzinfo is None:
+            self.end_date = self.end_date.replace(tzinfo=timezone.utc)
+        self.reaction_ratio = reaction_ratio
+        self.reaction_alpha = reaction_alpha
+        self.reply_ratio = reply_ratio
+        self.media_ratio = media_ratio
+        self.text_ratio = text_ratio
+        self.media_bytes = media_bytes
+        self.seed = seed
+
+        channel_id = channel_id if channel_id is not None else next(_channel_ids)
+        self.entity = types.Channel(
+            id=channel_id, title=title, photo=types.ChatPhotoEmpty(), date=self.end_date - timedelta(days=days),
+            access_hash=channel_id * 7919, megagroup=True, broadcast=False, participants_count=senders
+        )
+        self.marked_id = utils.get_peer_id(self.entity)
+
+        self.users = [
+            types.User(id=500000000 + seed * 100000 + index, access_hash=index + 1, first_name=f"用戶{index + 1}",
+                       last_name=None if index % 3 else '測試', username=f"user_{seed}_{index + 1}" if index % 2 else None)
+            for index in range(max(1, senders))
+        ]
+        # Zipf 分布：第 n 名發送者的發送次數與 1/n 成正比
+        self._sender_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.users))))
+        self._interval = timedelta(days=days) / max(1, messages)
+
+    def _random(self, message_id: int, salt: int) -> float:
+        """訊息 ID 對應的均勻亂數"""
+        return _mix((self.seed << 40) ^ (message_id << 4) ^ salt)
+
+    def _pareto(self, message_id: int, salt: int, alpha: float) -> int:
+        """訊息 ID 對應的 Pareto 分布整數（至少為 1）"""
+        return int((1.0 - self._random(message_id, salt)) ** (-1.0 / alpha))
+
+    def date_of(self, message_id: int) -> datetime:
+        """訊息的發送時間"""
+        return self.end_date - self._interval * (self.messages - message_id)
+
+    def id_before(self, date: datetime) -> int:
+        """早於指定時間的最新訊息 ID（沒有時返回 0）"""
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        if date > self.end_date:
+            return self.messages
+        newer = (self.end_date - date) / self._interval
+        return max(0, min(self.messages, self.messages - int(newer) - 1))
+
+    def build_message(self, client, message_id: int) -> Optional[FakeMessage]:
+        """產生指定 ID 的訊息
+
+        Args:
+            client: 訊息所屬的模擬客戶端（下載媒體時使用）
+            message_id: 訊息 ID
+
+        Returns:
+            Optional[FakeMessage]: 訊息，ID 不存在時返回 None
+        """
+        if not 1 <= message_id <= self.messages:
+            return None
+        sender = self.users[bisect_left(self._sender_weights, self._random(message_id, 1) * self._sender_weights[-1])]
+
+        reactions = None
+        total_reactions = 0
+        if self._random(message_id, 2) < self.reaction_ratio:
+            total_reactions = self._pareto(message_id, 3, self.reaction_alpha)
+            kinds = 1 + int(self._random(message_id, 4) * 3)
+            first = int(self._random(message_id, 5) * len(REACTION_EMOJIS))
+            results = []
+            remaining = total_reactions
+            for index in range(kinds):
+                count = remaining if index == kinds - 1 else max(1, remaining // 2)
+                if count <= 0:
+                    break
+                remaining -= count
+                emoji = REACTION_EMOJIS[(first + index) % len(REACTION_EMOJIS)]
+                results.append(types.ReactionCount(reaction=types.ReactionEmoji(emoticon=emoji), count=count))
+            reactions = types.MessageReactions(results=results)
+
+        replies = None
+        if self._random(message_id, 6) < self.reply_ratio:
+            replies = types.MessageReplies(replies=self._pareto(message_id, 7, 1.8), replies_pts=0)
+
+        media = None
+        if self._random(message_id, 8) < self.media_ratio:
+            media = types.MessageMediaPhoto(photo=types.PhotoEmpty(id=message_id))
+        text = f"模擬訊息 #{message_id}：{self.title} 的第 {message_id} 則訊息" \
+            if self._random(message_id, 9) < self.text_ratio else ''
+
+        return FakeMessage(
+            client, message_id, self.marked_id, self.date_of(message_id), text, sender, reactions, replies,
+            views=total_reactions * 20 + int(self._random(message_id, 10) * 200),
+            forwards=self._pareto(message_id, 11, 2.5) - 1,
+            media=media, media_size=self.media_bytes if media is not None else 0
+        )
+
+
+class FakeTelegramClient:
+    """模擬的 Telegram 客戶端
+
+    實作本專案用到的 TelegramClient 方法：start、get_me、iter_messages、get_messages、iter_dialogs、
+    get_entity、get_input_entity、send_message、edit_message、pin_message、forward_messages、send_file、
+    download_media，以及以 client(CreateChannelRequest(...)) 等方式直接發送的請求。
+    每個請求等待一次往返延遲，並可依設定拋出 FloodWaitError
+    """
+
+    def __init__(self, histories: Optional[List[SyntheticHistory]] = None, rtt: float = FAKE_RTT_SECONDS,
+                 jitter: float = 0.0, page_size: int = FAKE_PAGE_SIZE, flood_every: int = 0, flood_rate: float = 0.0,
+                 flood_seconds: int = 1, flood_methods: Optional[List[str]] = None, forwards_restricted: bool = False,
+                 seed: int = 0):
+        """初始化模擬客戶端
+
+        Args:
+            histories: 各群組的合成歷史，預設為一個 10000 則訊息的群組
+            rtt: 每個請求的往返延遲（秒）
+            jitter: 額外的隨機延遲上限（秒）
+            page_size: 每次請求返回的訊息或對話數
+            flood_every: 每 N 個同類請求拋出一次 FloodWaitError（0 表示不使用）
+            flood_rate: 每個請求拋出 FloodWaitError 的機率
+            flood_seconds: FloodWaitError 要求等待的秒數
+            flood_methods: 只對這些請求類型拋出 FloodWaitError（例如 ['GetHistoryRequest']），預設為全部
+            forwards_restricted: 群組是否禁止轉發（轉發媒體時改為下載後重新上傳）
+            seed: 延遲與 FloodWait 的亂數種子
+        """
+        self.rtt = rtt
+        self.jitter = jitter
+        self.page_size = page_size
+        self.flood_every = flood_every
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.flood_methods = set(flood_methods) if flood_methods else None
+        self.forwards_restricted = forwards_restricted
+        self.flood_sleep_threshold = 60
+        self._rng = random.Random(seed)
+        self._sender = None
+        self._connected = False
+
+        self.histories: Dict[int, SyntheticHistory] = {}
+        self._channels: Dict[int, Any] = {}
+        self._dialog_dates: Dict[int, datetime] = {}
+        # 本帳號在各對話中發送的訊息
+        self.outboxes: Dict[int, Dict[int, FakeMessage]] = {}
+        self._outbox_ids = itertools.count(10000001)
+        self._file_ids = itertools.count(1)
+        # 已上傳的檔案大小，發送媒體訊息時使用
+        self._uploads: Dict[int, int] = {}
+        # 各請求類型的次數（包括拋出 FloodWaitError 的請求）
+        self.request_counts: Counter = Counter()
+        self.me = types.User(id=499999999, is_self=True, access_hash=1, first_name='模擬帳號', username='fake_reviewer')
+
+        for history in histories if histories is not None else [SyntheticHistory()]:
+            self.add_history(history)
+
+    def add_history(self, history: SyntheticHistory):
+        """加入一個群組"""
+        self.histories[history.marked_id] = history
+        self._channels[history.marked_id] = history.entity
+        self._dialog_dates[history.marked_id] = history.end_date
+
+    @property
+    def sent_count(self) -> int:
+        """本帳號發送的訊息總數"""
+        return sum(len(outbox) for outbox in self.outboxes.values())
+
+    # 請求層：模擬延遲與 FloodWait，再交給各請求類型的處理函數
+
+    def __call__(self, request, ordered: bool = False):
+        """發送請求，與 TelegramClient 相同經由 _call（RequestScheduler 會替換此方法）"""
+        return self._call(self._sender, request, ordered=ordered)
+
+    async def _call(self, sender, request, ordered: bool = False, flood_sleep_threshold=None):
+        """模擬一次 RPC
+
+        Raises:
+            FloodWaitError: 依 flood_every / flood_rate 設定
+        """
+        method = type(request).__name__
+        self.request_counts[method] += 1
+        delay = self.rtt + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._should_flood(method):
+            raise FloodWaitError(request, capture=self.flood_seconds)
+        handler = getattr(self, f"_handle_{method}", None)
+        if handler is None:
+            raise NotImplementedError(f"模擬客戶端不支援 {method}")
+        return handler(request)
+
+    def _should_flood(self, method: str) -> bool:
+        """此請求是否要拋出 FloodWaitError"""
+        if self.flood_methods is not None and method not in self.flood_methods:
+            return False
+        if self.flood_every and self.request_counts[method] % self.flood_every == 0:
+            return True
+        return bool(self.flood_rate) and self._rng.random() < self.flood_rate
+
+    def _peer_id(self, peer) -> int:
+        """取得帶標記的對話 ID"""
+        if isinstance(peer, FakeMessage):
+            return peer.chat_id
+        return utils.get_peer_id(peer)
+
+    def _history(self, peer) -> Optional[SyntheticHistory]:
+        return self.histories.get(self._peer_id(peer))
+
+    def _new_message(self, peer, text: str = '', media=None, media_size: int = 0) -> FakeMessage:
+        """在對話中加入一則本帳號發送的訊息"""
+        chat_id = self._peer_id(peer)
+        message = FakeMessage(self, next(self._outbox_ids), chat_id, datetime.now(timezone.utc), text, self.me,
+                              media=media, media_size=media_size)
+        self.outboxes.setdefault(chat_id, {})[message.id] = message
+        self._dialog_dates[chat_id] = message.date
+        return message
+
+    def _find_message(self, peer, message_id: int) -> Optional[FakeMessage]:
+        """取得歷史或本帳號發送的訊息"""
+        chat_id = self._peer_id(peer)
+        sent = self.outboxes.get(chat_id, {}).get(message_id)
+        if sent is not None:
+            return sent
+        history = self.histories.get(chat_id)
+        return history.build_message(self, message_id) if history is not None else None
+
+    def _handle_GetUsersRequest(self, request):
+        return [self.me]
+
+    def _handle_GetHistoryRequest(self, request) -> List[FakeMessage]:
+        history = self._history(request.peer)
+        if history is None:
+            return []
+        newest = request.offset_id - 1 if request.offset_id else history.messages
+        if request.offset_date:
+            newest = min(newest, history.id_before(request.offset_date))
+        oldest = max(request.min_id + 1, newest - request.limit + 1, 1)
+        return [history.build_message(self, message_id) for message_id in range(newest, oldest - 1, -1)]
+
+    def _handle_GetMessagesRequest(self, request) -> List[Optional[FakeMessage]]:
+        return [self._find_message(request.channel, message_id) for message_id in request.id]
+
+    def _handle_GetDialogsRequest(self, request) -> List[FakeDialog]:
+        dialogs = sorted(self._channels, key=lambda chat_id: self._dialog_dates.get(chat_id), reverse=True)
+        page = dialogs[request.offset_id:request.offset_id + request.limit]
+        return [FakeDialog(self._channels[chat_id], self._dialog_dates.get(chat_id)) for chat_id in page]
+
+    def _handle_GetChannelsRequest(self, request):
+        marked_ids = [utils.get_peer_id(types.PeerChannel(channel.channel_id)) for channel in request.id]
+        return types.messages.Chats(chats=[self._channels[chat_id] for chat_id in marked_ids if chat_id in self._channels])
+
+    def _handle_GetChatsRequest(self, request):
+        return types.messages.Chats(chats=[])
+
+    def _handle_ResolveUsernameRequest(self, request):
+        for entity in self._channels.values():
+            if getattr(entity, 'username', None) == request.username:
+                return entity
+        raise ValueError(f'No user has "{request.username}" as username')
+
+    def _handle_CreateChannelRequest(self, request):
+        # 略過已被指定給合成群組的 ID
+        channel_id = next(_channel_ids)
+        while utils.get_peer_id(types.PeerChannel(channel_id)) in self._channels:
+            channel_id = next(_channel_ids)
+        channel = types.Channel(id=channel_id, title=request.title, photo=types.ChatPhotoEmpty(),
+                                date=datetime.now(timezone.utc), access_hash=channel_id * 7919, creator=True,
+                                megagroup=request.megagroup, broadcast=request.broadcast)
+        marked_id = utils.get_peer_id(channel)
+        self._channels[marked_id] = channel
+        self._dialog_dates[marked_id] = channel.date
+        return types.Updates(updates=[], users=[], chats=[channel], date=channel.date, seq=0)
+
+    def _handle_SendMessageRequest(self, request) -> FakeMessage:
+        return self._new_message(request.peer, request.message)
+
+    def _handle_EditMessageRequest(self, request) -> FakeMessage:
+        message = self.outboxes.get(self._peer_id(request.peer), {}).get(request.id)
+        if message is None:
+            raise ValueError(f"訊息 {request.id} 不存在或不是本帳號發送的訊息")
+        message.message = request.message
+        return message
+
+    def _handle_UpdatePinnedMessageRequest(self, request):
+        return types.Updates(updates=[], users=[], chats=[], date=datetime.now(timezone.utc), seq=0)
+
+    def _handle_ForwardMessagesRequest(self, request) -> List[FakeMessage]:
+        if self.forwards_restricted:
+            raise ChatForwardsRestrictedError(request)
+        forwarded = []
+        for message_id in request.id:
+            source = self._find_message(request.from_peer, message_id)
+            if source is not None:
+                forwarded.append(self._new_message(request.to_peer, source.message, source.media, source.media_size))
+        return forwarded
+
+    def _handle_SaveFilePartRequest(self, request) -> bool:
+        return True
+
+    def _handle_SendMediaRequest(self, request) -> FakeMessage:
+        size = self._uploads.pop(request.media.file.id, 0)
+        return self._new_message(request.peer, request.message, types.MessageMediaDocument(), media_size=size)
+
+    def _handle_GetFileRequest(self, request) -> bytes:
+        return bytes(request.limit)
+
+    # 連線
+
+    async def start(self, phone=None, **kwargs):
+        """模擬登入（不需要憑證）"""
+        self._connected = True
+        return self
+
+    async def connect(self):
+        """模擬連線"""
+        self._connected = True
+
+    def is_connected(self) -> bool:
+        """是否已連線"""
+        return self._connected
+
+    async def disconnect(self):
+        """中斷連線"""
+        self._connected = False
+
+    async def get_me(self, input_peer: bool = False):
+        """取得登入用戶"""
+        users = await self(GetUsersRequest([types.InputUserSelf()]))
+        return users[0]
+
+    # 訊息
+
+    async def iter_messages(self, entity, limit: Optional[int] = None, *, offset_date: Optional[datetime] = None,
+                            offset_id: int = 0, min_id: int = 0, **kwargs):
+        """由新到舊逐一產生訊息，每 page_size 則發送一次 GetHistoryRequest
+
+        Args:
+            entity: 群組實體或 ID
+            limit: 最多產生的訊息數
+            offset_date: 只產生早於此時間的訊息
+            offset_id: 只產生 ID 小於此值的訊息
+            min_id: 只產生 ID 大於此值的訊息
+        """
+        remaining = limit if limit is not None else float('inf')
+        while remaining > 0:
+            page_limit = int(min(self.page_size, remaining))
+            page = await self(GetHistoryRequest(
+                peer=entity, offset_id=offset_id, offset_date=offset_date, add_offset=0, limit=page_limit,
+                max_id=0, min_id=min_id, hash=0
+            ))
+            for message in page:
+                yield message
+            remaining -= len(page)
+            if len(page) < page_limit:
+                return
+            offset_id = page[-1].id
+            offset_date = None
+
+    async def get_messages(self, entity, limit: Optional[int] = None, *, ids: Union[int, List[int], None] = None,
+                           **kwargs):
+        """取得指定 ID 的訊息，或最新的 limit 則訊息
+
+        Returns:
+            FakeMessage 或列表：ids 為單一 ID 時返回單則訊息（不存在時為 None）
+        """
+        if ids is None:
+            return [message async for message in self.iter_messages(entity, limit if limit is not None else 1, **kwargs)]
+        id_list = ids if isinstance(ids, (list, tuple)) else [ids]
+        messages = await self(GetMessagesRequest(channel=entity, id=list(id_list)))
+        return messages if isinstance(ids, (list, tuple)) else messages[0]
+
+    async def send_message(self, entity, message: str = '', **kwargs) -> FakeMessage:
+        """發送文字訊息"""
+        return await self(SendMessageRequest(peer=entity, message=message))
+
+    async def edit_message(self, entity, message, text: Optional[str] = None, **kwargs) -> FakeMessage:
+        """編輯本帳號發送的訊息"""
+        message_id = message.id if isinstance(message, FakeMessage) else message
+        return await self(EditMessageRequest(peer=entity, id=message_id, message=text))
+
+    async def pin_message(self, entity, message, *, notify: bool = False, **kwargs):
+        """置頂訊息"""
+        message_id = message.id if isinstance(message, FakeMessage) else message
+        return await self(UpdatePinnedMessageRequest(peer=entity, id=message_id, silent=not notify))
+
+    async def forward_messages(self, entity, messages, from_peer=None, **kwargs):
+        """轉發訊息；forwards_restricted 時拋出 ChatForwardsRestrictedError
+
+        Returns:
+            與 Telethon 相同，傳入單則訊息時返回單則訊息，傳入列表時返回列表
+        """
+        single = not isinstance(messages, (list, tuple))
+        message_list = [messages] if single else list(messages)
+        if from_peer is None:
+            from_peer = message_list[0]
+        ids = [message.id if isinstance(message, FakeMessage) else message for message in message_list]
+        forwarded = await self(ForwardMessagesRequest(from_peer=from_peer, id=ids, to_peer=entity))
+        return forwarded[0] if single and forwarded else forwarded
+
+    # 對話與實體
+
+    async def iter_dialogs(self, limit: Optional[int] = None, **kwargs):
+        """依最新訊息時間由新到舊逐一產生對話，每 page_size 個發送一次 GetDialogsRequest"""
+        offset = 0
+        while limit is None or offset < limit:
+            page_limit = self.page_size if limit is None else min(self.page_size, limit - offset)
+            page = await self(GetDialogsRequest(
+                offset_date=None, offset_id=offset, offset_peer=types.InputPeerEmpty(), limit=page_limit, hash=0
+            ))
+            for dialog in page:
+                yield dialog
+            if len(page) < page_limit:
+                return
+            offset += len(page)
+
+    async def get_entity(self, entity):
+        """取得群組實體
+
+        Raises:
+            ValueError: 找不到實體時
+        """
+        if isinstance(entity, str):
+            return await self(ResolveUsernameRequest(entity.lstrip('@')))
+        if not isinstance(entity, int):
+            return entity
+        peer_id, peer_type = utils.resolve_id(entity)
+        if peer_type is types.PeerChannel and entity in self._channels:
+            result = await self(GetChannelsRequest([types.InputChannel(peer_id, self._channels[entity].access_hash)]))
+            return result.chats[0]
+        raise ValueError(f"Could not find the input entity for {entity}")
+
+    async def get_input_entity(self, peer):
+        """取得輸入實體，與 Telethon 相同只查詢本機資料，不發送請求
+
+        Raises:
+            ValueError: 找不到實體時
+        """
+        entity = self._channels.get(self._peer_id(peer))
+        if entity is None:
+            raise ValueError(f"Could not find the input entity for {peer}")
+        return types.InputPeerChannel(entity.id, entity.access_hash)
+
+    # 媒體
+
+    async def send_file(self, entity, file, *, caption: Optional[str] = None, **kwargs) -> FakeMessage:
+        """上傳檔案：每 FAKE_FILE_PART_BYTES 位元組發送一次 SaveFilePartRequest，最後發送 SendMediaRequest"""
+        if isinstance(file, (bytes, bytearray)):
+            size = len(file)
+        else:
+            size = os.path.getsize(file)
+        file_id = next(self._file_ids)
+        parts = max(1, -(-size // FAKE_FILE_PART_BYTES))
+        for part in range(parts):
+            await self(SaveFilePartRequest(file_id=file_id, file_part=part, bytes=b''))
+        self._uploads[file_id] = size
+        media = types.InputMediaUploadedDocument(
+            file=types.InputFile(id=file_id, parts=parts, name=os.path.basename(str(file)), md5_checksum=''),
+            mime_type='application/octet-stream', attributes=[]
+        )
+        return await self(SendMediaRequest(peer=entity, media=media, message=caption or ''))
+
+    async def download_media(self, message, file=None, **kwargs):
+        """下載媒體：每 FAKE_FILE_PART_BYTES 位元組發送一次 GetFileRequest
+
+        Args:
+            message: 訊息
+            file: 儲存路徑；為 bytes 類型時返回內容，為目錄或 None 時以訊息 ID 命名
+
+        Returns:
+            檔案路徑或內容，訊息沒有媒體時返回 None
+        """
+        if not isinstance(message, FakeMessage) or message.media is None:
+            return None
+        chunks = []
+        for offset in range(0, message.media_size, FAKE_FILE_PART_BYTES):
+            chunks.append(await self(GetFileRequest(location=message.media, offset=offset, limit=FAKE_FILE_PART_BYTES)))
+        content = b''.join(chunks)[:message.media_size]
+        if file is bytes:
+            return content
+        path = str(file) if file is not None else '.'
+        if os.path.isdir(path):
+            path = os.path.join(path, f"media_{message.id}.jpg")
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
@@ -0,0 +1,210 @@
+"""
+Telegram 請求排程模組
+統一處理所有 RPC 請求的 FloodWait：依請求類型記錄限制、調整請求間隔並自動重試
+"""
+import time
+import asyncio
+from dataclasses import dataclass, asdict
+from typing import Dict, Any
+
+from telethon.errors import FloodWaitError
+
+# 更新導入路徑
+from config.constants import (
+    FLOOD_RETRY_MAX_SECONDS, FLOOD_MAX_RETRIES,
+    REQUEST_PACING_MIN_INTERVAL, REQUEST_PACING_MAX_INTERVAL
+)
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils import tracing
+
+# 每次成功請求後請求間隔縮短的比例
+PACING_DECAY = 0.9
+
+
+@dataclass
+class MethodStats:
+    """單一 RPC 類型的請求統計"""
+    calls: int = 0
+    flood_waits: int = 0
+    wait_seconds: float = 0.0
+    retries: int = 0
+
+
+class RequestScheduler:
+    """請求排程器，包裝 Telethon 客戶端的所有 RPC 請求
+
+    FloodWait 限制以帳號和請求類型計算，因此每個客戶端使用自己的排程器
+    """
+
+    def __init__(self, max_retry_seconds=FLOOD_RETRY_MAX_SECONDS, max_retries=FLOOD_MAX_RETRIES,
+                 min_interval=REQUEST_PACING_MIN_INTERVAL, max_interval=REQUEST_PACING_MAX_INTERVAL):
+        """初始化請求排程器
+
+        Args:
+            max_retry_seconds: FloodWait 不超過此秒數時自動等待並重試
+            max_retries: 單一請求最多重試次數
+            min_interval: 遇到 FloodWait 後同類請求的初始間隔（秒）
+            max_interval: 同類請求間隔的上限（秒）
+        """
+        self.max_retry_seconds = max_retry_seconds
+        self.max_retries = max_retries
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.stats: Dict[str, MethodStats] = {}
+        # 各請求類型目前的最小間隔、下次可發送的時間點 (time.monotonic)
+        self._intervals: Dict[str, float] = {}
+        self._next_allowed: Dict[str, float] = {}
+
+    def install(self, client):
+        """將排程器套用到 Telethon 客戶端
+
+        Telethon 所有高階方法（iter_messages、send_message、下載等）最終都經由 _call 發送請求，
+        因此只需包裝此方法；同時關閉 Telethon 內建的自動等待，改由排程器統一處理
+
+        Args:
+            client: TelegramClient 實例
+        """
+        original_call = client._call
+        client.flood_sleep_threshold = 0
+
+        async def scheduled_call(sender, request, ordered=False, flood_sleep_threshold=None):
+            return await self._execute(original_call, sender, request, ordered)
+
+        client._call = scheduled_call
+
+    @staticmethod
+    def _method_name(request) -> str:
+        """取得請求的 RPC 類型名稱
+
+        Args:
+            request: TLRequest 或請求列表
+
+        Returns:
+            str: 請求類型名稱，例如 GetHistoryRequest
+        """
+        if isinstance(request, (list, tuple)):
+            return type(request[0]).__name__ if request else 'EmptyRequest'
+        return type(request).__name__
+
+    async def _execute(self, original_call, sender, request, ordered):
+        """依排程發送請求，遇到 FloodWait 時記錄並視情況重試
+
+        Args:
+            original_call: Telethon 原本的 _call 方法
+            sender: MTProto 發送器
+            request: 請求
+            ordered: 是否依序執行請求列表
+
+        Returns:
+            Any: 請求結果
+
+        Raises:
+            FloodWaitError: 需等待的時間超過自動重試上限，或重試次數用盡
+        """
+        method = self._method_name(request)
+        stats = self.stats.setdefault(method, MethodStats())
+        retries = 0
+
+        while True:
+            await self._pace(method)
+            stats.calls += 1
+            metrics.inc('rpc_calls', method=method)
+            started = time.perf_counter()
+            try:
+                result = await original_call(sender, request, ordered=ordered, flood_sleep_threshold=0)
+            except FloodWaitError as e:
+                stats.flood_waits += 1
+                stats.wait_seconds += e.seconds
+                metrics.inc('flood_waits', method=method)
+                metrics.inc('flood_wait_seconds', e.seconds, method=method)
+                tracing.instant('FloodWait', 'rpc', method=method, seconds=e.seconds)
+                self._on_flood(method, e.seconds)
+
+                if e.seconds > self.max_retry_seconds or retries >= self.max_retries:
+                    logger.warning(f"{method} 遇到 FloodWait ({e.seconds} 秒)，超過自動重試上限，交由呼叫端處理")
+                    raise
+                retries += 1
+                stats.retries += 1
+                logger.warning(f"{method} 遇到 FloodWait ({e.seconds} 秒)，等待後第 {retries} 次重試")
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe('rpc', elapsed, method=method)
+                tracing.record(method, 'rpc', elapsed)
+
+            self._on_success(method)
+            return result
+
+    async def _pace(self, method):
+        """等待到同類請求可以發送的時間點
+
+        Args:
+            method: 請求類型名稱
+        """
+        wait = self._next_allowed.get(method, 0) - time.monotonic()
+        if wait > 0:
+            with tracing.span(f"pace {method}", 'pace'):
+                await asyncio.sleep(wait)
+        interval = self._intervals.get(method, 0)
+        if interval:
+            self._next_allowed[method] = time.monotonic() + interval
+
+    def _on_flood(self, method, seconds):
+        """遇到 FloodWait 時暫停同類請求並加大請求間隔
+
+        Args:
+            method: 請求類型名稱
+            seconds: 需要等待的秒數
+        """
+        interval = self._intervals.get(method, 0)
+        self._intervals[method] = min(max(interval * 2, self.min_interval), self.max_interval)
+        self._next_allowed[method] = max(self._next_allowed.get(method, 0), time.monotonic() + seconds)
+
+    def _on_success(self, method):
+        """請求成功時逐漸縮短請求間隔
+
+        Args:
+            method: 請求類型名稱
+        """
+        interval = self._intervals.get(method)
+        if not interval:
+            return
+        interval *= PACING_DECAY
+        self._intervals[method] = interval if interval >= self.min_interval / 10 else 0
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """取得各請求類型的統計
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 請求類型名稱對應的 calls、flood_waits、wait_seconds、retries
+        """
+        return {method: asdict(stats) for method, stats in self.stats.items()}
+
+    def reset(self):
+        """清除請求統計（保留已學習到的請求間隔）"""
+        self.stats.clear()
+
+    def log_summary(self, label=''):
+        """將請求統計寫入日誌
+
+        Args:
+            label: 日誌中顯示的名稱（例如會話名稱）
+        """
+        if not self.stats:
+            return
+        total_calls = sum(s.calls for s in self.stats.values())
+        total_waits = sum(s.flood_waits for s in self.stats.values())
+        total_seconds = sum(s.wait_seconds for s in self.stats.values())
+        total_retries = sum(s.retries for s in self.stats.values())
+        prefix = f"[{label}] " if label else ''
+        logger.info(
+            f"{prefix}請求統計: {total_calls} 次請求，{total_waits} 次 FloodWait，"
+            f"共等待 {total_seconds:.0f} 秒，重試 {total_retries} 次"
+        )
+        for method, stats in sorted(self.stats.items(), key=lambda item: -item[1].calls):
+            logger.info(
+                f"{prefix}  {method}: {stats.calls} 次請求，{stats.flood_waits} 次 FloodWait，"
+                f"等待 {stats.wait_seconds:.0f} 秒，重試 {stats.retries} 次"
+            )
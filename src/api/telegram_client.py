@@ -3,42 +3,75 @@ Telegram API 客戶端模組
 處理 Telegram API 連接和基本功能
 """
 import os
+import time
+import asyncio
 import logging
-from telethon import TelegramClient
-from telethon.tl.types import Channel, Chat, User
+from typing import Dict, List, Any, Optional
+from telethon import TelegramClient, utils
+from telethon.tl.types import Channel, Chat, User, ChatPhotoEmpty, InputChannel, PeerChat, PeerChannel
+from telethon.tl.functions.channels import GetChannelsRequest
+from telethon.tl.functions.messages import GetChatsRequest
 from dotenv import load_dotenv
 
 # 更新導入路徑
 from config.settings import SESSION_NAME
+from config.constants import ENTITY_CACHE_TTL_HOURS, DIALOG_CACHE_MAX_AGE_HOURS
 from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.api.request_scheduler import RequestScheduler
 from data.schemas import GroupInfo
+from data.storage import EntityCache, DialogCache
 
 class TelegramClientManager:
     """Telegram 客戶端管理類，負責處理與 Telegram API 的連接"""
     
-    def __init__(self, session_name=SESSION_NAME):
+    def __init__(self, session_name=SESSION_NAME, entity_cache=None, entity_cache_ttl_hours=ENTITY_CACHE_TTL_HOURS,
+                 dialog_cache=None, phone=None, client=None):
         """初始化 Telegram 客戶端管理器
         
         Args:
             session_name: 會話名稱，用於保存認證信息
+            entity_cache: 群組實體快取實例（可選），預設使用與群組記錄同目錄的快取檔案
+            entity_cache_ttl_hours: 實體快取的有效時間（小時）
+            dialog_cache: 對話列表快取實例（可選）
+            phone: 登入用的手機號碼或詢問號碼的函數（可選），預設使用 .env 中的 PHONE
+            client: 已建立的客戶端（可選），例如離線測試用的 FakeTelegramClient；提供時不需要 API 憑證
         """
         # 載入環境變數
         load_dotenv()
         
         # 取得 API 憑證
+        self.session_name = session_name
         self.api_id = os.environ.get('API_ID')
         self.api_hash = os.environ.get('API_HASH')
-        self.phone = os.environ.get('PHONE')
+        self.phone = phone or os.environ.get('PHONE')
         
-        # 檢查是否有必要的憑證
-        if not all([self.api_id, self.api_hash]):
-            logger.error("API 憑證缺失，請在 .env 檔案中設置 API_ID 和 API_HASH")
-            raise ValueError("API 憑證缺失")
+        if client is None:
+            # 檢查是否有必要的憑證
+            if not all([self.api_id, self.api_hash]):
+                logger.error("API 憑證缺失，請在 .env 檔案中設置 API_ID 和 API_HASH")
+                raise ValueError("API 憑證缺失")
+            
+            # 初始化 Telegram 客戶端
+            client = TelegramClient(session_name, self.api_id, self.api_hash)
+        self.client = client
         
-        # 初始化 Telegram 客戶端
-        self.client = TelegramClient(session_name, self.api_id, self.api_hash)
+        # 所有 RPC 請求經由排程器處理 FloodWait 並記錄統計
+        self.scheduler = RequestScheduler()
+        self.scheduler.install(self.client)
         self.me = None  # 儲存登入用戶資訊
         
+        # 群組實體快取
+        self.entity_cache = entity_cache if entity_cache is not None else EntityCache()
+        self.entity_cache_ttl_hours = entity_cache_ttl_hours
+        
+        # 對話列表快取
+        self.dialog_cache = dialog_cache if dialog_cache is not None else DialogCache()
+        self.dialog_cache_max_age_hours = DIALOG_CACHE_MAX_AGE_HOURS
+        
+        # FloodWait 限制解除的時間點 (time.monotonic)
+        self.flood_until = 0.0
+        
     async def connect(self):
         """連接到 Telegram API
         
@@ -46,42 +79,58 @@ class TelegramClientManager:
             bool: 是否連接成功
         """
         if not self.client.is_connected():
-            await self.client.start(phone=self.phone)
-            self.me = await self.client.get_me()
+            with metrics.stage('connect', session=self.session_name):
+                await self.client.start(phone=self.phone)
+                self.me = await self.client.get_me()
             logger.info(f"成功連線到 Telegram，登入用戶: {self.me.first_name} (@{self.me.username})")
             return True
         return False
         
+    async def acquire(self, entity=None):
+        """取得可用來發送請求的客戶端管理器與對應的實體
+        
+        單一帳號時即為自己；若帳號仍在 FloodWait 限制中則等待限制解除
+        
+        Args:
+            entity: 要存取的群組實體（可選）
+            
+        Returns:
+            tuple: (客戶端管理器, 該帳號可用的實體)
+        """
+        wait = self.flood_until - time.monotonic()
+        if wait > 0:
+            logger.warning(f"帳號 {self.session_name} 仍在 FloodWait 限制中，等待 {wait:.0f} 秒")
+            await asyncio.sleep(wait)
+        return self, entity
+    
+    def release(self, manager):
+        """歸還由 acquire 取得的客戶端管理器（單一帳號時不需處理）
+        
+        Args:
+            manager: 客戶端管理器
+        """
+    
+    def report_flood(self, seconds):
+        """記錄帳號遇到的 FloodWait 限制
+        
+        Args:
+            seconds: 需要等待的秒數
+        """
+        self.flood_until = max(self.flood_until, time.monotonic() + seconds)
+        logger.warning(f"帳號 {self.session_name} 遇到 FloodWait 限制，需等待 {seconds} 秒")
+    
     async def get_all_dialogs(self):
-        """獲取所有對話（群組和頻道）
+        """獲取所有對話（群組和頻道），並以結果完整更新對話列表快取
         
         Returns:
             list: 群組和頻道的字典列表
         """
         logger.info("正在獲取所有群組和頻道...")
-        dialogs = []
         
         try:
-            # 獲取所有對話
-            async for dialog in self.client.iter_dialogs():
-                entity = dialog.entity
-                
-                # 只保留群組和頻道
-                if isinstance(entity, (Chat, Channel)):
-                    # 區分頻道和群組
-                    is_channel = isinstance(entity, Channel) and entity.broadcast
-                    # 獲取成員數量 (若可用)
-                    members_count = getattr(entity, 'participants_count', 0)
-                    
-                    dialog_info = {
-                        'id': dialog.id,
-                        'name': dialog.name,
-                        'entity': entity,
-                        'type': '頻道' if is_channel else '群組',
-                        'members_count': members_count
-                    }
-                    dialogs.append(dialog_info)
-        
+            dialogs = await self._fetch_group_dialogs()
+            self.dialog_cache.replace(dialogs)
+            self.dialog_cache.save()
             logger.info(f"成功獲取 {len(dialogs)} 個群組和頻道")
             return dialogs
         
@@ -89,21 +138,240 @@ class TelegramClientManager:
             logger.error(f"獲取對話列表時發生錯誤: {e}")
             return []
     
+    def get_cached_dialogs(self):
+        """取得對話列表快取，不需要任何 API 請求
+        
+        Returns:
+            list: 快取中的群組和頻道字典列表
+        """
+        return list(self.dialog_cache.dialogs)
+    
+    async def refresh_dialogs(self):
+        """增量更新對話列表快取
+        
+        只獲取最新訊息比快取更新的對話；快取過舊時改為完整重新整理
+        
+        Returns:
+            list: 更新後的群組和頻道字典列表
+        """
+        if self.dialog_cache.needs_full_refresh(self.dialog_cache_max_age_hours):
+            return await self.get_all_dialogs()
+        
+        try:
+            offset_date = self.dialog_cache.offset_date
+            updated = await self._fetch_group_dialogs(stop_before=offset_date)
+            self.dialog_cache.merge(updated)
+            self.dialog_cache.save()
+            logger.info(f"對話列表增量更新完成，{len(updated)} 個群組或頻道有新訊息")
+        except Exception as e:
+            logger.error(f"增量更新對話列表時發生錯誤: {e}")
+        return self.get_cached_dialogs()
+    
+    async def _fetch_group_dialogs(self, stop_before: Optional[str] = None):
+        """逐一讀取對話，只保留群組和頻道
+        
+        Args:
+            stop_before: ISO 格式時間，遇到最新訊息不晚於此時間的非置頂對話即停止
+                （對話依最新訊息時間排序，之後的對話都沒有變動）
+            
+        Returns:
+            list: 群組和頻道的字典列表
+        """
+        dialogs = []
+        dialogs_started = time.perf_counter()
+        
+        # 獲取所有對話
+        async for dialog in self.client.iter_dialogs():
+            top_message_date = dialog.date.isoformat() if dialog.date else None
+            if stop_before and not dialog.pinned and top_message_date and top_message_date <= stop_before:
+                break
+            
+            entity = dialog.entity
+            
+            # 只保留群組和頻道
+            if isinstance(entity, (Chat, Channel)):
+                # 區分頻道和群組
+                is_channel = isinstance(entity, Channel) and entity.broadcast
+                # 獲取成員數量 (若可用)
+                members_count = getattr(entity, 'participants_count', 0) or 0
+                
+                # 不保留完整的實體對象，需要時再由實體快取還原
+                dialogs.append({
+                    'id': dialog.id,
+                    'name': dialog.name,
+                    'type': '頻道' if is_channel else '群組',
+                    'members_count': members_count,
+                    'top_message_date': top_message_date
+                })
+                
+                # 順便更新實體快取，不需要額外的 API 請求
+                self._cache_entity(entity)
+        
+        self.entity_cache.save()
+        metrics.observe('stage', time.perf_counter() - dialogs_started, stage='dialogs',
+                        refresh='incremental' if stop_before else 'full')
+        metrics.inc('dialogs_fetched', len(dialogs))
+        return dialogs
+    
     async def get_entity(self, entity_id):
-        """根據 ID 獲取實體
+        """根據 ID 獲取實體，優先使用實體快取
         
         Args:
-            entity_id: 實體 ID
+            entity_id: 實體 ID，或使用者名稱（例如 "@my_channel"，不經過實體快取）
             
         Returns:
             Entity: Telegram 實體對象
         """
+        # 實體快取以帶標記的 ID 為鍵，使用者名稱直接交給 Telethon 解析
+        if isinstance(entity_id, int):
+            entities = await self.resolve_entities([entity_id])
+            if entity_id in entities:
+                return entities[entity_id]
+        
         try:
-            return await self.client.get_entity(entity_id)
+            entity = await self.client.get_entity(entity_id)
+            self._cache_entity(entity)
+            self.entity_cache.save()
+            return entity
         except Exception as e:
             logger.error(f"獲取實體失敗: {e}")
             return None
+    
+    async def resolve_entities(self, entity_ids: List[int]) -> Dict[int, Any]:
+        """批次解析多個群組實體
+        
+        有效期內的快取直接還原為實體，不需要任何 API 請求；
+        過期或缺少的實體以一次 GetChannels（及一次 GetChats）請求批次重新獲取
+        
+        Args:
+            entity_ids: 群組 ID 列表（與對話列表相同的帶標記 ID）
+            
+        Returns:
+            Dict[int, Any]: 成功解析的 ID 與實體對應
+        """
+        resolved = {}
+        stale_channels = {}
+        stale_chats = {}
+        
+        for entity_id in entity_ids:
+            record = self.entity_cache.get(entity_id)
+            if record and self.entity_cache.is_fresh(record, self.entity_cache_ttl_hours):
+                resolved[entity_id] = self._entity_from_record(record)
+                metrics.inc('cache_lookups', cache='entity', result='hit')
+                continue
+            metrics.inc('cache_lookups', cache='entity', result='miss')
+            
+            peer_id, peer_type = utils.resolve_id(entity_id)
+            if peer_type is PeerChat:
+                stale_chats[peer_id] = entity_id
+                continue
+            if peer_type is not PeerChannel:
+                continue
+            
+            # 頻道需要 access hash，優先使用快取中的記錄，其次是 session 中保存的實體
+            access_hash = record.get('access_hash') if record else None
+            if access_hash is None:
+                try:
+                    input_peer = await self.client.get_input_entity(entity_id)
+                    access_hash = getattr(input_peer, 'access_hash', None)
+                except Exception as e:
+                    logger.warning(f"無法取得群組 {entity_id} 的 access hash: {e}")
+            if access_hash is not None:
+                stale_channels[peer_id] = (entity_id, access_hash)
+        
+        if not stale_channels and not stale_chats:
+            return resolved
+        
+        logger.info(f"批次重新獲取 {len(stale_channels) + len(stale_chats)} 個群組實體")
+        requests = []
+        if stale_channels:
+            requests.append(self.client(GetChannelsRequest([
+                InputChannel(peer_id, access_hash) for peer_id, (_, access_hash) in stale_channels.items()
+            ])))
+        if stale_chats:
+            requests.append(self.client(GetChatsRequest(list(stale_chats.keys()))))
+        
+        # 頻道與一般群組的請求同時送出，只需等待一個往返時間
+        for result in await asyncio.gather(*requests, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"批次獲取群組實體失敗: {result}")
+                continue
+            for chat in result.chats:
+                entity_id = utils.get_peer_id(chat)
+                self._cache_entity(chat)
+                if entity_id in entity_ids:
+                    resolved[entity_id] = chat
+        
+        self.entity_cache.save()
+        return resolved
+    
+    def _cache_entity(self, entity):
+        """將實體資訊寫入快取（只在記憶體中更新，需另外呼叫 save）
+        
+        Args:
+            entity: Telegram 群組或頻道實體
+        """
+        if not isinstance(entity, (Chat, Channel)):
+            return
+        self.entity_cache.update(utils.get_peer_id(entity), {
+            'id': utils.get_peer_id(entity),
+            'peer_id': entity.id,
+            'access_hash': getattr(entity, 'access_hash', None),
+            'type': 'channel' if isinstance(entity, Channel) else 'chat',
+            'title': entity.title,
+            'participants_count': getattr(entity, 'participants_count', None),
+            'megagroup': getattr(entity, 'megagroup', None),
+            'broadcast': getattr(entity, 'broadcast', None)
+        })
+    
+    @staticmethod
+    def _entity_from_record(record: Dict[str, Any]):
+        """將快取記錄還原為 Telethon 實體，可直接用於後續的 API 請求
+        
+        Args:
+            record: 實體記錄
+            
+        Returns:
+            Entity: Channel 或 Chat 實體
+        """
+        if record['type'] == 'channel':
+            return Channel(
+                id=record['peer_id'],
+                title=record['title'],
+                photo=ChatPhotoEmpty(),
+                date=None,
+                access_hash=record['access_hash'],
+                megagroup=record.get('megagroup'),
+                broadcast=record.get('broadcast'),
+                participants_count=record.get('participants_count')
+            )
+        return Chat(
+            id=record['peer_id'],
+            title=record['title'],
+            photo=ChatPhotoEmpty(),
+            participants_count=record.get('participants_count') or 0,
+            date=None,
+            version=0
+        )
             
+    def get_request_stats(self) -> Dict[str, Dict[str, Any]]:
+        """取得本帳號各請求類型的統計
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 請求類型名稱對應的統計
+        """
+        return self.scheduler.get_stats()
+    
+    def log_request_stats(self, reset=False):
+        """將請求統計寫入日誌
+        
+        Args:
+            reset: 寫入後是否清除統計（常駐模式下每個工作分開計算）
+        """
+        self.scheduler.log_summary(self.session_name)
+        if reset:
+            self.scheduler.reset()
+    
     async def close(self):
         """關閉客戶端連接"""
         if self.client.is_connected():
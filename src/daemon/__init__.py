@@ -0,0 +1,28 @@
+"""
+常駐服務模組
+此包含常駐連線的服務端與提交工作的客戶端
+
+各函數與類別在第一次被存取時才匯入
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    'submit_job': 'src.daemon.client',
+    'ping_daemon': 'src.daemon.client',
+    'GroupScheduler': 'src.daemon.scheduler',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
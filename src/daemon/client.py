@@ -0,0 +1,69 @@
+"""
+常駐服務客戶端模組
+將分析工作提交給已在執行中的常駐服務
+"""
+import json
+import asyncio
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 更新導入路徑
+from config.settings import DAEMON_SOCKET_PATH
+from src.utils.logger import logger
+
+
+async def _send_request(request: Dict[str, Any], socket_path: Path = DAEMON_SOCKET_PATH,
+                        timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """發送一個請求到常駐服務
+
+    Args:
+        request: 請求內容
+        socket_path: 控制 socket 路徑
+        timeout: 等待回覆的秒數上限，None 表示不限制
+
+    Returns:
+        Optional[Dict[str, Any]]: 回覆內容，若常駐服務未執行則返回 None
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        logger.info(f"無法連線到常駐服務: {e}")
+        return None
+
+    try:
+        writer.write(json.dumps(request, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        return json.loads(line.decode('utf-8')) if line else None
+    finally:
+        writer.close()
+
+
+async def ping_daemon(socket_path: Path = DAEMON_SOCKET_PATH) -> Optional[Dict[str, Any]]:
+    """檢查常駐服務是否在執行
+
+    Args:
+        socket_path: 控制 socket 路徑
+
+    Returns:
+        Optional[Dict[str, Any]]: 常駐服務狀態，未執行則返回 None
+    """
+    return await _send_request({'action': 'ping'}, socket_path, timeout=5)
+
+
+async def submit_job(argv: List[str], groups: Optional[List[Dict[str, Any]]] = None,
+                     socket_path: Path = DAEMON_SOCKET_PATH) -> Optional[Dict[str, Any]]:
+    """提交分析工作並等待完成
+
+    Args:
+        argv: 傳給常駐服務的命令行參數
+        groups: 要分析的群組，None 表示由常駐服務使用歷史記錄
+        socket_path: 控制 socket 路徑
+
+    Returns:
+        Optional[Dict[str, Any]]: 工作結果，常駐服務未執行則返回 None
+    """
+    request = {'action': 'analyze', 'argv': argv}
+    if groups:
+        request['groups'] = groups
+    return await _send_request(request, socket_path)
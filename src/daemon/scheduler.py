@@ -0,0 +1,271 @@
+"""
+內建排程器模組
+依設定檔為每個群組安排執行時間，將工作平均分散並加入隨機抖動，在常駐服務的同一個連線上依序執行
+"""
+import random
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+# 更新導入路徑
+from config.settings import SCHEDULE_FILE
+from config.constants import (
+    DEFAULT_DAYS, DEFAULT_TOP_COUNT, SCHEDULE_DEFAULT_INTERVAL_HOURS,
+    SCHEDULE_JITTER_RATIO, SCHEDULE_RELOAD_SECONDS
+)
+from src.utils.logger import logger
+from src.utils.metrics import export_metrics
+from data.atomic_io import read_json
+from data.storage import GroupHistoryManager
+
+# 群組設定中可覆寫預設值的欄位
+_ENTRY_FIELDS = ['interval_hours', 'days', 'top', 'forward', 'save', 'save_format', 'forward_mode']
+
+
+@dataclass
+class ScheduleEntry:
+    """單個群組的排程狀態"""
+    group: Dict[str, Any]
+    interval: timedelta
+    argv: List[str]
+    forward: bool
+    next_run: datetime
+    last_run: Optional[datetime] = None
+    last_status: Optional[str] = None
+    runs: int = 0
+
+
+def build_entry_argv(settings: Dict[str, Any]) -> List[str]:
+    """將群組的排程設定轉為命令行參數
+
+    Args:
+        settings: 合併預設值後的群組設定
+
+    Returns:
+        List[str]: 命令行參數列表
+    """
+    argv = ['--days', str(settings['days']), '--top', str(settings['top']), '--use-history', 'yes']
+    if settings.get('save'):
+        argv.append('--save')
+    if settings.get('save_format'):
+        argv += ['--save-format', settings['save_format']]
+    if settings.get('forward_mode'):
+        argv += ['--forward-mode', settings['forward_mode']]
+    return argv
+
+
+class GroupScheduler:
+    """內建排程器
+
+    設定檔格式：
+        {
+          "defaults": {"interval_hours": 24, "days": 7, "top": 10, "forward": true, "save": true},
+          "groups": [{"id": 123, "name": "群組", "interval_hours": 6, "days": 1, "forward": false}]
+        }
+    省略 groups 時使用歷史記錄中的群組。設定檔修改後會自動重新載入，不需重新啟動
+    """
+
+    def __init__(self, pipeline, parse_args: Callable[[List[str]], Any], config_path: Path = SCHEDULE_FILE,
+                 jitter_ratio=SCHEDULE_JITTER_RATIO, reload_seconds=SCHEDULE_RELOAD_SECONDS):
+        """初始化排程器
+
+        Args:
+            pipeline: 分析流程實例
+            parse_args: 將參數列表解析為命令行參數的函數
+            config_path: 排程設定檔路徑
+            jitter_ratio: 隨機抖動佔執行間隔的比例
+            reload_seconds: 檢查設定檔是否變更的間隔（秒）
+        """
+        self.pipeline = pipeline
+        self.parse_args = parse_args
+        self.config_path = Path(config_path)
+        self.jitter_ratio = jitter_ratio
+        self.reload_seconds = reload_seconds
+
+        self.entries: Dict[int, ScheduleEntry] = {}
+        self._config_mtime = None
+
+    def load_config(self) -> Dict[int, Dict[str, Any]]:
+        """讀取排程設定檔
+
+        Returns:
+            Dict[int, Dict[str, Any]]: 群組 ID 對應的群組信息與合併預設值後的設定
+
+        Raises:
+            ValueError: 設定檔內容無效時
+        """
+        config = read_json(self.config_path)
+        defaults = {
+            'interval_hours': SCHEDULE_DEFAULT_INTERVAL_HOURS,
+            'days': DEFAULT_DAYS,
+            'top': DEFAULT_TOP_COUNT,
+            'forward': True,
+            'save': False,
+        }
+        defaults.update(config.get('defaults', {}))
+
+        history = {group['id']: group for group in GroupHistoryManager.load_group_history()}
+        groups = config.get('groups')
+        if groups is None:
+            groups = list(history.values())
+
+        settings = {}
+        for group in groups:
+            if 'id' not in group:
+                raise ValueError(f"排程設定中的群組缺少 id: {group}")
+            merged = dict(defaults)
+            merged.update({key: group[key] for key in _ENTRY_FIELDS if key in group})
+            if float(merged['interval_hours']) <= 0:
+                raise ValueError(f"群組 {group['id']} 的 interval_hours 必須大於 0")
+            name = group.get('name') or history.get(group['id'], {}).get('name') or str(group['id'])
+            settings[group['id']] = {'group': {'id': group['id'], 'name': name}, 'settings': merged}
+        return settings
+
+    def _jitter(self, interval: timedelta) -> timedelta:
+        """產生隨機抖動，避免多個群組在重新排程後又對齊到同一時間"""
+        return interval * random.uniform(-self.jitter_ratio, self.jitter_ratio)
+
+    def apply_config(self, config: Dict[int, Dict[str, Any]], now: Optional[datetime] = None):
+        """套用排程設定
+
+        間隔未變更的群組保留原本的下次執行時間；新加入的群組在各自的間隔內平均錯開
+
+        Args:
+            config: load_config 的結果
+            now: 目前時間，預設為現在
+        """
+        now = now or datetime.now()
+        entries = {}
+        added = []
+        for group_id, item in config.items():
+            settings = item['settings']
+            interval = timedelta(hours=float(settings['interval_hours']))
+            previous = self.entries.get(group_id)
+            entry = ScheduleEntry(
+                group=item['group'],
+                interval=interval,
+                argv=build_entry_argv(settings),
+                forward=bool(settings['forward']),
+                next_run=now
+            )
+            if previous is not None:
+                entry.last_run = previous.last_run
+                entry.last_status = previous.last_status
+                entry.runs = previous.runs
+                if previous.interval == interval:
+                    entry.next_run = previous.next_run
+                elif previous.last_run is not None:
+                    entry.next_run = max(now, previous.last_run + interval)
+                else:
+                    added.append(entry)
+            else:
+                added.append(entry)
+            entries[group_id] = entry
+
+        # 第 i 個新群組排在間隔的 i/N 處，再加上抖動
+        for index, entry in enumerate(added):
+            offset = entry.interval * index / len(added)
+            entry.next_run = now + max(timedelta(0), offset + self._jitter(entry.interval) / len(added))
+
+        self.entries = entries
+        logger.info(f"排程器已載入 {len(entries)} 個群組（新增 {len(added)} 個）")
+
+    def reload_if_changed(self) -> bool:
+        """設定檔變更時重新載入，內容無效時保留原本的排程
+
+        Returns:
+            bool: 是否重新載入
+        """
+        try:
+            mtime = self.config_path.stat().st_mtime
+        except FileNotFoundError:
+            if self._config_mtime is None:
+                logger.error(f"找不到排程設定檔: {self.config_path}")
+                self._config_mtime = 0
+            return False
+        if mtime == self._config_mtime:
+            return False
+
+        self._config_mtime = mtime
+        try:
+            self.apply_config(self.load_config())
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"排程設定檔無效，保留原本的排程: {e}")
+            return False
+        return True
+
+    async def run(self, stop_event: asyncio.Event, job_lock: asyncio.Lock):
+        """依排程執行工作，直到 stop_event 被設定
+
+        Args:
+            stop_event: 停止事件
+            job_lock: 與其他工作共用的鎖，確保同一時間只有一個工作使用客戶端
+        """
+        while not stop_event.is_set():
+            self.reload_if_changed()
+
+            now = datetime.now()
+            due = [entry for entry in self.entries.values() if entry.next_run <= now]
+            if due:
+                entry = min(due, key=lambda item: item.next_run)
+                async with job_lock:
+                    await self.run_entry(entry)
+                continue
+
+            # 等到下一個工作的時間，但至少每 reload_seconds 檢查一次設定檔
+            timeout = self.reload_seconds
+            if self.entries:
+                next_run = min(entry.next_run for entry in self.entries.values())
+                timeout = min(timeout, max(0.0, (next_run - now).total_seconds()))
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_entry(self, entry: ScheduleEntry):
+        """執行單個群組的排程工作
+
+        Args:
+            entry: 排程狀態
+        """
+        started = datetime.now()
+        logger.info(f"排程執行群組 {entry.group['name']}")
+        try:
+            args = self.parse_args(entry.argv)
+            if getattr(args, 'forward_mode', None):
+                self.pipeline.message_forwarder.forward_mode = args.forward_mode
+            await self.pipeline.prepare_groups([entry.group])
+            summary = await self.pipeline.run_group(entry.group, args, forward=entry.forward)
+            entry.last_status = summary['status']
+        except Exception as e:
+            logger.error(f"排程執行群組 {entry.group['name']} 時發生錯誤: {e}", exc_info=True)
+            entry.last_status = 'error'
+        finally:
+            self.pipeline.client_manager.log_request_stats(reset=True)
+            export_metrics('schedule', reset=True)
+
+        entry.last_run = started
+        entry.runs += 1
+        # 以開始時間計算下次執行，執行時間長短不會讓排程逐漸往後漂移
+        entry.next_run = max(datetime.now(), started + entry.interval + self._jitter(entry.interval))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """取得各群組的排程狀態
+
+        Returns:
+            List[Dict[str, Any]]: 依下次執行時間排序的排程狀態
+        """
+        return [
+            {
+                'id': entry.group['id'],
+                'name': entry.group['name'],
+                'interval_hours': entry.interval.total_seconds() / 3600,
+                'next_run': entry.next_run,
+                'last_run': entry.last_run,
+                'last_status': entry.last_status,
+                'runs': entry.runs,
+            }
+            for entry in sorted(self.entries.values(), key=lambda item: item.next_run)
+        ]
@@ -0,0 +1,201 @@
+"""
+常駐服務端模組
+維持一個已連線的 Telegram 客戶端，透過本機 Unix socket 接收分析工作
+"""
+import os
+import json
+import signal
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List
+
+# 更新導入路徑
+from config.settings import DAEMON_SOCKET_PATH
+from config.constants import PENDING_DRAIN_INTERVAL_SECONDS
+from src.utils.logger import logger
+from src.utils.metrics import export_metrics
+from data.storage import GroupHistoryManager
+
+
+class ReviewerDaemon:
+    """常駐服務，讓多次執行共用同一個連線與實體、發送者快取"""
+
+    def __init__(self, client_manager, pipeline, parse_args: Callable[[List[str]], Any],
+                 socket_path: Path = DAEMON_SOCKET_PATH, live_ingestor=None, run_coordinator=None,
+                 scheduler=None):
+        """初始化常駐服務
+
+        Args:
+            client_manager: Telegram客戶端管理器實例
+            pipeline: 分析流程實例
+            parse_args: 將工作參數 (argv 列表) 解析為命令行參數的函數
+            socket_path: 控制 socket 路徑
+            live_ingestor: 即時收錄服務實例（可選），啟動時開始追蹤歷史記錄中的群組
+            run_coordinator: 執行協調器實例（可選），定期執行其他程序加入待處理檔案的群組
+            scheduler: 內建排程器實例（可選），依設定檔為各群組錯開執行
+        """
+        self.client_manager = client_manager
+        self.pipeline = pipeline
+        self.parse_args = parse_args
+        self.socket_path = Path(socket_path)
+        self.live_ingestor = live_ingestor
+        self.run_coordinator = run_coordinator
+        self.scheduler = scheduler
+
+        # 同一時間只執行一個工作，避免多個工作同時使用同一個客戶端
+        self._job_lock = asyncio.Lock()
+        self._stop_event = asyncio.Event()
+        self._started_at = None
+        self._jobs_completed = 0
+
+    async def serve_forever(self):
+        """連線到 Telegram 並開始接收工作，直到收到停止指令"""
+        await self.client_manager.connect()
+
+        # 移除上次異常結束留下的 socket 檔案
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+        # 即時收錄：訂閱群組更新，之後的報告直接從本機資料庫取得訊息
+        if self.live_ingestor is not None:
+            await self.live_ingestor.start(GroupHistoryManager.load_group_history())
+
+        # 收到 SIGTERM 時正常停止，讓 socket 檔案被清除
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.stop)
+
+        server = await asyncio.start_unix_server(self._handle_connection, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)  # 只允許本機同一使用者提交工作
+        self._started_at = datetime.now()
+        logger.info(f"常駐服務已啟動，控制 socket: {self.socket_path}")
+
+        background_tasks = []
+        if self.run_coordinator is not None:
+            background_tasks.append(asyncio.create_task(self._drain_pending_loop()))
+        if self.scheduler is not None:
+            background_tasks.append(asyncio.create_task(self.scheduler.run(self._stop_event, self._job_lock)))
+
+        try:
+            async with server:
+                await self._stop_event.wait()
+        finally:
+            for task in background_tasks:
+                task.cancel()
+            if self.live_ingestor is not None:
+                await self.live_ingestor.stop()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            logger.info("常駐服務已停止")
+
+    def stop(self):
+        """停止常駐服務"""
+        self._stop_event.set()
+
+    async def _drain_pending_loop(self):
+        """定期執行待處理檔案中的群組
+
+        常駐服務持有執行鎖，排程直接執行（或提交失敗後改為直接執行）時會將群組加入待處理檔案
+        """
+        while True:
+            await asyncio.sleep(PENDING_DRAIN_INTERVAL_SECONDS)
+            if self._job_lock.locked():
+                continue
+            for job in self.run_coordinator.take_pending():
+                try:
+                    async with self._job_lock:
+                        await self.run_job(job)
+                    self._jobs_completed += 1
+                except Exception as e:
+                    logger.error(f"執行待處理群組時發生錯誤: {e}", exc_info=True)
+
+    async def _handle_connection(self, reader, writer):
+        """處理一個控制連線：讀取一行 JSON 請求並回覆一行 JSON 結果
+
+        Args:
+            reader: 串流讀取器
+            writer: 串流寫入器
+        """
+        try:
+            line = await reader.readline()
+            request = json.loads(line.decode('utf-8')) if line else {}
+            response = await self._dispatch(request)
+        except Exception as e:
+            logger.error(f"處理常駐服務請求時發生錯誤: {e}", exc_info=True)
+            response = {'ok': False, 'error': str(e)}
+
+        try:
+            writer.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """依請求的 action 執行對應動作
+
+        Args:
+            request: 請求內容
+
+        Returns:
+            Dict[str, Any]: 回覆內容
+        """
+        action = request.get('action')
+
+        if action == 'ping':
+            return {
+                'ok': True,
+                'pid': os.getpid(),
+                'started_at': self._started_at,
+                'jobs_completed': self._jobs_completed,
+                'busy': self._job_lock.locked(),
+                'requests': self.client_manager.get_request_stats(),
+                'live_groups': list(self.live_ingestor.chats) if self.live_ingestor is not None else [],
+                'schedule': self.scheduler.status() if self.scheduler is not None else []
+            }
+
+        if action == 'shutdown':
+            self.stop()
+            return {'ok': True}
+
+        if action == 'analyze':
+            async with self._job_lock:
+                results = await self.run_job(request)
+            self._jobs_completed += 1
+            return {'ok': all(r['status'] != 'error' for r in results), 'results': results}
+
+        return {'ok': False, 'error': f"未知的動作: {action}"}
+
+    async def run_job(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """執行一個分析工作
+
+        Args:
+            request: 工作內容，argv 為命令行參數列表，groups 為要分析的群組（預設使用歷史記錄）
+
+        Returns:
+            List[Dict[str, Any]]: 各群組的分析摘要
+        """
+        argv = request.get('argv') or []
+        try:
+            args = self.parse_args(argv)
+        except SystemExit:
+            # argparse 遇到無效參數會直接結束程式，常駐服務中改為回報錯誤
+            raise ValueError(f"無效的工作參數: {' '.join(argv)}")
+        groups = request.get('groups') or GroupHistoryManager.load_group_history()
+
+        # 每個工作可以指定自己的轉發模式
+        if getattr(args, 'forward_mode', None):
+            self.pipeline.message_forwarder.forward_mode = args.forward_mode
+
+        logger.info(f"開始執行常駐服務工作: {len(groups)} 個群組")
+        await self.pipeline.prepare_groups(groups)
+        results = []
+        for group in groups:
+            try:
+                results.append(await self.pipeline.run_group(group, args))
+            except Exception as e:
+                logger.error(f"分析群組 {group.get('name')} 時發生錯誤: {e}", exc_info=True)
+                results.append({'id': group.get('id'), 'name': group.get('name'), 'status': 'error', 'error': str(e)})
+        
+        # 每個工作分開統計請求數與 FloodWait，並各自輸出一份執行指標
+        self.client_manager.log_request_stats(reset=True)
+        export_metrics('daemon', reset=True)
+        return results
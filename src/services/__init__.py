@@ -1,8 +1,33 @@
 """
 服務層模組
 此包含所有核心業務邏輯
+
+各服務在第一次被存取時才匯入，匯入此包本身不會載入 pandas 或 Telethon
 """
 
-from src.services.message_analyzer import MessageAnalyzer
-from src.services.message_fetcher import MessageFetcher
-from src.services.message_forwarder import MessageForwarder
\ No newline at end of file
+from importlib import import_module
+
+_EXPORTS = {
+    'MessageAnalyzer': 'src.services.message_analyzer',
+    'MessageFetcher': 'src.services.message_fetcher',
+    'MessageForwarder': 'src.services.message_forwarder',
+    'DigestRenderer': 'src.services.digest_renderer',
+    'AnalysisPipeline': 'src.services.analysis_pipeline',
+    'LiveIngestor': 'src.services.live_ingestor',
+    'RunCoordinator': 'src.services.run_coordinator',
+    'QueueWorker': 'src.services.queue_worker',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,214 @@
+"""
+分析流程服務
+以非互動方式完成單個群組的獲取、分析、保存與轉發
+"""
+from typing import Dict, List, Any, Optional
+
+# 更新導入路徑
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils import profiling, tracing
+from config.settings import RESULTS_DIR
+from config.constants import DEFAULT_RANK_METRIC
+from data.storage import ResultsStorage
+
+
+class AnalysisPipeline:
+    """分析流程服務，供互動介面、常駐服務等不同執行模式共用"""
+
+    def __init__(self, client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage=None,
+                 live_ingestor=None):
+        """初始化分析流程
+
+        Args:
+            client_manager: Telegram客戶端管理器實例
+            message_fetcher: 訊息獲取器實例
+            message_analyzer: 訊息分析器實例
+            message_forwarder: 訊息轉發器實例
+            results_storage: 結果儲存管理器實例（可選）
+            live_ingestor: 即時收錄服務實例（可選），已收錄的群組直接從本機資料庫取得訊息
+        """
+        self.client_manager = client_manager
+        self.message_fetcher = message_fetcher
+        self.message_analyzer = message_analyzer
+        self.message_forwarder = message_forwarder
+        self.results_storage = results_storage
+        self.live_ingestor = live_ingestor
+        # 已解析的群組實體，常駐模式下可在多次工作之間重複使用
+        self._entities = {}
+
+    async def resolve_entity(self, group: Dict[str, Any]):
+        """取得群組實體
+
+        Args:
+            group: 群組信息（從對話列表或歷史記錄取得）
+
+        Returns:
+            Entity: Telegram 實體對象，失敗時返回 None
+        """
+        if group.get('entity') is not None:
+            return group['entity']
+
+        entity = self._entities.get(group['id'])
+        if entity is None:
+            entity = await self.client_manager.get_entity(group['id'])
+            if entity is not None:
+                self._entities[group['id']] = entity
+        return entity
+
+    async def prepare_groups(self, groups: List[Dict[str, Any]]):
+        """批次解析所有群組的實體，讓後續分析不必逐一請求
+
+        Args:
+            groups: 群組信息列表
+        """
+        pending = [group['id'] for group in groups
+                   if group.get('entity') is None and group['id'] not in self._entities]
+        if not pending:
+            return
+        self._entities.update(await self.client_manager.resolve_entities(pending))
+
+    @staticmethod
+    def build_top_messages(analysis_results: Dict, messages: List[Dict], top_count: int) -> List[Dict[str, Any]]:
+        """整理要轉發的熱門訊息清單
+
+        Args:
+            analysis_results: 分析結果字典
+            messages: 已獲取的原始訊息列表
+            top_count: 熱門訊息數量
+
+        Returns:
+            List[Dict[str, Any]]: 熱門訊息資料列表
+        """
+        top_messages = []
+        if 'most_reactions' not in analysis_results or len(analysis_results['most_reactions']) == 0:
+            return top_messages
+
+        messages_by_id = {msg['id']: msg for msg in messages}
+
+        # 取得最多反應的訊息，使用 top_count 限制數量
+        top_df = analysis_results['most_reactions'].head(top_count)
+        for _, row in top_df.iterrows():
+            msg_id = row['id']
+            orig_msg = messages_by_id.get(msg_id)
+            if orig_msg is None:
+                continue
+            top_messages.append({
+                'id': msg_id,
+                'text': orig_msg['text'],
+                'message': msg_id,  # 只保存訊息ID，稍後使用ID在目標群組中找到對應訊息
+                'total_reactions': orig_msg.get('total_reactions', 0),
+                'reply_count': orig_msg.get('reply_count', 0),
+                'reactions_detail': row.get('reactions_detail', ''),
+                'display_name': row.get('display_name', ''),
+                'date': orig_msg.get('date'),
+                'has_media': orig_msg.get('has_media', False)
+            })
+        return top_messages
+
+    @staticmethod
+    def get_forwarding_days(args, analysis_results: Optional[Dict]) -> int:
+        """決定要傳遞給轉發器的時間範圍
+
+        Args:
+            args: 命令行參數
+            analysis_results: 分析結果字典
+
+        Returns:
+            int: 時間範圍（天數）
+        """
+        if args.start_date is not None and args.end_date is not None:
+            # 如果指定了起始日期，計算日期範圍
+            return (args.end_date - args.start_date).days + 1
+        if args.days is not None:
+            return args.days
+        # 如果沒有指定天數，則使用分析結果中的時間範圍
+        if analysis_results and 'period' in analysis_results:
+            period = analysis_results['period']
+            return (period['end'] - period['start']).days + 1
+        return 30  # 預設值
+
+    async def run_group(self, group: Dict[str, Any], args, forward: bool = True,
+                        storage_target=None) -> Dict[str, Any]:
+        """以非互動方式分析單個群組
+
+        Args:
+            group: 群組信息
+            args: 命令行參數
+            forward: 是否將熱門訊息轉發到儲存群組
+            storage_target: 指定的轉發目標（群組 ID 或使用者名稱，可選），預設為與群組對應的儲存群組
+
+        Returns:
+            Dict[str, Any]: 群組分析摘要，status 為 'ok'、'no_messages' 或 'error'
+        """
+        # 群組內的所有區段（包括 RPC）都帶上群組標籤
+        with tracing.group_context(group['id']), tracing.span(f"group {group['name']}", 'group'):
+            return await self._run_group(group, args, forward, storage_target)
+
+    async def _run_group(self, group: Dict[str, Any], args, forward: bool, storage_target) -> Dict[str, Any]:
+        """run_group 的實作"""
+        summary = {'id': group['id'], 'name': group['name'], 'status': 'ok'}
+
+        entity = await self.resolve_entity(group)
+        if entity is None:
+            summary['status'] = 'error'
+            summary['error'] = '無法獲取群組實體'
+            return summary
+
+        messages = None
+        if self.live_ingestor is not None:
+            messages = self.live_ingestor.get_messages(group['id'], args.start_date, args.end_date)
+        if messages is None:
+            messages = await self.message_fetcher.get_recent_messages(
+                entity,
+                days=args.days,
+                start_date=args.start_date,
+                end_date=args.end_date
+            )
+        profiling.checkpoint(f"fetch {group['name']}")
+        if not messages:
+            summary['status'] = 'no_messages'
+            return summary
+
+        with metrics.stage('analyze', group=group['id']):
+            analysis_results = self.message_analyzer.analyze_messages(
+                messages, top_limit=args.top, rank_by=getattr(args, 'rank_by', DEFAULT_RANK_METRIC)
+            )
+        profiling.checkpoint(f"analyze {group['name']}")
+        self.message_analyzer.record_metrics(analysis_results, group['id'])
+        top_messages = self.build_top_messages(analysis_results, messages, args.top)
+        summary.update({
+            'total_messages': analysis_results['total_messages'],
+            'unique_users': int(analysis_results['unique_users']),
+            'top_messages': [
+                {'id': int(msg['id']), 'total_reactions': int(msg['total_reactions'])}
+                for msg in top_messages
+            ]
+        })
+
+        # 保存分析結果（如果需要）
+        if getattr(args, 'save', False):
+            if self.results_storage is None:
+                self.results_storage = ResultsStorage(RESULTS_DIR)
+            # 每個工作可以指定自己的保存格式
+            if getattr(args, 'save_format', None):
+                self.results_storage.output_format = args.save_format
+            with metrics.stage('save', group=group['id']):
+                saved_path = self.message_analyzer.save_analysis_results(
+                    analysis_results, group['name'], self.results_storage, group_id=group['id']
+                )
+            summary['saved_path'] = str(saved_path) if saved_path else None
+
+        if forward:
+            with metrics.stage('forward', group=group['id']):
+                summary['forwarded'] = await self.message_forwarder.forward_top_messages_to_storage_group(
+                    entity,
+                    top_messages,
+                    self.get_forwarding_days(args, analysis_results),
+                    all_messages=messages,
+                    analysis_results=analysis_results,
+                    storage_target=storage_target
+                )
+
+        logger.info(f"群組 {group['name']} 分析完成: {summary['total_messages']} 則訊息")
+        return summary
@@ -0,0 +1,196 @@
+"""
+批次執行服務
+依群組設定檔以非互動方式分析多個群組，可同時執行多個群組並輸出機器可讀的結果
+"""
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+# 更新導入路徑
+from config.constants import (
+    DEFAULT_DAYS, DEFAULT_TOP_COUNT, RANK_METRICS, DEFAULT_RANK_METRIC,
+    RESULTS_FORMATS, FORWARD_MODES, BATCH_DEFAULT_CONCURRENCY
+)
+from src.utils.logger import logger
+from data.atomic_io import read_json
+
+# 結束代碼
+EXIT_OK = 0               # 所有群組都已完成（包括沒有訊息的群組）
+EXIT_GROUP_FAILED = 1     # 至少一個群組分析失敗
+EXIT_CONFIG_ERROR = 2     # 設定檔無效
+EXIT_CONNECTION_ERROR = 3 # 無法連線到 Telegram
+EXIT_BUSY = 4             # 同一會話已有執行中的分析
+
+# 群組設定中可覆寫預設值的欄位
+_GROUP_FIELDS = ['days', 'start_date', 'top', 'rank_by', 'forward', 'forward_to', 'save', 'save_format']
+
+
+def load_batch_config(path: Path) -> Dict[str, Any]:
+    """讀取並驗證批次設定檔（JSON 或 YAML）
+
+    設定檔格式：
+        concurrency: 3
+        forward_mode: digest
+        defaults: {days: 7, top: 10, rank_by: total_reactions, forward: true, forward_to: null, save: true}
+        groups:
+          - {id: -1001234567890, name: 新聞群組, days: 1, forward_to: "@my_channel"}
+
+    Args:
+        path: 設定檔路徑
+
+    Returns:
+        Dict[str, Any]: concurrency、forward_mode 與合併預設值後的 groups
+
+    Raises:
+        ValueError: 設定檔內容無效時
+    """
+    path = Path(path)
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("讀取 YAML 設定檔需要安裝 PyYAML (pip install pyyaml)，或改用 JSON 格式")
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    else:
+        config = read_json(path)
+
+    defaults = {
+        'days': DEFAULT_DAYS,
+        'top': DEFAULT_TOP_COUNT,
+        'rank_by': DEFAULT_RANK_METRIC,
+        'forward': True,
+        'forward_to': None,
+        'save': False,
+    }
+    defaults.update(config.get('defaults') or {})
+
+    groups = config.get('groups')
+    if not groups:
+        raise ValueError("設定檔中沒有任何群組 (groups)")
+
+    items = []
+    for group in groups:
+        if not isinstance(group, dict) or 'id' not in group:
+            raise ValueError(f"群組設定缺少 id: {group}")
+        settings = dict(defaults)
+        settings.update({key: group[key] for key in _GROUP_FIELDS if key in group})
+        if settings['rank_by'] not in RANK_METRICS:
+            raise ValueError(f"群組 {group['id']} 的 rank_by 無效: {settings['rank_by']}，可用指標: {', '.join(RANK_METRICS)}")
+        if settings.get('save_format') and settings['save_format'] not in RESULTS_FORMATS:
+            raise ValueError(f"群組 {group['id']} 的 save_format 無效: {settings['save_format']}")
+        items.append({
+            'group': {'id': int(group['id']), 'name': group.get('name') or str(group['id'])},
+            'settings': settings,
+        })
+
+    forward_mode = config.get('forward_mode')
+    if forward_mode is not None and forward_mode not in FORWARD_MODES:
+        raise ValueError(f"forward_mode 無效: {forward_mode}")
+
+    return {
+        'concurrency': int(config.get('concurrency') or BATCH_DEFAULT_CONCURRENCY),
+        'forward_mode': forward_mode,
+        'output': config.get('output'),
+        'groups': items,
+    }
+
+
+def build_group_argv(settings: Dict[str, Any]) -> List[str]:
+    """將群組設定轉為命令行參數
+
+    Args:
+        settings: 合併預設值後的群組設定
+
+    Returns:
+        List[str]: 命令行參數列表
+    """
+    argv = ['--days', str(settings['days']), '--top', str(settings['top']), '--rank-by', settings['rank_by']]
+    if settings.get('start_date'):
+        argv += ['--start-date', str(settings['start_date'])]
+    if settings.get('save'):
+        argv.append('--save')
+    if settings.get('save_format'):
+        argv += ['--save-format', settings['save_format']]
+    return argv
+
+
+class BatchRunner:
+    """批次執行器，不經過任何終端介面，逐一回報各群組的結果"""
+
+    def __init__(self, pipeline, parse_args: Callable[[List[str]], Any],
+                 concurrency: int = BATCH_DEFAULT_CONCURRENCY, on_result: Optional[Callable[[Dict], None]] = None):
+        """初始化批次執行器
+
+        Args:
+            pipeline: 分析流程實例
+            parse_args: 將參數列表解析為命令行參數的函數
+            concurrency: 同時分析的群組數
+            on_result: 每個群組完成時呼叫的函數（可選），例如輸出一行 JSON
+        """
+        self.pipeline = pipeline
+        self.parse_args = parse_args
+        self.concurrency = max(1, concurrency)
+        self.on_result = on_result
+
+    async def run(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """分析所有群組
+
+        Args:
+            items: load_batch_config 產生的群組設定
+
+        Returns:
+            List[Dict[str, Any]]: 各群組的分析摘要（與設定檔順序相同）
+        """
+        # 一次解析所有群組實體，之後各群組不必再個別請求
+        await self.pipeline.prepare_groups([item['group'] for item in items])
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_item(item):
+            async with semaphore:
+                return await self.run_item(item)
+
+        # 以群組名稱命名任務，追蹤檔案中每個群組顯示為獨立的一列
+        return await asyncio.gather(*(
+            asyncio.create_task(run_item(item), name=f"group {item['group']['name']}") for item in items
+        ))
+
+    async def run_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """分析單個群組
+
+        Args:
+            item: 群組設定
+
+        Returns:
+            Dict[str, Any]: 分析摘要，status 為 'ok'、'no_messages' 或 'error'
+        """
+        group = item['group']
+        settings = item['settings']
+        started = time.monotonic()
+        try:
+            args = self.parse_args(build_group_argv(settings))
+            summary = await self.pipeline.run_group(
+                group, args, forward=bool(settings['forward']), storage_target=settings.get('forward_to')
+            )
+        except Exception as e:
+            logger.error(f"批次分析群組 {group['name']} 時發生錯誤: {e}", exc_info=True)
+            summary = {'id': group['id'], 'name': group['name'], 'status': 'error', 'error': str(e)}
+
+        summary['rank_by'] = settings['rank_by']
+        summary['duration_seconds'] = round(time.monotonic() - started, 3)
+        if self.on_result is not None:
+            self.on_result(summary)
+        return summary
+
+    @staticmethod
+    def exit_code(summaries: List[Dict[str, Any]]) -> int:
+        """依各群組的結果決定結束代碼"""
+        return EXIT_GROUP_FAILED if any(summary['status'] == 'error' for summary in summaries) else EXIT_OK
+
+
+def print_result_line(summary: Dict[str, Any]):
+    """以一行 JSON 輸出單個群組的結果"""
+    print(json.dumps(summary, ensure_ascii=False, default=str), flush=True)
@@ -0,0 +1,185 @@
+"""
+摘要渲染服務
+將熱門訊息摘要打包為盡可能少的 Telegram 訊息
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+# Telegram 單則訊息的字數上限（以 UTF-16 編碼單位計算）
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# 每則熱門訊息在摘要中保留的內容長度
+DEFAULT_EXCERPT_LENGTH = 280
+
+# Telethon markdown 會解析的標記，出現在使用者內容中時需要移除以免破壞格式
+_MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\(([^)]*)\)')
+_MARKDOWN_DELIMITER_PATTERN = re.compile(r'\*\*|__|~~|\|\||```|`')
+
+# 截斷時不應停留在結尾的字元（零寬連接符、變體選擇符、組合符號）
+_DANGLING_CHARACTERS = '\u200d\ufe0e\ufe0f\u20e3'
+
+
+@dataclass
+class DigestChunk:
+    """摘要的一則訊息"""
+    text: str
+    entry_indexes: List[int] = field(default_factory=list)  # 這則訊息包含的熱門訊息索引
+
+
+def utf16_length(text: str) -> int:
+    """計算字串在 Telegram 中的長度（UTF-16 編碼單位）
+
+    Args:
+        text: 字串
+
+    Returns:
+        int: UTF-16 編碼單位數量，emoji 等 BMP 以外字元計為 2
+    """
+    return len(text.encode('utf-16-le')) // 2
+
+
+def sanitize_markdown(text: str) -> str:
+    """移除使用者內容中的 markdown 標記，避免與摘要本身的格式衝突
+
+    Args:
+        text: 原始內容（可能包含 Telethon 的 markdown 標記）
+
+    Returns:
+        str: 移除標記後的純文字
+    """
+    if not text:
+        return ''
+    text = _MARKDOWN_LINK_PATTERN.sub(r'\1', text)
+    return _MARKDOWN_DELIMITER_PATTERN.sub('', text)
+
+
+def truncate_text(text: str, max_length: int) -> str:
+    """依 UTF-16 長度截斷內容，不拆開 emoji 組合字元
+
+    Args:
+        text: 內容
+        max_length: UTF-16 長度上限（包含省略號）
+
+    Returns:
+        str: 截斷後的內容
+    """
+    if utf16_length(text) <= max_length:
+        return text
+
+    budget = max_length - 1  # 保留省略號的空間
+    result = []
+    used = 0
+    for char in text:
+        char_length = 2 if ord(char) > 0xFFFF else 1
+        if used + char_length > budget:
+            break
+        result.append(char)
+        used += char_length
+
+    truncated = ''.join(result).rstrip()
+    while truncated and truncated[-1] in _DANGLING_CHARACTERS:
+        truncated = truncated[:-1]
+    return truncated + '…'
+
+
+class DigestRenderer:
+    """摘要渲染器，將標題、熱門訊息與結尾打包成符合長度上限的訊息"""
+
+    def __init__(self, max_length=TELEGRAM_MESSAGE_LIMIT, excerpt_length=DEFAULT_EXCERPT_LENGTH):
+        """初始化摘要渲染器
+
+        Args:
+            max_length: 單則訊息的長度上限
+            excerpt_length: 每則熱門訊息保留的內容長度
+        """
+        self.max_length = max_length
+        self.excerpt_length = excerpt_length
+
+    def render_entry(self, entry: Dict[str, Any]) -> str:
+        """渲染單則熱門訊息
+
+        Args:
+            entry: 熱門訊息資料，包含 rank、total_reactions、reply_count、
+                reactions_detail、display_name、date、link、text、has_media、previous_link
+
+        Returns:
+            str: 熱門訊息區塊
+        """
+        lines = [
+            f"💥 **第 {entry['rank']} 名** ｜ 反應 {entry.get('total_reactions', 0)} ｜ 回覆 {entry.get('reply_count', 0)}"
+        ]
+
+        reactions_detail = sanitize_markdown(entry.get('reactions_detail') or '')
+        if reactions_detail:
+            lines.append(f"表情符號: {reactions_detail}")
+
+        meta = []
+        display_name = sanitize_markdown(entry.get('display_name') or '')
+        if display_name:
+            meta.append(f"使用者: {display_name}")
+        message_date = entry.get('date')
+        if hasattr(message_date, 'strftime'):
+            meta.append(message_date.strftime('%Y-%m-%d %H:%M'))
+        if meta:
+            lines.append(' ｜ '.join(meta))
+
+        links = []
+        if entry.get('link'):
+            links.append(f"[查看原始訊息]({entry['link']})")
+        if entry.get('previous_link'):
+            links.append(f"🔁 [持續熱門，查看先前發布]({entry['previous_link']})")
+        elif entry.get('has_media'):
+            links.append("📎 含媒體")
+        if links:
+            lines.append(' ｜ '.join(links))
+
+        excerpt = sanitize_markdown(entry.get('text') or '').strip()
+        if excerpt:
+            lines.append(f"📝 {truncate_text(excerpt, self.excerpt_length)}")
+
+        return '\n'.join(lines)
+
+    def render(self, header: str, entries: List[Dict[str, Any]], footer: Optional[str] = None) -> List[DigestChunk]:
+        """將標題、熱門訊息與結尾打包為盡可能少的訊息
+
+        Args:
+            header: 標題區塊
+            entries: 熱門訊息資料列表
+            footer: 結尾區塊（可選）
+
+        Returns:
+            List[DigestChunk]: 要依序發送的訊息
+        """
+        blocks = [(header, None)] if header else []
+        blocks += [(self.render_entry(entry), index) for index, entry in enumerate(entries)]
+        if footer:
+            blocks.append((footer, None))
+
+        separator = '\n\n'
+        separator_length = utf16_length(separator)
+        chunks = []
+        current_parts = []
+        current_indexes = []
+        current_length = 0
+
+        for block, index in blocks:
+            # 單一區塊超過上限時強制截斷（只會發生在異常長的標題或結尾）
+            block = truncate_text(block, self.max_length)
+            block_length = utf16_length(block)
+            extra = block_length + (separator_length if current_parts else 0)
+
+            if current_parts and current_length + extra > self.max_length:
+                chunks.append(DigestChunk(separator.join(current_parts), current_indexes))
+                current_parts, current_indexes, current_length = [], [], 0
+                extra = block_length
+
+            current_parts.append(block)
+            current_length += extra
+            if index is not None:
+                current_indexes.append(index)
+
+        if current_parts:
+            chunks.append(DigestChunk(separator.join(current_parts), current_indexes))
+
+        return chunks
@@ -0,0 +1,176 @@
+"""
+即時收錄服務
+在常駐服務中訂閱群組的新訊息、編輯、刪除與反應更新，直接寫入本機資料庫
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+
+from telethon import events, utils
+from telethon.tl.types import UpdateMessageReactions
+
+# 更新導入路徑
+from src.utils.logger import logger
+from config.constants import LIVE_BACKFILL_DAYS, LIVE_CATCH_UP_INTERVAL_MINUTES
+from data.live_store import LiveMessageStore
+
+# 補抓時至少重新整理的最近訊息數量，用來更新斷線期間變動的反應與回覆數
+CATCH_UP_REFRESH_COUNT = 100
+
+
+class LiveIngestor:
+    """即時收錄服務，讓報告可以直接從本機資料庫取得訊息"""
+
+    def __init__(self, client_manager, message_fetcher, store: Optional[LiveMessageStore] = None,
+                 backfill_days=LIVE_BACKFILL_DAYS, catch_up_interval_minutes=LIVE_CATCH_UP_INTERVAL_MINUTES):
+        """初始化即時收錄服務
+
+        Args:
+            client_manager: Telegram客戶端管理器實例
+            message_fetcher: 訊息獲取器實例，用於轉換訊息格式與回補歷史訊息
+            store: 即時收錄資料庫實例（可選）
+            backfill_days: 首次追蹤群組時回補的天數
+            catch_up_interval_minutes: 定期補抓遺漏訊息的間隔（分鐘）
+        """
+        self.client_manager = client_manager
+        self.message_fetcher = message_fetcher
+        self.store = store if store is not None else LiveMessageStore()
+        self.backfill_days = backfill_days
+        self.catch_up_interval_minutes = catch_up_interval_minutes
+
+        # 追蹤中的群組 ID 對應群組實體
+        self.chats: Dict[int, Any] = {}
+        self._handlers = []
+        self._catch_up_task = None
+
+    async def start(self, groups: List[Dict[str, Any]]):
+        """開始追蹤群組：註冊事件處理器，補抓遺漏的訊息並啟動定期補抓
+
+        Args:
+            groups: 群組信息列表
+        """
+        self.chats = await self.client_manager.resolve_entities([group['id'] for group in groups])
+        if not self.chats:
+            logger.warning("沒有可追蹤的群組，即時收錄未啟動")
+            return
+
+        client = self.client_manager.client
+        chat_ids = list(self.chats)
+        self._handlers = [
+            (self._on_message, events.NewMessage(chats=chat_ids)),
+            (self._on_message, events.MessageEdited(chats=chat_ids)),
+            # 一般群組的刪除事件不含群組 ID，因此不使用 chats 篩選，改在處理器中判斷
+            (self._on_deleted, events.MessageDeleted()),
+            (self._on_reactions, events.Raw(types=UpdateMessageReactions)),
+        ]
+        for handler, event in self._handlers:
+            client.add_event_handler(handler, event)
+
+        logger.info(f"即時收錄已啟動，追蹤 {len(self.chats)} 個群組")
+        await self.catch_up()
+        self._catch_up_task = asyncio.create_task(self._catch_up_loop())
+
+    async def stop(self):
+        """停止追蹤並關閉資料庫"""
+        if self._catch_up_task is not None:
+            self._catch_up_task.cancel()
+            self._catch_up_task = None
+        for handler, event in self._handlers:
+            self.client_manager.client.remove_event_handler(handler, event)
+        self._handlers = []
+        self.store.close()
+
+    def get_messages(self, group_id: int, start_date: datetime, end_date: datetime) -> Optional[List[Dict[str, Any]]]:
+        """從本機資料庫取得期間內的訊息
+
+        Args:
+            group_id: 群組 ID
+            start_date: 開始時間
+            end_date: 結束時間
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 訊息列表；群組未追蹤或期間超出已收錄範圍時返回 None
+        """
+        if group_id not in self.chats or not self.store.covers(group_id, start_date):
+            return None
+        messages = self.store.get_messages(group_id, start_date, end_date)
+        logger.info(f"從即時收錄資料庫取得 {len(messages)} 條訊息 (群組 {group_id})")
+        return messages
+
+    async def catch_up(self):
+        """補抓所有追蹤中群組遺漏的訊息"""
+        for chat_id, entity in self.chats.items():
+            try:
+                await self._catch_up_chat(chat_id, entity)
+            except Exception as e:
+                logger.error(f"補抓群組 {chat_id} 的訊息時發生錯誤: {e}")
+
+    async def _catch_up_loop(self):
+        """定期補抓，涵蓋斷線重連期間沒有收到的事件"""
+        while True:
+            await asyncio.sleep(self.catch_up_interval_minutes * 60)
+            await self.catch_up()
+
+    async def _catch_up_chat(self, chat_id: int, entity):
+        """補抓單一群組的訊息
+
+        首次追蹤時回補 backfill_days 天；之後只獲取上次收錄之後的新訊息，
+        並重新整理最近的訊息以更新反應與回覆數
+
+        Args:
+            chat_id: 群組 ID
+            entity: 群組實體
+        """
+        state = self.store.get_state(chat_id)
+        if state is None or state['covered_since'] is None:
+            end_date = datetime.now(timezone.utc)
+            start_date = end_date - timedelta(days=self.backfill_days)
+            messages = await self.message_fetcher.get_recent_messages(entity, start_date=start_date, end_date=end_date)
+            for message in messages:
+                self.store.upsert_message(chat_id, message)
+            self.store.set_covered_since(chat_id, start_date)
+            logger.info(f"群組 {chat_id} 已回補 {len(messages)} 條訊息")
+            return
+
+        last_message_id = state['last_message_id']
+        count = 0
+        async for message in self.client_manager.client.iter_messages(entity):
+            if message.id <= last_message_id and count >= CATCH_UP_REFRESH_COUNT:
+                break
+            self.store.upsert_message(chat_id, await self.message_fetcher.build_message_data(message))
+            count += 1
+        logger.info(f"群組 {chat_id} 補抓完成，更新 {count} 條訊息")
+
+    async def _on_message(self, event):
+        """處理新訊息與編輯事件
+
+        Args:
+            event: NewMessage 或 MessageEdited 事件
+        """
+        try:
+            self.store.upsert_message(event.chat_id, await self.message_fetcher.build_message_data(event.message))
+        except Exception as e:
+            logger.error(f"收錄訊息 {event.message.id} 時發生錯誤: {e}")
+
+    async def _on_deleted(self, event):
+        """處理刪除事件
+
+        Args:
+            event: MessageDeleted 事件
+        """
+        if event.chat_id is not None and event.chat_id not in self.chats:
+            return
+        self.store.mark_deleted(event.chat_id, event.deleted_ids)
+
+    async def _on_reactions(self, update):
+        """處理反應更新
+
+        Args:
+            update: UpdateMessageReactions
+        """
+        chat_id = utils.get_peer_id(update.peer)
+        if chat_id not in self.chats:
+            return
+        # UpdateMessageReactions 與訊息一樣以 reactions 屬性提供反應結果
+        reactions, total_reactions = self.message_fetcher._get_reactions_info(update)
+        self.store.update_reactions(chat_id, update.msg_id, reactions, total_reactions)
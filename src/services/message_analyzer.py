@@ -2,11 +2,11 @@
 訊息分析服務
 處理訊息的分析相關功能
 """
-import pandas as pd
 from typing import Dict, List, Optional
 from datetime import datetime
 
 # 更新導入路徑
+from config.constants import RANK_METRICS, DEFAULT_RANK_METRIC
 from src.utils.logger import logger
 from src.utils.display_utils import AnalysisResultsDisplay
 from data.schemas import AnalysisResults
@@ -14,21 +14,24 @@ from data.schemas import AnalysisResults
 class MessageAnalyzer:
     """訊息分析服務，負責分析Telegram訊息數據"""
     
-    def __init__(self, use_colors=True):
+    def __init__(self, use_colors=True, metric_series=None):
         """初始化訊息分析器
         
         Args:
             use_colors: 是否使用顏色輸出
+            metric_series: 趨勢時間序列存儲實例（可選），提供時每次分析的摘要會附加到時間序列
         """
         self.use_colors = use_colors
         self.display = AnalysisResultsDisplay(use_colors)
+        self.metric_series = metric_series
     
-    def analyze_messages(self, messages, top_limit=5) -> Optional[Dict]:
+    def analyze_messages(self, messages, top_limit=5, rank_by=DEFAULT_RANK_METRIC) -> Optional[Dict]:
         """分析訊息數據
         
         Args:
             messages: 訊息列表
             top_limit: 熱門訊息數量上限，預設為5條
+            rank_by: 熱門訊息的排序指標（RANK_METRICS 之一），預設為反應總數
             
         Returns:
             Optional[Dict]: 分析結果字典，如果無訊息則返回None
@@ -39,6 +42,9 @@ class MessageAnalyzer:
         
         logger.info(f"開始分析 {len(messages)} 條訊息...")
         
+        # pandas 載入較慢，只在實際分析時才匯入
+        import pandas as pd
+        
         # 轉換為 DataFrame 以方便分析
         df = pd.DataFrame(messages)
         
@@ -57,8 +63,12 @@ class MessageAnalyzer:
             lambda reactions: ' '.join([f"{r['emoji']}×{r['count']}" for r in reactions]) if reactions else ''
         )
         
-        # 熱門訊息分析 (所有表情符號反應總數最多) - 使用可調整的 top_limit
-        most_reactions = df.sort_values('total_reactions', ascending=False).head(top_limit)
+        # 熱門訊息分析 (預設為所有表情符號反應總數最多) - 使用可調整的 top_limit，同分時以反應數排序
+        if rank_by not in RANK_METRICS:
+            raise ValueError(f"未知的排序指標: {rank_by}，可用指標: {', '.join(RANK_METRICS)}")
+        df[rank_by] = df[rank_by].fillna(0)
+        sort_columns = [rank_by] if rank_by == 'total_reactions' else [rank_by, 'total_reactions']
+        most_reactions = df.sort_values(sort_columns, ascending=False).head(top_limit)
         
         # 每日訊息統計
         df['date_day'] = df['date'].dt.date
@@ -87,6 +97,7 @@ class MessageAnalyzer:
             'messages_per_day': messages_per_day,  # 每日訊息統計
             'user_activity': user_activity,    # 使用者活躍度
             'emoji_stats': emoji_stats,        # 表情符號使用統計
+            'rank_by': rank_by,                # 熱門訊息的排序指標
             'total_messages': len(df),         # 總訊息數
             'unique_users': df['display_name'].nunique(),  # 獨立使用者數
             'period': {
@@ -108,13 +119,28 @@ class MessageAnalyzer:
         """
         self.display.print_analysis_results(analysis_results, group_name, top_count)
         
-    def save_analysis_results(self, analysis_results, group_name, storage):
+    def record_metrics(self, analysis_results, group_id):
+        """將分析摘要附加到趨勢時間序列
+        
+        Args:
+            analysis_results: 分析結果字典
+            group_id: 群組 ID
+        """
+        if self.metric_series is None or not analysis_results:
+            return
+        try:
+            self.metric_series.append_run(group_id, analysis_results)
+        except Exception as e:
+            logger.warning(f"寫入趨勢時間序列失敗: {e}")
+    
+    def save_analysis_results(self, analysis_results, group_name, storage, group_id=None):
         """保存分析結果到檔案
         
         Args:
             analysis_results: 分析結果字典
             group_name: 群組名稱
             storage: 結果存儲管理器
+            group_id: 群組 ID（可選），記錄在分析結果索引中
             
         Returns:
             Optional[Path]: 保存的檔案路徑
@@ -123,4 +149,4 @@ class MessageAnalyzer:
             logger.warning("沒有分析結果可供保存")
             return None
             
-        return storage.save_analysis_results(group_name, analysis_results)
\ No newline at end of file
+        return storage.save_analysis_results(group_name, analysis_results, group_id=group_id)
\ No newline at end of file
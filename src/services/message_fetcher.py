@@ -2,26 +2,43 @@
 訊息獲取服務
 處理從 Telegram 獲取訊息的相關功能
 """
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 
+from telethon import utils
+from telethon.errors import FloodWaitError
+
 # 更新導入路徑
-from src.utils.logger import logger
+from config.constants import SENDER_CACHE_TTL_HOURS, SENDER_CACHE_MAX_ENTRIES
+from src.utils.logger import logger, ProgressLogger
+from src.utils.metrics import metrics
 from src.utils.display_utils import Colors, ProgressBar
 from data.schemas import User, Reaction, Message
 
 class MessageFetcher:
     """訊息獲取服務，負責從 Telegram 群組獲取訊息"""
     
-    def __init__(self, client_manager, use_colors=True):
+    def __init__(self, client_manager, use_colors=True, sender_cache_ttl_hours=SENDER_CACHE_TTL_HOURS,
+                 sender_cache_max_entries=SENDER_CACHE_MAX_ENTRIES):
         """初始化訊息獲取器
         
         Args:
             client_manager: Telegram 客戶端管理器實例
             use_colors: 是否使用顏色輸出
+            sender_cache_ttl_hours: 發送者資訊的有效時間（小時），過期後重新獲取以反映改名
+            sender_cache_max_entries: 發送者資訊快取的最大數量，超過時移除最久未使用的項目
         """
         self.client_manager = client_manager
         self.use_colors = use_colors
+        # 發送者資訊快取，常駐模式下可在多次分析之間重複使用：發送者 ID -> (到期時間, 發送者資訊)，依使用順序排列
+        self._sender_cache = OrderedDict()
+        self._sender_cache_ttl = sender_cache_ttl_hours * 3600
+        self._sender_cache_max_entries = sender_cache_max_entries
+        # 發送者查詢統計（熱點迴圈中只累加，每次獲取結束時才寫入執行指標）
+        self.sender_cache_hits = 0
+        self.sender_lookups = 0
         
     async def get_recent_messages(self, group_entity, days=None, start_date=None, end_date=None):
         """獲取群組/頻道的最近訊息
@@ -81,17 +98,28 @@ class MessageFetcher:
         
         # 初始化計數器
         counter = ProgressBar(prefix=f"{c.BRIGHT_CYAN}獲取進度:{c.RESET}", suffix=f"{c.YELLOW}完成{c.RESET}")
+        # 檢查過的訊息只彙總為定期的進度日誌，不為每則訊息寫一行
+        progress = ProgressLogger(logger, f"從 {group_title} 獲取訊息", 'fetch_progress',
+                                  labels={'kept': '保留', 'skipped_newer': '晚於結束日期'}, group=group_title)
+        skipped_newer = 0
         
+        try:
+            # 與對話列表相同的帶標記 ID，才能和其他階段的指標對應
+            group_id = utils.get_peer_id(group_entity)
+        except Exception:
+            group_id = getattr(group_entity, 'id', None)
+        sender_cache_hits, sender_lookups = self.sender_cache_hits, self.sender_lookups
+        fetch_started = time.perf_counter()
+        message_iterator = self._iter_messages_with_failover(group_entity, **kwargs)
         try:
             # 獲取訊息並計數
-            async for message in self.client_manager.client.iter_messages(group_entity, **kwargs):
+            async for message in message_iterator:
                 # 確保訊息日期包含時區資訊
                 message_date = message.date
                 if message_date.tzinfo is None:
                     message_date = message_date.replace(tzinfo=timezone.utc)
                 
-                # 詳細記錄訊息處理過程
-                logger.info(f"檢查訊息: {message_date}, 範圍: {start_date} 至 {end_date}, ID: {message.id}")
+                progress.update(kept=len(messages))
                 
                 # 只處理在指定時間範圍內的訊息
                 # 訊息日期必須在開始日期和結束日期之間 (包含兩端)
@@ -101,35 +129,14 @@ class MessageFetcher:
                     break
                 elif message_date > end_date:
                     # 訊息晚於 end_date，繼續查找更早的訊息
-                    logger.info(f"訊息日期 {message_date} 晚於結束日期 {end_date}，跳過此訊息")
+                    skipped_newer += 1
                     continue
                 
                 # 跳過沒有文字內容的訊息
                 if not message.text:
                     continue
                 
-                # 獲取發送者資訊
-                sender_info = await self._get_sender_info(message)
-                
-                # 獲取反應 (按讚) 資訊
-                reactions, reactions_count = self._get_reactions_info(message)
-                
-                # 獲取回覆數量
-                reply_count = self._get_reply_count(message)
-                
-                # 構建訊息資料
-                msg_data = {
-                    'id': message.id,
-                    'date': message_date,
-                    'text': message.text,
-                    'sender': sender_info,
-                    'reactions': reactions,
-                    'total_reactions': reactions_count,
-                    'reply_count': reply_count,
-                    'views': getattr(message, 'views', 0),
-                    'forwards': getattr(message, 'forwards', 0)
-                }
-                messages.append(msg_data)
+                messages.append(await self.build_message_data(message))
                 
                 # 每10條訊息更新一次計數器顯示
                 if len(messages) % 10 == 0:
@@ -142,6 +149,7 @@ class MessageFetcher:
             
             # 完成計數並顯示最終結果
             counter.finish()
+            progress.finish(kept=len(messages), skipped_newer=skipped_newer)
             logger.info(f"成功獲取 {len(messages)} 條訊息")
             return messages
         
@@ -149,7 +157,80 @@ class MessageFetcher:
             # 確保出錯時也會顯示完整訊息
             counter.finish()
             logger.error(f"獲取訊息時發生錯誤: {e}")
+            metrics.inc('fetch_errors', group=group_id)
             return []
+        finally:
+            await message_iterator.aclose()
+            metrics.observe('stage', time.perf_counter() - fetch_started, stage='fetch', group=group_id)
+            metrics.inc('messages_checked', progress.count, group=group_id)
+            metrics.inc('messages_fetched', len(messages), group=group_id)
+            metrics.inc('cache_lookups', self.sender_cache_hits - sender_cache_hits, cache='sender', result='hit')
+            metrics.inc('cache_lookups', self.sender_lookups - sender_lookups, cache='sender', result='miss')
+    
+    async def build_message_data(self, message) -> Dict[str, Any]:
+        """將 Telethon 訊息轉換為分析用的訊息資料
+        
+        Args:
+            message: Telethon的訊息對象
+            
+        Returns:
+            Dict[str, Any]: 訊息資料
+        """
+        # 確保訊息日期包含時區資訊
+        message_date = message.date
+        if message_date.tzinfo is None:
+            message_date = message_date.replace(tzinfo=timezone.utc)
+        
+        # 獲取發送者資訊
+        sender_info = await self._get_sender_info(message)
+        
+        # 獲取反應 (按讚) 資訊
+        reactions, reactions_count = self._get_reactions_info(message)
+        
+        # 獲取回覆數量
+        reply_count = self._get_reply_count(message)
+        
+        # 構建訊息資料
+        return {
+            'id': message.id,
+            'date': message_date,
+            'text': message.text,
+            'sender': sender_info,
+            'reactions': reactions,
+            'total_reactions': reactions_count,
+            'reply_count': reply_count,
+            'views': getattr(message, 'views', 0),
+            'forwards': getattr(message, 'forwards', 0),
+            'has_media': bool(message.media) and not getattr(message, 'web_preview', None)
+        }
+    
+    async def _iter_messages_with_failover(self, group_entity, **kwargs):
+        """向客戶端池取得帳號並逐一產生訊息，遇到 FloodWait 時換帳號從中斷處繼續
+        
+        Args:
+            group_entity: 群組/頻道實體
+            **kwargs: 傳給 iter_messages 的參數
+            
+        Yields:
+            Message: Telethon的訊息對象
+        """
+        last_id = None
+        while True:
+            manager, entity = await self.client_manager.acquire(group_entity)
+            try:
+                if last_id is not None:
+                    # 從上一個帳號中斷的訊息之後繼續（訊息按 ID 倒序返回）
+                    kwargs.pop('offset_date', None)
+                    kwargs['offset_id'] = last_id
+                async for message in manager.client.iter_messages(entity, **kwargs):
+                    last_id = message.id
+                    yield message
+                return
+            except FloodWaitError as e:
+                manager.report_flood(e.seconds)
+                logger.warning(f"獲取訊息時遇到 FloodWait ({e.seconds} 秒)，改用其他帳號繼續")
+            finally:
+                self.client_manager.release(manager)
     
     async def _get_sender_info(self, message) -> dict:
         """獲取訊息發送者信息
@@ -162,8 +243,15 @@ class MessageFetcher:
         """
         sender_info = None
         if message.sender_id:
+            cached = self._sender_cache.get(message.sender_id)
+            if cached is not None and cached[0] > time.monotonic():
+                self._sender_cache.move_to_end(message.sender_id)
+                self.sender_cache_hits += 1
+                return cached[1]
+            self.sender_lookups += 1
             try:
-                sender = await message.get_sender()
+                with metrics.stage('senders'):
+                    sender = await message.get_sender()
                 if hasattr(sender, 'first_name'):  # 是User類型
                     # 組合暱稱和帳號
                     nickname = sender.first_name
@@ -183,6 +271,7 @@ class MessageFetcher:
                         'first_name': sender.first_name,
                         'last_name': sender.last_name
                     }
+                    self._cache_sender(message.sender_id, sender_info)
             except Exception as e:
                 sender_info = {
                     'id': message.sender_id, 
@@ -192,6 +281,18 @@ class MessageFetcher:
                 }
         return sender_info
     
+    def _cache_sender(self, sender_id, sender_info: dict):
+        """保存發送者資訊，超過數量上限時移除最久未使用的項目
+
+        Args:
+            sender_id: 發送者 ID
+            sender_info: 發送者資訊
+        """
+        self._sender_cache[sender_id] = (time.monotonic() + self._sender_cache_ttl, sender_info)
+        self._sender_cache.move_to_end(sender_id)
+        while len(self._sender_cache) > self._sender_cache_max_entries:
+            self._sender_cache.popitem(last=False)
+
     def _get_reactions_info(self, message) -> tuple:
         """獲取訊息反應信息
         
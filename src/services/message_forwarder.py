@@ -3,54 +3,85 @@
 處理Telegram訊息的轉發、複製功能
 """
 import os
-import time
-import pandas as pd
+import sys
+import asyncio
 from typing import Dict, List, Optional, Any, Union
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from telethon import utils
+from telethon.errors import FloodWaitError
 from telethon.tl.functions.channels import CreateChannelRequest
+from telethon.tl.types import PeerChannel
 
 # 更新導入路徑
 from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils import tracing
 from config.settings import RESULTS_DIR
+from config.constants import FORWARD_MODE_DIGEST, FORWARD_MODE_EDIT, DEFAULT_FORWARD_MODE
+from data.storage import DigestSlotStore
+from src.services.digest_renderer import DigestRenderer
+
+# 就地編輯模式中每個排名欄位保留的訊息內容長度上限
+SLOT_TEXT_LIMIT = 1000
 
 class MessageForwarder:
     """訊息轉發服務，負責處理訊息的轉發、複製等功能"""
     
-    def __init__(self, client_manager):
+    def __init__(self, client_manager, ledger=None, forward_mode=DEFAULT_FORWARD_MODE, slot_store=None, digest_renderer=None):
         """初始化訊息轉發器
         
         Args:
             client_manager: Telegram客戶端管理器實例
+            ledger: 轉發記錄簿實例（可選），用於跳過先前已發布的訊息
+            forward_mode: 轉發模式，'digest' 打包摘要、'append' 逐則附加或 'edit' 就地編輯置頂摘要
+            slot_store: 就地編輯模式的欄位記錄實例（可選）
+            digest_renderer: 摘要渲染器實例（可選）
         """
         self.client_manager = client_manager
+        self.ledger = ledger
+        self.forward_mode = forward_mode
+        self.slot_store = slot_store
+        self.digest_renderer = digest_renderer or DigestRenderer()
+        # 已找到的儲存群組，避免每次轉發都掃描全部對話
+        self._storage_groups = {}
         
-    async def find_or_create_storage_group(self, source_group) -> Optional[Dict[str, Any]]:
+    async def find_or_create_storage_group(self, source_group, storage_target=None) -> Optional[Dict[str, Any]]:
         """尋找或創建一個與源群組對應的儲存群組
         
         Args:
             source_group: 源群組實體
+            storage_target: 指定的轉發目標（群組 ID 或使用者名稱，可選），提供時不使用預設的「TG分析-」儲存群組
             
         Returns:
             Optional[Dict[str, Any]]: 包含儲存群組信息的字典，如果失敗則返回None
         """
+        if storage_target is not None:
+            return await self._get_storage_target(storage_target)
+        
         try:
             # 獲取源群組名稱
             source_name = getattr(source_group, 'title', '未知群組')
             storage_group_name = f"TG分析-{source_name}"
             
+            cached = self._storage_groups.get(storage_group_name)
+            if cached:
+                return cached
+            
             logger.info(f"尋找儲存群組: {storage_group_name}")
             
-            # 嘗試查找現有的儲存群組
-            async for dialog in self.client_manager.client.iter_dialogs():
-                if dialog.is_channel and dialog.title == storage_group_name:
-                    logger.info(f"找到現有儲存群組: {dialog.title}")
-                    return {
-                        'name': dialog.title,
-                        'entity': dialog.entity,
-                        'id': dialog.id
-                    }
+            # 嘗試查找現有的儲存群組（需掃描全部對話，追蹤時顯示為 storage_group_scan）
+            with tracing.span('storage_group_scan', 'forward', storage_group=storage_group_name):
+                async for dialog in self.client_manager.client.iter_dialogs():
+                    if dialog.is_channel and dialog.title == storage_group_name:
+                        logger.info(f"找到現有儲存群組: {dialog.title}")
+                        self._storage_groups[storage_group_name] = {
+                            'name': dialog.title,
+                            'entity': dialog.entity,
+                            'id': dialog.id
+                        }
+                        return self._storage_groups[storage_group_name]
             
             # 如果找不到現有的儲存群組，則創建一個新的
             logger.info(f"未找到儲存群組，將創建新群組: {storage_group_name}")
@@ -65,17 +96,46 @@ class MessageForwarder:
             new_channel = result.chats[0]
             logger.info(f"成功創建新儲存群組: {new_channel.title}")
             
-            return {
+            # 與 iter_dialogs 找到時相同使用帶 -100 標記的 ID，欄位記錄與轉發記錄簿才能對應到同一個群組
+            self._storage_groups[storage_group_name] = {
                 'name': new_channel.title,
                 'entity': new_channel,
-                'id': new_channel.id
+                'id': utils.get_peer_id(new_channel)
             }
+            return self._storage_groups[storage_group_name]
             
         except Exception as e:
             logger.error(f"尋找或創建儲存群組時發生錯誤: {e}")
             return None
             
-    async def forward_top_messages_to_storage_group(self, target_group, top_messages, time_range_days=7, all_messages=None, analysis_results=None) -> bool:
+    async def _get_storage_target(self, storage_target) -> Optional[Dict[str, Any]]:
+        """取得指定的轉發目標
+        
+        Args:
+            storage_target: 群組 ID 或使用者名稱
+            
+        Returns:
+            Optional[Dict[str, Any]]: 包含目標信息的字典，如果失敗則返回None
+        """
+        cache_key = f"target:{storage_target}"
+        cached = self._storage_groups.get(cache_key)
+        if cached:
+            return cached
+        
+        entity = await self.client_manager.get_entity(storage_target)
+        if entity is None:
+            logger.error(f"無法取得轉發目標: {storage_target}")
+            return None
+        
+        self._storage_groups[cache_key] = {
+            'name': getattr(entity, 'title', str(storage_target)),
+            'entity': entity,
+            'id': utils.get_peer_id(entity)
+        }
+        return self._storage_groups[cache_key]
+    
+    async def forward_top_messages_to_storage_group(self, target_group, top_messages, time_range_days=7, all_messages=None, analysis_results=None,
+                                                    storage_target=None) -> bool:
         """將熱門訊息複製到對應的儲存群組（包含媒體檔案）
         
         Args:
@@ -84,13 +144,23 @@ class MessageForwarder:
             time_range_days: 時間範圍（天數）
             all_messages: 已經獲取的所有訊息數據（可選）
             analysis_results: 已經計算好的分析結果（可選）
+            storage_target: 指定的轉發目標（可選），預設為與目標群組對應的儲存群組
             
         Returns:
             bool: 成功複製則返回 True，否則返回 False
         """
+        if self.forward_mode == FORWARD_MODE_EDIT:
+            return await self.update_digest_in_place(
+                target_group, top_messages, time_range_days, all_messages, analysis_results, storage_target
+            )
+        if self.forward_mode == FORWARD_MODE_DIGEST:
+            return await self.send_compact_digest(
+                target_group, top_messages, time_range_days, all_messages, analysis_results, storage_target
+            )
+        
         try:
             # 獲取或創建與目標群組對應的儲存群組
-            storage_group = await self.find_or_create_storage_group(target_group)
+            storage_group = await self.find_or_create_storage_group(target_group, storage_target)
             
             if not storage_group:
                 logger.error("無法找到或創建儲存群組，取消操作")
@@ -98,110 +168,553 @@ class MessageForwarder:
                 
             logger.info(f"開始將熱門訊息複製到儲存群組: {storage_group['name']}")
             
-            # 預設統計信息
-            first_date = None
-            last_date = None
-            message_count = 0
-            
-            # 如果有提供已分析的訊息數據，則直接使用
-            if all_messages and len(all_messages) > 0:
-                # 使用已經獲取的訊息數據來計算時間範圍和總數
-                message_count = len(all_messages)
-                
-                # 從提供的訊息數據中提取時間範圍
-                dates = [msg['date'] for msg in all_messages if 'date' in msg]
-                if dates:
-                    first_date = min(dates)
-                    last_date = max(dates)
-                    
-            # 如果有提供分析結果，則從中獲取時間範圍
-            elif analysis_results and 'period' in analysis_results:
-                period = analysis_results['period']
-                # 注意: 這裡的日期可能是日期對象，而不是帶時區的datetime
-                first_date = datetime.combine(period['start'], datetime.min.time()).replace(tzinfo=timezone.utc)
-                last_date = datetime.combine(period['end'], datetime.max.time()).replace(tzinfo=timezone.utc)
-                message_count = analysis_results.get('total_messages', len(top_messages))
-            else:
-                # 如果沒有提供訊息數據，則顯示使用默認的時間範圍
-                print("\n使用預設時間範圍...")
-                # 預設使用目前時間減去指定天數
-                last_date = datetime.now(timezone.utc)
-                first_date = last_date - pd.Timedelta(days=time_range_days)
-                message_count = len(top_messages)
-                
-            # 計算實際天數範圍
-            actual_days = (last_date - first_date).days + 1 if first_date and last_date else time_range_days
-            
-            # 格式化日期時間為中文年月日格式
-            first_date_str = first_date.strftime("%Y年%m月%d日 %H:%M:%S") if first_date else "未知時間"
-            last_date_str = last_date.strftime("%Y年%m月%d日 %H:%M:%S") if last_date else "未知時間"
-            
-            # 先發送標題訊息說明這是哪個群組的熱門訊息
-            source_name = getattr(target_group, 'title', '未知群組')
-            current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")
-            
-            header_message = (
-                f"📊 **{source_name}** 熱門訊息摘要\n\n"
-                f"⏱ 分析時間: {current_time}\n"
-                f"📈 共選出 {len(top_messages)} 條熱門訊息\n"
-                f"📄 總訊息數: {message_count} 則\n"
-                f"📅 訊息時間範圍: {first_date_str}～{last_date_str}\n"
-                f"⌛ 實際天數: {actual_days} 天\n\n"
-                f"-----------------------------------"
+            header_message = self._build_header_message(
+                target_group, top_messages, time_range_days, all_messages, analysis_results
             )
             
             await self.client_manager.client.send_message(storage_group['entity'], header_message)
             
             # 複製熱門訊息内容（包含媒體文件）
+            source_id = getattr(target_group, 'id', None)
             successful_count = 0
+            repost_count = 0
             for idx, msg in enumerate(top_messages, 1):
                 try:
                     source_message = None
-                    message_id = None
-                    
-                    # 檢查 msg 是否為 pandas Series 類型
-                    if isinstance(msg, pd.Series):
-                        # 如果是 pandas Series，取出 id 字段用於獲取原始訊息
-                        if 'id' in msg:
-                            message_id = msg['id']
-                    # 檢查 msg 是否為字典，且包含 id 或 message 字段
-                    elif isinstance(msg, dict) and ('id' in msg or 'message' in msg):
-                        message_id = msg.get('id') or msg.get('message')
-                    else:
+                    message_id = self._get_message_id(msg)
+                    if message_id is None:
                         logger.error(f"無法識別的訊息格式: {type(msg)}")
                         continue
                     
+                    stats = self._extract_stats(msg, idx)
+                    
+                    # 先查詢轉發記錄簿，已發布過的訊息只發送簡短的參照訊息，不再獲取原始訊息
+                    ledger_entry = self.ledger.get(source_id, message_id, storage_group['id']) if self.ledger else None
+                    if ledger_entry:
+                        with tracing.span('send_repost_reference', 'forward', rank=idx, message_id=message_id):
+                            await self._send_repost_reference(storage_group, ledger_entry, idx, stats)
+                        self.ledger.touch(source_id, message_id, storage_group['id'], stats)
+                        successful_count += 1
+                        repost_count += 1
+                        continue
+                    
                     # 獲取原始訊息
-                    source_message = await self.client_manager.client.get_messages(target_group, ids=message_id)
+                    source_message = await self._get_source_message(target_group, message_id)
                     if not source_message:
                         logger.error(f"無法獲取原始訊息")
                         continue
                     
-                    await self._process_message(source_message, storage_group['entity'], idx)
+                    with tracing.span('send_message', 'forward', rank=idx, message_id=message_id):
+                        sent_ids = await self._process_message(source_message, storage_group['entity'], idx, target_group)
                     successful_count += 1
                     
-                    time.sleep(1)  # 避免過快發送
+                    if self.ledger and sent_ids and source_id is not None:
+                        self.ledger.record(source_id, message_id, storage_group['id'], sent_ids, stats)
+                    
+                    await asyncio.sleep(1)  # 避免過快發送，不阻塞事件迴圈
                 except Exception as e:
                     logger.error(f"複製訊息時發生錯誤: {e}")
             
+            if self.ledger:
+                self.ledger.save()
+            
             # 發送結束訊息
             footer_message = f"✅ 共成功複製 {successful_count}/{len(top_messages)} 條熱門訊息"
+            if repost_count:
+                footer_message += f"\n🔁 其中 {repost_count} 條先前已發布，僅更新排名與數據"
             await self.client_manager.client.send_message(storage_group['entity'], footer_message)
             
-            logger.info(f"成功將 {successful_count} 條熱門訊息複製到儲存群組")
+            logger.info(f"成功將 {successful_count} 條熱門訊息複製到儲存群組（{repost_count} 條為先前已發布）")
             return True
             
         except Exception as e:
             logger.error(f"複製熱門訊息時發生錯誤: {e}")
             return False
             
-    async def _process_message(self, source_message, target_entity, idx):
+    async def send_compact_digest(self, target_group, top_messages, time_range_days=7, all_messages=None, analysis_results=None,
+                                  storage_target=None) -> bool:
+        """將標題、熱門訊息與結尾打包成盡可能少的訊息發送到儲存群組
+        
+        文字內容直接使用分析資料渲染，不需要重新獲取原始訊息；
+        只有含媒體且尚未發布過的訊息才會另外轉發媒體
+        
+        Args:
+            target_group: 目標群組實體
+            top_messages: 熱門訊息列表
+            time_range_days: 時間範圍（天數）
+            all_messages: 已經獲取的所有訊息數據（可選）
+            analysis_results: 已經計算好的分析結果（可選）
+            storage_target: 指定的轉發目標（可選），預設為與目標群組對應的儲存群組
+            
+        Returns:
+            bool: 成功發送則返回 True，否則返回 False
+        """
+        try:
+            storage_group = await self.find_or_create_storage_group(target_group, storage_target)
+            
+            if not storage_group:
+                logger.error("無法找到或創建儲存群組，取消操作")
+                return False
+            
+            client = self.client_manager.client
+            storage_entity = storage_group['entity']
+            source_id = getattr(target_group, 'id', None)
+            
+            # 整理要渲染的熱門訊息資料
+            entries = []
+            message_ids = []
+            for idx, msg in enumerate(top_messages, 1):
+                message_id = self._get_message_id(msg)
+                if message_id is None:
+                    logger.error(f"無法識別的訊息格式: {type(msg)}")
+                    continue
+                
+                entry = {
+                    'rank': idx,
+                    'total_reactions': msg.get('total_reactions', 0),
+                    'reply_count': msg.get('reply_count', 0),
+                    'reactions_detail': msg.get('reactions_detail', ''),
+                    'display_name': msg.get('display_name', ''),
+                    'date': msg.get('date'),
+                    'text': msg.get('text', ''),
+                    'has_media': bool(msg.get('has_media')),
+                    'link': self._build_message_link(source_id, message_id) if source_id is not None else None
+                }
+                
+                ledger_entry = self.ledger.get(source_id, message_id, storage_group['id']) if self.ledger else None
+                if ledger_entry and ledger_entry.get('storage_message_ids'):
+                    entry['previous_link'] = self._build_message_link(
+                        ledger_entry['storage_id'], ledger_entry['storage_message_ids'][0]
+                    )
+                
+                entries.append(entry)
+                message_ids.append(message_id)
+            
+            media_pending = [i for i, entry in enumerate(entries) if entry['has_media'] and not entry.get('previous_link')]
+            
+            header_message = self._build_header_message(
+                target_group, top_messages, time_range_days, all_messages, analysis_results
+            )
+            footer_message = f"✅ 本次摘要共 {len(entries)} 條熱門訊息"
+            if media_pending:
+                footer_message += f"，另轉發 {len(media_pending)} 則媒體"
+            
+            chunks = self.digest_renderer.render(header_message, entries, footer_message)
+            
+            # 發送摘要並記錄每則熱門訊息所在的訊息 ID
+            entry_message_ids = {}
+            for chunk in chunks:
+                with tracing.span('send_digest_chunk', 'forward', entries=len(chunk.entry_indexes)):
+                    sent = await client.send_message(storage_entity, chunk.text, link_preview=False)
+                for index in chunk.entry_indexes:
+                    entry_message_ids[index] = [sent.id]
+            
+            # 媒體另行轉發
+            for index in media_pending:
+                source_message = await self._get_source_message(target_group, message_ids[index])
+                if not source_message or not source_message.media:
+                    continue
+                media_message = await self._process_media(source_message, storage_entity, target_group)
+                if media_message:
+                    entry_message_ids.setdefault(index, []).append(media_message.id)
+            
+            # 更新轉發記錄簿
+            if self.ledger and source_id is not None:
+                for index, entry in enumerate(entries):
+                    stats = self._extract_stats(entry, entry['rank'])
+                    if self.ledger.is_forwarded(source_id, message_ids[index], storage_group['id']):
+                        self.ledger.touch(source_id, message_ids[index], storage_group['id'], stats)
+                    elif index in entry_message_ids:
+                        self.ledger.record(
+                            source_id, message_ids[index], storage_group['id'], entry_message_ids[index], stats
+                        )
+                self.ledger.save()
+            
+            logger.info(
+                f"已將 {len(entries)} 條熱門訊息以 {len(chunks)} 則摘要訊息發送到儲存群組，"
+                f"另轉發 {len(media_pending)} 則媒體"
+            )
+            return True
+        
+        except Exception as e:
+            logger.error(f"發送熱門訊息摘要時發生錯誤: {e}")
+            return False
+    
+    async def update_digest_in_place(self, target_group, top_messages, time_range_days=7, all_messages=None, analysis_results=None,
+                                     storage_target=None) -> bool:
+        """以就地編輯的方式更新儲存群組中的置頂摘要與固定排名欄位
+        
+        每個來源群組在儲存群組中維護一則置頂摘要與 N 個排名欄位，
+        只有內容變動的欄位才會被編輯，只有新進榜且含媒體的訊息才會發送新內容
+        
+        Args:
+            target_group: 目標群組實體
+            top_messages: 熱門訊息列表
+            time_range_days: 時間範圍（天數）
+            all_messages: 已經獲取的所有訊息數據（可選）
+            analysis_results: 已經計算好的分析結果（可選）
+            storage_target: 指定的轉發目標（可選），預設為與目標群組對應的儲存群組
+            
+        Returns:
+            bool: 成功更新則返回 True，否則返回 False
+        """
+        try:
+            storage_group = await self.find_or_create_storage_group(target_group, storage_target)
+            
+            if not storage_group:
+                logger.error("無法找到或創建儲存群組，取消操作")
+                return False
+            
+            if self.slot_store is None:
+                self.slot_store = DigestSlotStore()
+            
+            client = self.client_manager.client
+            storage_entity = storage_group['entity']
+            source_id = getattr(target_group, 'id', None)
+            
+            # 儲存群組變更時（例如被重新創建）重新建立欄位
+            state = self.slot_store.get(source_id)
+            if state and state.get('storage_id') == self._unmarked_channel_id(storage_group['id']):
+                # 舊版本在創建儲存群組當次記錄的是不帶標記的頻道 ID
+                state['storage_id'] = storage_group['id']
+            if not state or state.get('storage_id') != storage_group['id']:
+                state = {
+                    'storage_id': storage_group['id'],
+                    'header_message_id': None,
+                    'header_text': '',
+                    'slots': [],
+                    'media': {}
+                }
+            
+            actions = {'unchanged': 0, 'edited': 0, 'sent': 0}
+            
+            # 更新置頂摘要
+            header_text = self._build_header_message(
+                target_group, top_messages, time_range_days, all_messages, analysis_results
+            )
+            header_id, action = await self._upsert_message(
+                storage_entity, state.get('header_message_id'), state.get('header_text'), header_text
+            )
+            actions[action] += 1
+            if action == 'sent':
+                try:
+                    await client.pin_message(storage_entity, header_id, notify=False)
+                except Exception as pin_error:
+                    logger.warning(f"置頂摘要訊息失敗: {pin_error}")
+            state['header_message_id'] = header_id
+            state['header_text'] = header_text
+            
+            # 更新各排名欄位
+            slots = state['slots']
+            for idx, msg in enumerate(top_messages, 1):
+                message_id = self._get_message_id(msg)
+                if message_id is None:
+                    logger.error(f"無法識別的訊息格式: {type(msg)}")
+                    continue
+                
+                # 新進榜且含媒體的訊息才轉發媒體，已轉發過的媒體直接連結
+                media_key = str(message_id)
+                if msg.get('has_media') and media_key not in state['media']:
+                    source_message = await self._get_source_message(target_group, message_id)
+                    if source_message and source_message.media:
+                        media_message = await self._process_media(source_message, storage_entity, target_group)
+                        if media_message:
+                            state['media'][media_key] = media_message.id
+                            actions['sent'] += 1
+                
+                slot_text = self._build_slot_text(idx, msg, source_id, message_id)
+                if media_key in state['media']:
+                    media_link = self._build_message_link(storage_group['id'], state['media'][media_key])
+                    slot_text += f"\n[點擊此處查看媒體]({media_link})"
+                
+                slot = slots[idx - 1] if idx <= len(slots) else None
+                slot_message_id, action = await self._upsert_message(
+                    storage_entity,
+                    slot['message_id'] if slot else None,
+                    slot['text'] if slot else None,
+                    slot_text
+                )
+                actions[action] += 1
+                new_slot = {'message_id': slot_message_id, 'source_message_id': int(message_id), 'text': slot_text}
+                if slot:
+                    slots[idx - 1] = new_slot
+                else:
+                    slots.append(new_slot)
+            
+            # 本次排名數量減少時，清空多出來的欄位
+            for idx in range(len(top_messages) + 1, len(slots) + 1):
+                slot = slots[idx - 1]
+                empty_text = f"💤 **第 {idx} 名排行**\n（本次分析無資料）"
+                slot_message_id, action = await self._upsert_message(
+                    storage_entity, slot['message_id'], slot['text'], empty_text
+                )
+                actions[action] += 1
+                slots[idx - 1] = {'message_id': slot_message_id, 'source_message_id': None, 'text': empty_text}
+            
+            self.slot_store.set(source_id, state)
+            self.slot_store.save()
+            
+            logger.info(
+                f"已就地更新儲存群組 {storage_group['name']} 的摘要: "
+                f"編輯 {actions['edited']} 則、新發送 {actions['sent']} 則、未變動 {actions['unchanged']} 則"
+            )
+            return True
+        
+        except Exception as e:
+            logger.error(f"就地更新熱門訊息摘要時發生錯誤: {e}")
+            return False
+    
+    async def _upsert_message(self, entity, message_id, old_text, new_text):
+        """編輯既有訊息，若不存在或編輯失敗則發送新訊息
+        
+        Args:
+            entity: 目標實體
+            message_id: 既有訊息 ID（可為 None）
+            old_text: 既有訊息內容
+            new_text: 新的訊息內容
+            
+        Returns:
+            tuple: (訊息 ID, 執行的動作 'unchanged' / 'edited' / 'sent')
+        """
+        if message_id and old_text == new_text:
+            return message_id, 'unchanged'
+        
+        if message_id:
+            try:
+                await self.client_manager.client.edit_message(entity, message_id, new_text)
+                return message_id, 'edited'
+            except Exception as edit_error:
+                logger.warning(f"編輯訊息 {message_id} 失敗: {edit_error}，改為發送新訊息")
+        
+        sent = await self.client_manager.client.send_message(entity, new_text)
+        return sent.id, 'sent'
+    
+    def _build_slot_text(self, idx, msg, source_id, message_id) -> str:
+        """生成排名欄位的訊息內容
+        
+        Args:
+            idx: 訊息排名
+            msg: 熱門訊息資料
+            source_id: 來源群組 ID
+            message_id: 來源訊息 ID
+            
+        Returns:
+            str: 排名欄位內容
+        """
+        stats = self._extract_stats(msg, idx)
+        
+        slot_text = (
+            f"💥 **第 {idx} 名排行**\n"
+            f"回覆數: {stats['reply_count']}\n"
+            f"反應總數: {stats['total_reactions']}\n"
+        )
+        
+        reactions_detail = msg.get('reactions_detail')
+        if reactions_detail:
+            slot_text += f"表情符號: {reactions_detail}\n"
+        
+        display_name = msg.get('display_name')
+        if display_name:
+            slot_text += f"使用者: {display_name}\n"
+        
+        message_date = msg.get('date')
+        if hasattr(message_date, 'strftime'):
+            slot_text += f"發布時間: {message_date.strftime('%Y-%m-%d %H:%M')}\n"
+        
+        if source_id is not None:
+            slot_text += f"[點擊此處查看原始訊息]({self._build_message_link(source_id, message_id)})\n"
+        
+        text = msg.get('text') or ''
+        if len(text) > SLOT_TEXT_LIMIT:
+            text = text[:SLOT_TEXT_LIMIT] + "…"
+        if text:
+            slot_text += f"\n📝 **訊息內容**：\n{text}"
+        
+        return slot_text.rstrip('\n')
+            
+    def _build_header_message(self, target_group, top_messages, time_range_days=7, all_messages=None, analysis_results=None) -> str:
+        """生成熱門訊息摘要的標題訊息
+        
+        Args:
+            target_group: 目標群組實體
+            top_messages: 熱門訊息列表
+            time_range_days: 時間範圍（天數）
+            all_messages: 已經獲取的所有訊息數據（可選）
+            analysis_results: 已經計算好的分析結果（可選）
+            
+        Returns:
+            str: 標題訊息內容
+        """
+        # 預設統計信息
+        first_date = None
+        last_date = None
+        message_count = 0
+        
+        # 如果有提供已分析的訊息數據，則直接使用
+        if all_messages and len(all_messages) > 0:
+            # 使用已經獲取的訊息數據來計算時間範圍和總數
+            message_count = len(all_messages)
+            
+            # 從提供的訊息數據中提取時間範圍
+            dates = [msg['date'] for msg in all_messages if 'date' in msg]
+            if dates:
+                first_date = min(dates)
+                last_date = max(dates)
+                
+        # 如果有提供分析結果，則從中獲取時間範圍
+        elif analysis_results and 'period' in analysis_results:
+            period = analysis_results['period']
+            # 注意: 這裡的日期可能是日期對象，而不是帶時區的datetime
+            first_date = datetime.combine(period['start'], datetime.min.time()).replace(tzinfo=timezone.utc)
+            last_date = datetime.combine(period['end'], datetime.max.time()).replace(tzinfo=timezone.utc)
+            message_count = analysis_results.get('total_messages', len(top_messages))
+        else:
+            # 如果沒有提供訊息數據，則顯示使用默認的時間範圍
+            print("\n使用預設時間範圍...")
+            # 預設使用目前時間減去指定天數
+            last_date = datetime.now(timezone.utc)
+            first_date = last_date - timedelta(days=time_range_days)
+            message_count = len(top_messages)
+            
+        # 計算實際天數範圍
+        actual_days = (last_date - first_date).days + 1 if first_date and last_date else time_range_days
+        
+        # 格式化日期時間為中文年月日格式
+        first_date_str = first_date.strftime("%Y年%m月%d日 %H:%M:%S") if first_date else "未知時間"
+        last_date_str = last_date.strftime("%Y年%m月%d日 %H:%M:%S") if last_date else "未知時間"
+        
+        # 標題訊息說明這是哪個群組的熱門訊息
+        source_name = getattr(target_group, 'title', '未知群組')
+        current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")
+        
+        return (
+            f"📊 **{source_name}** 熱門訊息摘要\n\n"
+            f"⏱ 分析時間: {current_time}\n"
+            f"📈 共選出 {len(top_messages)} 條熱門訊息\n"
+            f"📄 總訊息數: {message_count} 則\n"
+            f"📅 訊息時間範圍: {first_date_str}～{last_date_str}\n"
+            f"⌛ 實際天數: {actual_days} 天\n\n"
+            f"-----------------------------------"
+        )
+    
+    @staticmethod
+    def _get_message_id(msg) -> Optional[int]:
+        """從熱門訊息資料中取出原始訊息 ID
+        
+        Args:
+            msg: 熱門訊息資料（字典或 pandas Series）
+            
+        Returns:
+            Optional[int]: 訊息 ID，無法識別時返回 None
+        """
+        # 檢查 msg 是否為 pandas Series 類型（只有分析過訊息時才可能是 Series，不為此匯入 pandas）
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(msg, pd.Series):
+            # 如果是 pandas Series，取出 id 字段用於獲取原始訊息
+            if 'id' in msg:
+                return msg['id']
+        # 檢查 msg 是否為字典，且包含 id 或 message 字段
+        elif isinstance(msg, dict) and ('id' in msg or 'message' in msg):
+            return msg.get('id') or msg.get('message')
+        return None
+    
+    @staticmethod
+    def _unmarked_channel_id(chat_id) -> Optional[int]:
+        """取得帶 -100 標記的頻道 ID 對應的原始 ID，其他 ID 返回 None"""
+        peer_id, peer_type = utils.resolve_id(int(chat_id))
+        return peer_id if peer_type is PeerChannel and peer_id != chat_id else None
+
+    @staticmethod
+    def _build_message_link(chat_id, message_id) -> str:
+        """生成訊息的超連結
+        
+        Args:
+            chat_id: 聊天 ID（可為 -100 開頭的完整 ID 或頻道原始 ID）
+            message_id: 訊息 ID
+            
+        Returns:
+            str: t.me 格式的訊息連結
+        """
+        channel_id = str(chat_id)
+        if channel_id.startswith('-100'):
+            channel_id = channel_id[4:]
+        return f"https://t.me/c/{channel_id.lstrip('-')}/{message_id}"
+    
+    @staticmethod
+    def _extract_stats(msg, idx) -> Dict[str, Any]:
+        """從熱門訊息資料中取出要記錄的統計數據
+        
+        Args:
+            msg: 熱門訊息資料（字典或 pandas Series）
+            idx: 訊息排名
+            
+        Returns:
+            Dict[str, Any]: 排名、反應總數與回覆數
+        """
+        return {
+            'rank': idx,
+            'total_reactions': int(msg.get('total_reactions', 0) or 0),
+            'reply_count': int(msg.get('reply_count', 0) or 0)
+        }
+    
+    async def _get_source_message(self, source_group, message_id):
+        """向客戶端池取得帳號並獲取原始訊息
+        
+        Args:
+            source_group: 源群組實體
+            message_id: 訊息 ID
+            
+        Returns:
+            Optional[Message]: 原始訊息，失敗時返回 None
+        """
+        while True:
+            manager, entity = await self.client_manager.acquire(source_group)
+            try:
+                return await manager.client.get_messages(entity, ids=message_id)
+            except FloodWaitError as e:
+                manager.report_flood(e.seconds)
+                logger.warning(f"獲取原始訊息時遇到 FloodWait ({e.seconds} 秒)，改用其他帳號重試")
+            finally:
+                self.client_manager.release(manager)
+    
+    async def _send_repost_reference(self, storage_group, ledger_entry, idx, stats):
+        """對先前已發布的訊息發送簡短的參照訊息，而非重新複製文字與媒體
+        
+        Args:
+            storage_group: 儲存群組信息
+            ledger_entry: 轉發記錄簿中的記錄
+            idx: 本次排名
+            stats: 本次統計數據
+        """
+        previous = ledger_entry.get('stats', {})
+        storage_message_ids = ledger_entry.get('storage_message_ids') or []
+        
+        reference_message = f"🔁 **第 {idx} 名排行**（持續熱門）\n"
+        reference_message += f"反應總數: {stats['total_reactions']}"
+        if 'total_reactions' in previous and previous['total_reactions'] != stats['total_reactions']:
+            reference_message += f"（上次 {previous['total_reactions']}）"
+        reference_message += f"\n回覆數: {stats['reply_count']}"
+        if 'rank' in previous:
+            reference_message += f"\n上次排名: 第 {previous['rank']} 名"
+        
+        if storage_message_ids:
+            earlier_link = self._build_message_link(ledger_entry['storage_id'], storage_message_ids[0])
+            reference_message += f"\n[點擊此處查看先前的發布]({earlier_link})"
+        
+        await self.client_manager.client.send_message(storage_group['entity'], reference_message)
+        logger.info(f"訊息 ID {ledger_entry['message_id']} 先前已發布，僅發送參照訊息")
+    
+    async def _process_message(self, source_message, target_entity, idx, source_group=None) -> List[int]:
         """處理單條訊息的複製轉發
         
         Args:
             source_message: 源訊息對象
             target_entity: 目標實體
             idx: 訊息排名
+            source_group: 源群組實體（可選），用於以主要帳號轉發媒體
+            
+        Returns:
+            List[int]: 在目標實體中發送出的訊息 ID 列表
         """
         # 準備發送者信息
         sender_info = ""
@@ -221,7 +734,7 @@ class MessageForwarder:
         message_date = source_message.date.strftime("%Y-%m-%d %H:%M") if hasattr(source_message, 'date') else "未知時間"
         
         # 生成原始訊息的超連結
-        original_message_link = f"https://t.me/c/{str(source_message.chat_id)[4:]}/{source_message.id}"
+        original_message_link = self._build_message_link(source_message.chat_id, source_message.id)
         
         # 獲取反應和回覆數 - 直接從原始訊息獲取
         reactions_count = 0
@@ -268,52 +781,71 @@ class MessageForwarder:
         rank_message += f"\n發布時間: {message_date}\n"
         rank_message += f"[點擊此處查看原始訊息]({original_message_link})"
         
+        sent_ids = []
+        
         # 處理媒體檔案和文字訊息
         if source_message.media:
             # 發送排行訊息
-            await self.client_manager.client.send_message(target_entity, rank_message)
+            sent = await self.client_manager.client.send_message(target_entity, rank_message)
+            sent_ids.append(sent.id)
             
             # 添加原始文本內容（如果有）
             if source_message.text:
                 text_content = f"📝 **訊息內容**：\n{source_message.text}"
-                await self.client_manager.client.send_message(target_entity, text_content)
+                sent = await self.client_manager.client.send_message(target_entity, text_content)
+                sent_ids.append(sent.id)
             
-            await self._process_media(source_message, target_entity)
+            media_message = await self._process_media(source_message, target_entity, source_group)
+            if media_message:
+                sent_ids.append(media_message.id)
             
         elif source_message.text:
             # 文字訊息處理
             text_content = f"📝 **訊息內容**：\n{source_message.text}"
             
             # 發送排行訊息
-            await self.client_manager.client.send_message(target_entity, rank_message)
+            sent = await self.client_manager.client.send_message(target_entity, rank_message)
+            sent_ids.append(sent.id)
             
             # 發送訊息內容
-            await self.client_manager.client.send_message(target_entity, text_content)
+            sent = await self.client_manager.client.send_message(target_entity, text_content)
+            sent_ids.append(sent.id)
         else:
             # 沒有文字也沒有媒體的訊息，跳過
             logger.warning(f"訊息ID {source_message.id} 沒有文字內容也沒有媒體檔案，跳過")
+        
+        return sent_ids
             
-    async def _process_media(self, source_message, target_entity) -> bool:
+    async def _process_media(self, source_message, target_entity, source_group=None):
         """處理媒體訊息的轉發
         
         Args:
             source_message: 源媒體訊息
             target_entity: 目標實體
+            source_group: 源群組實體（可選），源訊息可能由客戶端池中的其他帳號取得，
+                轉發時以主要帳號的群組實體和訊息 ID 指定
             
         Returns:
-            bool: 成功處理則返回True
+            Optional[Message]: 成功時返回在目標實體中發送的訊息，否則返回 None
         """
         message_id = source_message.id
         
         # 第一步：嘗試直接轉發訊息
         try:
             logger.info(f"嘗試直接轉發媒體訊息 ID: {message_id}")
-            await self.client_manager.client.forward_messages(
-                target_entity,
-                source_message
-            )
+            if source_group is not None:
+                forwarded = await self.client_manager.client.forward_messages(
+                    target_entity,
+                    message_id,
+                    from_peer=source_group
+                )
+            else:
+                forwarded = await self.client_manager.client.forward_messages(
+                    target_entity,
+                    source_message
+                )
             logger.info(f"成功轉發媒體訊息 ID: {message_id}")
-            return True
+            return forwarded[0] if isinstance(forwarded, list) else forwarded
         except Exception as forward_error:
             logger.warning(f"直接轉發媒體訊息失敗: {forward_error}，將嘗試下載後重新上傳")
         
@@ -355,35 +887,41 @@ class MessageForwarder:
             
             # 改為放在results目錄中
             media_dir = RESULTS_DIR / "media"
-            media_dir.mkdir(exist_ok=True)
+            media_dir.mkdir(parents=True, exist_ok=True)
             
             temp_path = str(media_dir / original_filename)
             
             # 下載媒體檔案到臨時路徑
-            downloaded_path = await self.client_manager.client.download_media(source_message, temp_path)
+            # 使用取得這則訊息的帳號下載，檔案參照只對該帳號有效
+            with metrics.timer('media_transfer', direction='download'):
+                downloaded_path = await source_message.download_media(temp_path)
             if downloaded_path:
                 logger.info(f"媒體檔案已下載到: {downloaded_path}")
+                media_size = os.path.getsize(downloaded_path)
+                metrics.inc('bytes_downloaded', media_size, kind='media')
                 
                 # 重新上傳媒體文件，保留原始文件名
                 caption = "媒體檔案"
                 if original_filename:
                     caption += f" ({original_filename})"
                 
-                await self.client_manager.client.send_file(
-                    target_entity,
-                    downloaded_path,
-                    caption=caption
-                )
+                with metrics.timer('media_transfer', direction='upload'):
+                    uploaded = await self.client_manager.client.send_file(
+                        target_entity,
+                        downloaded_path,
+                        caption=caption
+                    )
+                metrics.inc('bytes_uploaded', media_size, kind='media')
                 
                 # 刪除臨時檔案
                 try:
                     os.remove(downloaded_path)
                 except Exception as remove_error:
                     logger.warning(f"無法刪除臨時文件: {remove_error}")
-                return True
+                return uploaded
             else:
                 logger.warning(f"無法下載媒體檔案，訊息ID: {message_id}")
-                return False
+                return None
         except Exception as media_error:
             logger.error(f"處理媒體檔案時出錯: {media_error}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+佇列工作者服務
+從共用的工作佇列領取群組分析工作，以本機的 Telegram 會話執行並回報結果
+"""
+import os
+import socket
+import asyncio
+from typing import Dict, Any, Callable, List, Optional
+
+from telethon.errors import FloodWaitError
+
+# 更新導入路徑
+from config.constants import JOB_LEASE_SECONDS, JOB_POLL_SECONDS
+from src.utils.logger import logger
+from src.utils.metrics import export_metrics
+
+
+class QueueWorker:
+    """佇列工作者，每次領取一個工作，執行期間定期送出心跳延長租約"""
+
+    def __init__(self, pipeline, job_queue, parse_args: Callable[[List[str]], Any], worker_id: Optional[str] = None,
+                 lease_seconds=JOB_LEASE_SECONDS, poll_seconds=JOB_POLL_SECONDS, run_coordinator=None):
+        """初始化佇列工作者
+
+        Args:
+            pipeline: 分析流程實例
+            job_queue: 工作佇列實例
+            parse_args: 將工作參數 (argv 列表) 解析為命令行參數的函數
+            worker_id: 工作者識別，預設為 主機名稱:pid
+            lease_seconds: 租約長度（秒）
+            poll_seconds: 沒有工作時的輪詢間隔（秒）
+            run_coordinator: 執行協調器（可選），用於接手重疊排程加入待處理檔案的群組
+        """
+        self.pipeline = pipeline
+        self.job_queue = job_queue
+        self.parse_args = parse_args
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.run_coordinator = run_coordinator
+
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None, once: bool = False):
+        """持續領取並執行工作
+
+        Args:
+            stop_event: 停止事件（可選）
+            once: 佇列清空後即結束，而不是繼續等待新工作
+        """
+        stop_event = stop_event or asyncio.Event()
+        logger.info(f"佇列工作者 {self.worker_id} 已啟動，佇列: {self.job_queue.db_file}")
+
+        while not stop_event.is_set():
+            self.queue_pending_groups()
+            job = self.job_queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                if once:
+                    break
+                try:
+                    await asyncio.wait_for(stop_event.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+        logger.info(f"佇列工作者 {self.worker_id} 已停止: 完成 {self.jobs_completed} 個工作，失敗 {self.jobs_failed} 次")
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        """在租約到期前定期延長租約"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.job_queue.heartbeat(job['job_id'], self.worker_id, self.lease_seconds):
+                logger.warning(f"工作 {job['job_id']} 的租約已失效，結果可能與其他工作者重複")
+                return
+
+    def queue_pending_groups(self) -> int:
+        """將重疊排程加入待處理檔案的群組轉為佇列工作
+
+        工作者持有執行鎖時，重疊的排程只能把群組寫入待處理檔案；
+        轉入佇列後依各排程原本的參數執行，並沿用佇列的重試與租約機制
+
+        Returns:
+            int: 加入佇列的工作數量
+        """
+        if self.run_coordinator is None:
+            return 0
+
+        added = 0
+        for pending in self.run_coordinator.take_pending():
+            for group in pending['groups']:
+                if self.job_queue.enqueue(group, pending['argv']) is not None:
+                    added += 1
+        if added:
+            logger.info(f"已將待處理檔案中的 {added} 個群組加入工作佇列")
+        return added
+
+    async def run_job(self, job: Dict[str, Any]):
+        """執行單個工作並回報結果
+
+        Args:
+            job: 從佇列領取的工作
+        """
+        group = job['group']
+        logger.info(f"執行工作 {job['job_id']}: 群組 {group['name']}（第 {job['attempts']} 次嘗試）")
+        heartbeat_task = asyncio.create_task(self._heartbeat(job))
+        error = None
+        retry_after = None
+        try:
+            args = self.parse_args(job['argv'])
+            if getattr(args, 'forward_mode', None):
+                self.pipeline.message_forwarder.forward_mode = args.forward_mode
+            await self.pipeline.prepare_groups([group])
+            summary = await self.pipeline.run_group(group, args, forward=job['forward'])
+            if summary['status'] == 'error':
+                error = summary.get('error')
+        except FloodWaitError as e:
+            # 帳號被限制時至少等到限制解除才重試
+            error = f"FloodWait {e.seconds} 秒"
+            retry_after = e.seconds
+        except SystemExit:
+            error = f"無效的工作參數: {' '.join(job['argv'])}"
+        except Exception as e:
+            logger.error(f"執行工作 {job['job_id']} 時發生錯誤: {e}", exc_info=True)
+            error = str(e)
+        finally:
+            heartbeat_task.cancel()
+            self.pipeline.client_manager.log_request_stats(reset=True)
+            export_metrics('worker', reset=True)
+
+        if error is None:
+            if not self.job_queue.complete(job['job_id'], self.worker_id, summary):
+                logger.warning(f"工作 {job['job_id']} 已完成，但租約已失效，未記錄結果（可能已由其他工作者重新執行）")
+            self.jobs_completed += 1
+            return
+
+        self.jobs_failed += 1
+        status = self.job_queue.fail(job['job_id'], self.worker_id, error, retry_after=retry_after)
+        if status is None:
+            logger.warning(f"工作 {job['job_id']} 失敗（{error}），但租約已失效，未記錄失敗")
+        else:
+            logger.warning(f"工作 {job['job_id']} 失敗（{error}），狀態: {status}")
@@ -0,0 +1,224 @@
+"""
+執行協調服務
+以每個會話一個鎖檔避免多個程序同時使用同一個 Telethon 會話，並將重疊的排程合併到執行中的工作
+"""
+import os
+import json
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # 沒有 fcntl 的平台只能依靠 pid 與心跳判斷
+    fcntl = None
+
+# 更新導入路徑
+from config.settings import ROOT_DIR, SESSION_NAME
+from config.constants import RUN_LOCK_HEARTBEAT_SECONDS, RUN_LOCK_STALE_SECONDS
+from src.utils.logger import logger
+from data.atomic_io import atomic_write_json, file_lock, read_json, _write_replace
+
+
+def _pid_alive(pid: int) -> bool:
+    """檢查程序是否仍在執行"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RunCoordinator:
+    """執行協調器
+
+    鎖檔 <會話名稱>.run.lock 以 flock 持有，程序結束（包括異常終止）時由系統自動釋放；
+    檔案內容記錄 pid、開始時間與心跳時間，供其他程序判斷執行狀態。
+    待處理檔案 <會話名稱>.pending.json 保存執行期間其他排程要求分析的群組
+    """
+
+    def __init__(self, session_name=SESSION_NAME, lock_dir: Path = ROOT_DIR,
+                 heartbeat_seconds=RUN_LOCK_HEARTBEAT_SECONDS, stale_seconds=RUN_LOCK_STALE_SECONDS):
+        """初始化執行協調器
+
+        Args:
+            session_name: 會話名稱，每個會話各自一個鎖
+            lock_dir: 鎖檔目錄
+            heartbeat_seconds: 心跳更新間隔（秒）
+            stale_seconds: 心跳超過此秒數未更新時視為停滯
+        """
+        self.lock_file = Path(lock_dir) / f"{session_name}.run.lock"
+        self.pending_file = Path(lock_dir) / f"{session_name}.pending.json"
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+
+        self._lock_handle = None
+        self._info: Dict[str, Any] = {}
+        self._heartbeat_task = None
+
+    def holder_info(self) -> Optional[Dict[str, Any]]:
+        """讀取鎖檔中記錄的執行資訊
+
+        Returns:
+            Optional[Dict[str, Any]]: pid、started_at、heartbeat_at、mode，無記錄則返回 None
+        """
+        try:
+            return read_json(self.lock_file) or None
+        except (OSError, ValueError):
+            return None
+
+    def is_stale(self, info: Optional[Dict[str, Any]]) -> bool:
+        """檢查執行資訊是否已停滯（程序不存在或心跳過久未更新）
+
+        Args:
+            info: 執行資訊
+
+        Returns:
+            bool: 是否停滯
+        """
+        if not info or not _pid_alive(int(info.get('pid', 0))):
+            return True
+        try:
+            heartbeat_at = datetime.fromisoformat(info['heartbeat_at'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return (datetime.now() - heartbeat_at).total_seconds() > self.stale_seconds
+
+    def acquire(self, mode: str = 'run') -> bool:
+        """嘗試取得執行鎖（不等待）
+
+        Args:
+            mode: 執行模式（記錄在鎖檔中，例如 run、daemon）
+
+        Returns:
+            bool: 是否取得
+        """
+        previous = self.holder_info()
+
+        if fcntl is not None:
+            handle = open(self.lock_file, 'a+')
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                return False
+            self._lock_handle = handle
+            if previous and previous.get('pid') != os.getpid():
+                # flock 已釋放但鎖檔仍有記錄，表示上一次執行異常結束
+                logger.warning(f"上一次執行 (pid {previous.get('pid')}, 開始於 {previous.get('started_at')}) 未正常結束")
+        elif previous and not self.is_stale(previous):
+            return False
+
+        now = datetime.now().isoformat()
+        self._info = {'pid': os.getpid(), 'started_at': now, 'heartbeat_at': now, 'mode': mode}
+        self._write_info()
+        return True
+
+    def _write_info(self):
+        """將執行資訊寫入鎖檔
+
+        flock 持有的是鎖檔的檔案描述符，直接覆寫內容而不改名，才不會讓鎖失效
+        """
+        if self._lock_handle is not None:
+            self._lock_handle.seek(0)
+            self._lock_handle.truncate()
+            self._lock_handle.write(json.dumps(self._info, ensure_ascii=False))
+            self._lock_handle.flush()
+        else:
+            atomic_write_json(self.lock_file, self._info)
+
+    def start_heartbeat(self):
+        """在事件迴圈中定期更新心跳時間"""
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        """定期更新鎖檔中的心跳時間"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            self._info['heartbeat_at'] = datetime.now().isoformat()
+            self._write_info()
+
+    def release(self):
+        """釋放執行鎖並清除鎖檔記錄"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        if not self._info:
+            return
+
+        if self._lock_handle is not None:
+            self._lock_handle.seek(0)
+            self._lock_handle.truncate()
+            fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+            self._lock_handle.close()
+            self._lock_handle = None
+        elif self.lock_file.exists():
+            self.lock_file.unlink()
+        self._info = {}
+
+    def describe_holder(self) -> str:
+        """產生目前持有鎖的執行描述，用於日誌
+
+        Returns:
+            str: 描述文字
+        """
+        info = self.holder_info()
+        if not info:
+            return "另一個程序正在使用此會話"
+        description = (f"pid {info.get('pid')} ({info.get('mode', 'run')}) 於 {info.get('started_at')} 開始執行，"
+                       f"最後心跳 {info.get('heartbeat_at')}")
+        if self.is_stale(info):
+            description += f"，心跳已停滯超過 {self.stale_seconds} 秒，請檢查該程序是否卡住"
+        return description
+
+    def enqueue(self, argv: List[str], groups: List[Dict[str, Any]]) -> int:
+        """將群組加入待處理檔案，由執行中的工作在完成後一併處理
+
+        相同參數的要求會合併，同一群組只保留一次
+
+        Args:
+            argv: 本次執行的命令行參數
+            groups: 要分析的群組
+
+        Returns:
+            int: 新加入的群組數
+        """
+        with file_lock(self.pending_file):
+            jobs = self._read_pending()
+            job = next((j for j in jobs if j['argv'] == argv), None)
+            if job is None:
+                job = {'argv': argv, 'groups': [], 'queued_at': datetime.now().isoformat()}
+                jobs.append(job)
+            known = {group['id'] for group in job['groups']}
+            added = [group for group in groups if group['id'] not in known]
+            job['groups'].extend(added)
+            self._write_pending(jobs)
+        return len(added)
+
+    def take_pending(self) -> List[Dict[str, Any]]:
+        """取出並清空所有待處理的要求
+
+        Returns:
+            List[Dict[str, Any]]: 每個要求的 argv 與 groups
+        """
+        if not self.pending_file.exists():
+            return []
+        with file_lock(self.pending_file):
+            jobs = self._read_pending()
+            if jobs:
+                self._write_pending([])
+        return jobs
+
+    def _read_pending(self) -> List[Dict[str, Any]]:
+        """讀取待處理檔案（呼叫端需持有鎖）"""
+        try:
+            return read_json(self.pending_file)
+        except (OSError, ValueError):
+            return []
+
+    def _write_pending(self, jobs: List[Dict[str, Any]]):
+        """寫入待處理檔案（呼叫端需持有鎖，因此不經過 atomic_write_json 再取一次鎖）"""
+        _write_replace(self.pending_file, json.dumps(jobs, ensure_ascii=False, indent=2))
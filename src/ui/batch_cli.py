@@ -0,0 +1,131 @@
+"""
+批次模式命令行模組
+提供 `telegram_reviewer.py batch <設定檔>` 子命令，不顯示任何互動介面，以結束代碼回報結果
+"""
+import sys
+import asyncio
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+# 更新導入路徑
+from config.settings import RESULTS_DIR, SESSION_NAME, ensure_directories
+from config.constants import LOG_FORMATS, DEFAULT_LOG_FILE_FORMAT
+from src.utils.logger import logger, configure_logging, shutdown_logging
+from src.utils.metrics import export_metrics
+from src.utils.tracing import start_tracing, stop_tracing
+from src.services.analysis_pipeline import AnalysisPipeline
+from src.services.batch_runner import (
+    BatchRunner, load_batch_config, print_result_line,
+    EXIT_CONFIG_ERROR, EXIT_CONNECTION_ERROR, EXIT_BUSY
+)
+from src.services.run_coordinator import RunCoordinator
+from data.atomic_io import atomic_write_json
+from data.columnar import json_default
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立 batch 子命令的參數解析器
+
+    Returns:
+        argparse.ArgumentParser: 參數解析器
+    """
+    parser = argparse.ArgumentParser(
+        prog='telegram_reviewer.py batch',
+        description='依群組設定檔批次分析；每個群組完成時在標準輸出印出一行 JSON'
+    )
+    parser.add_argument('config', help='群組設定檔 (JSON 或 YAML)')
+    parser.add_argument('--concurrency', type=int, default=None, help='同時分析的群組數（覆寫設定檔）')
+    parser.add_argument('--output', default=None,
+                        help='完整結果報告的路徑 (預設: results/batch_<時間>.json)')
+    parser.add_argument('--log-format', dest='log_format', choices=LOG_FORMATS, default=DEFAULT_LOG_FILE_FORMAT,
+                        help=f'日誌檔格式 (預設: {DEFAULT_LOG_FILE_FORMAT})')
+    parser.add_argument('--trace', nargs='?', const='', default=None, metavar='FILE',
+                        help='寫出各群組的時間軸 (Chrome trace-event 格式，預設: results/traces/trace_<時間>.json)')
+    return parser
+
+
+async def _run_batch(config, concurrency: int, output: Path,
+                     parse_args: Callable[[List[str]], Any], create_services: Callable) -> int:
+    """連線並執行批次分析
+
+    Args:
+        config: load_batch_config 的結果
+        concurrency: 同時分析的群組數
+        output: 結果報告路徑
+        parse_args: 將參數列表解析為命令行參數的函數
+        create_services: 依命令行參數建立服務的函數
+
+    Returns:
+        int: 結束代碼
+    """
+    run_coordinator = RunCoordinator(SESSION_NAME)
+    if not run_coordinator.acquire(mode='batch'):
+        print(f"此會話正在使用中: {run_coordinator.describe_holder()}", file=sys.stderr)
+        return EXIT_BUSY
+
+    base_args = parse_args(['--forward-mode', config['forward_mode']] if config['forward_mode'] else [])
+    client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage = create_services(base_args)
+    started_at = datetime.now()
+    try:
+        try:
+            await client_manager.connect()
+        except Exception as e:
+            logger.error(f"批次模式無法連線到 Telegram: {e}", exc_info=True)
+            print(f"無法連線到 Telegram: {e}", file=sys.stderr)
+            return EXIT_CONNECTION_ERROR
+
+        pipeline = AnalysisPipeline(
+            client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage
+        )
+        runner = BatchRunner(pipeline, parse_args, concurrency=concurrency, on_result=print_result_line)
+        summaries = await runner.run(config['groups'])
+        exit_code = runner.exit_code(summaries)
+
+        atomic_write_json(output, {
+            'started_at': started_at,
+            'finished_at': datetime.now(),
+            'exit_code': exit_code,
+            'groups': summaries,
+        }, default=json_default)
+        print(f"結果報告: {output}", file=sys.stderr)
+        return exit_code
+    finally:
+        client_manager.log_request_stats()
+        export_metrics('batch')
+        if client_manager.client.is_connected():
+            await client_manager.close()
+        run_coordinator.release()
+
+
+def run_batch_command(argv: Optional[List[str]], parse_args: Callable[[List[str]], Any],
+                      create_services: Callable) -> int:
+    """執行 batch 子命令
+
+    Args:
+        argv: 子命令參數（不含 batch 本身）
+        parse_args: 將參數列表解析為命令行參數的函數
+        create_services: 依命令行參數建立服務的函數
+
+    Returns:
+        int: 結束代碼
+    """
+    args = build_parser().parse_args(argv)
+    ensure_directories()
+    try:
+        config = load_batch_config(args.config)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"設定檔無效: {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    output = args.output or config['output'] or RESULTS_DIR / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    concurrency = args.concurrency or config['concurrency']
+    configure_logging(args.log_format)
+    if args.trace is not None:
+        start_tracing()
+    try:
+        return asyncio.run(_run_batch(config, concurrency, Path(output), parse_args, create_services))
+    finally:
+        stop_tracing(Path(args.trace) if args.trace else None)
+        shutdown_logging()
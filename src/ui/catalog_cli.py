@@ -0,0 +1,103 @@
+"""
+分析結果索引命令行模組
+提供 `telegram_reviewer.py catalog ...` 子命令，直接從索引查詢歷史與趨勢
+"""
+import json
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+# 更新導入路徑
+from config.settings import RESULTS_DIR, RESULTS_CATALOG_FILE, ensure_directories
+from data.catalog import ResultsCatalog, CATALOG_METRICS
+
+
+def _parse_date(date_string: str) -> datetime:
+    """解析 YYYYMMDD 格式的日期"""
+    try:
+        return datetime.strptime(date_string, "%Y%m%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{date_string}' 不是有效的日期格式，請使用 YYYYMMDD 格式")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立 catalog 子命令的參數解析器
+
+    Returns:
+        argparse.ArgumentParser: 參數解析器
+    """
+    parser = argparse.ArgumentParser(prog='telegram_reviewer.py catalog', description='查詢分析結果索引')
+    parser.add_argument('--json', action='store_true', help='以 JSON 格式輸出')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('groups', help='列出索引中的群組')
+
+    history = commands.add_parser('history', help='列出分析記錄與熱門訊息')
+    history.add_argument('--group', help='群組 ID 或名稱')
+    history.add_argument('--since', type=_parse_date, help='執行日期下限 (YYYYMMDD)')
+    history.add_argument('--until', type=_parse_date, help='執行日期上限 (YYYYMMDD，包含當天)')
+    history.add_argument('--limit', type=int, default=20, help='最多顯示筆數 (預設: 20)')
+    history.add_argument('--top', type=int, default=5, help='每筆記錄顯示的熱門訊息數 (預設: 5)')
+
+    trend = commands.add_parser('trend', help='顯示群組指標的變化')
+    trend.add_argument('--group', required=True, help='群組 ID 或名稱')
+    trend.add_argument('--metric', choices=CATALOG_METRICS, default='total_messages', help='指標 (預設: total_messages)')
+    trend.add_argument('--since', type=_parse_date, help='執行日期下限 (YYYYMMDD)')
+    trend.add_argument('--until', type=_parse_date, help='執行日期上限 (YYYYMMDD，包含當天)')
+
+    commands.add_parser('rebuild', help='掃描結果目錄，將尚未索引的結果檔案加入索引')
+    return parser
+
+
+def run_catalog_command(argv: Optional[List[str]] = None) -> int:
+    """執行 catalog 子命令
+
+    Args:
+        argv: 子命令參數（不含 catalog 本身）
+
+    Returns:
+        int: 結束代碼
+    """
+    args = build_parser().parse_args(argv)
+    ensure_directories()
+    catalog = ResultsCatalog(RESULTS_CATALOG_FILE)
+    until = getattr(args, 'until', None)
+    if until is not None:
+        until += timedelta(days=1)  # 包含結束日期當天
+
+    try:
+        if args.command == 'rebuild':
+            added = catalog.rebuild(RESULTS_DIR)
+            print(f"已將 {added} 個結果檔案加入索引")
+            return 0
+
+        if args.command == 'groups':
+            rows = catalog.groups()
+        elif args.command == 'history':
+            rows = catalog.history(args.group, args.since, until, args.limit)
+        else:
+            rows = catalog.trend(args.group, args.metric, args.since, until)
+
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+            return 0
+
+        if args.command == 'groups':
+            for row in rows:
+                print(f"{row['group_name']} ({row['group_id']})  記錄 {row['runs']} 筆，最後執行 {row['last_run_at']}")
+
+        elif args.command == 'history':
+            for run in rows:
+                print(f"\n{run['run_at']}  {run['group_name']}  期間 {run['window_start']} ~ {run['window_end']}")
+                print(f"  訊息 {run['total_messages']}，使用者 {run['unique_users']}，最高反應 {run['top_reactions']}")
+                for rank, msg in enumerate(run['top_messages'][:args.top], 1):
+                    text = msg['text'].replace('\n', ' ')
+                    print(f"  {rank}. [{msg['total_reactions']}] {msg['display_name']}: {text}")
+                print(f"  檔案: {run['path']}")
+
+        else:
+            for point in rows:
+                print(f"{point['run_at']}  {point['window_start']} ~ {point['window_end']}  {args.metric}={point['value']}")
+    finally:
+        catalog.close()
+    return 0
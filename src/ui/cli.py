@@ -2,7 +2,6 @@
 命令行介面模組
 處理使用者的命令行互動功能
 """
-import os
 import sys
 import json
 import shutil
@@ -13,12 +12,17 @@ from typing import List, Dict, Any, Optional
 # 更新導入路徑
 from config.settings import GROUP_HISTORY_FILE
 from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils import profiling, tracing
 from data.storage import GroupHistoryManager
+from src.services.analysis_pipeline import AnalysisPipeline
+from src.ui.group_picker import GroupPicker
 
 class CommandLineInterface:
     """命令列互動介面，用於選擇群組查看熱門訊息"""
 
-    def __init__(self, client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage=None):
+    def __init__(self, client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage=None,
+                 run_coordinator=None):
         """初始化命令列介面
         
         Args:
@@ -27,12 +31,14 @@ class CommandLineInterface:
             message_analyzer: 訊息分析器實例
             message_forwarder: 訊息轉發器實例
             results_storage: 結果儲存管理器實例（可選）
+            run_coordinator: 執行協調器實例（可選），完成後一併分析執行期間其他排程加入的群組
         """
         self.client_manager = client_manager
         self.message_fetcher = message_fetcher
         self.message_analyzer = message_analyzer
         self.message_forwarder = message_forwarder
         self.results_storage = results_storage
+        self.run_coordinator = run_coordinator
         
         # 獲取終端寬度
         self.terminal_width = shutil.get_terminal_size().columns
@@ -43,6 +49,10 @@ class CommandLineInterface:
         # 上次選擇的群組紀錄
         self.history_manager = GroupHistoryManager()
         self.history_groups = self.history_manager.load_group_history()
+        # 共用的分析流程
+        self.pipeline = AnalysisPipeline(
+            client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage
+        )
 
     async def setup(self):
         """連接到 Telegram API"""
@@ -53,16 +63,22 @@ class CommandLineInterface:
             raise
 
     def clear_screen(self):
-        """清除終端畫面"""
-        os.system('cls' if sys.platform == 'win32' else 'clear')
+        """清除終端畫面（使用 ANSI 控制序列，不另外啟動 shell）"""
+        print("\033[2J\033[H", end="", flush=True)
+
+    def header_lines(self):
+        """應用程式標頭的內容"""
+        return [
+            "=" * 60,
+            "🔍 Telegram 群組熱門訊息分析工具 🔍".center(58),
+            f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}".center(58),
+            "=" * 60,
+        ]
 
     def print_header(self):
         """印出應用程式標頭"""
         self.clear_screen()
-        print("=" * 60)
-        print("🔍 Telegram 群組熱門訊息分析工具 🔍".center(58))
-        print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}".center(58))
-        print("=" * 60)
+        print("\n".join(self.header_lines()))
 
     def save_group_history(self, groups):
         """儲存選擇的群組
@@ -73,105 +89,36 @@ class CommandLineInterface:
         self.history_manager.save_group_history(groups)
 
     def select_groups_by_keyboard(self, groups):
-        """使用鍵盤方向鍵選擇多個群組"""
+        """使用鍵盤選擇多個群組（支援輸入文字搜尋）"""
         if not groups:
             print("❌ 沒有找到任何群組或頻道")
             return []
 
-        import termios
-        import tty
-        
-        # 設定初始值
-        selected_index = 0
-        total_options = len(groups)
-        selected_groups_indices = set()
-        
-        # 紀錄當前終端設定
-        fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        
         try:
-            # 進入原始模式
-            tty.setraw(sys.stdin.fileno())
-            
-            while True:
-                # 清除終端畫面並回復終端設定以正確輸出文字
-                termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-                self.print_header()
-                
-                print("\n👉 請使用方向鍵選擇要分析的群組:")
-                print("   空白鍵: 選擇/取消選擇當前群組")
-                print("   Enter: 確認選擇並開始分析")
-                print("   q: 退出\n")
-                
-                # 計算可用於顯示群組名稱的最大寬度
-                max_name_length = self.terminal_width - 30
-                
-                # 顯示選單項目
-                for i, group in enumerate(groups):
-                    group_type_icon = "📢" if group['type'] == '頻道' else "👥"
-                    
-                    # 截短群組名稱以防跑版
-                    name = group['name']
-                    if len(name) > max_name_length:
-                        name = name[:max_name_length-3] + "..."
-                    
-                    members_info = f" - {group['members_count']}人" if group['members_count'] > 0 else ""
-                    
-                    # 顯示選擇狀態和當前指標位置
-                    is_selected = i in selected_groups_indices
-                    prefix = "▶️ " if i == selected_index else "  "
-                    checkbox = "[✓]" if is_selected else "[ ]"
-                    
-                    print(f"{prefix}{checkbox} {i+1}. {group_type_icon} {name}{members_info}")
-                
-                # 顯示已選擇的群組數量
-                if selected_groups_indices:
-                    print(f"\n已選擇 {len(selected_groups_indices)} 個群組")
-                
-                # 返回原始模式以讀取按鍵
-                tty.setraw(sys.stdin.fileno())
-                
-                # 取得使用者輸入
-                key = ord(sys.stdin.read(1))
-                
-                # 退出程式 (q 鍵)
-                if key == 113:  # q
-                    return []
-                    
-                # 空格選擇/取消選擇
-                if key == 32:  # Space
-                    if selected_index in selected_groups_indices:
-                        selected_groups_indices.remove(selected_index)
-                    else:
-                        selected_groups_indices.add(selected_index)
-                
-                # Enter 確認選擇
-                if key == 13:  # Enter
-                    if selected_groups_indices:
-                        # 將選中的群組轉換為列表並返回
-                        return [groups[i] for i in sorted(selected_groups_indices)]
-                    else:
-                        # 如果沒有選擇任何群組，則選擇當前指標所在的群組
-                        return [groups[selected_index]]
-                    
-                # 方向鍵
-                if key == 27:  # ESC (方向鍵開頭)
-                    next_char = ord(sys.stdin.read(1))
-                    if next_char == 91:  # [
-                        direction = ord(sys.stdin.read(1))
-                        if direction == 65:  # 上鍵
-                            selected_index = (selected_index - 1) % total_options
-                        elif direction == 66:  # 下鍵
-                            selected_index = (selected_index + 1) % total_options
-                
+            return GroupPicker(groups, header_lines=self.header_lines()).run()
         except Exception as e:
             print(f"發生錯誤: {e}")
             return []
-            
-        finally:
-            # 恢復終端設定
-            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+    
+    async def refresh_dialogs_in_background(self, dialogs):
+        """在背景增量更新群組列表，並將結果合併到正在顯示的列表中
+        
+        Args:
+            dialogs: 正在顯示的群組列表（會被就地更新）
+        """
+        try:
+            refreshed = await self.client_manager.refresh_dialogs()
+        except Exception as e:
+            logger.error(f"背景更新群組列表失敗: {e}")
+            return
+        
+        # 只更新既有項目並在尾端加入新群組，避免移動使用者目前的游標位置
+        known = {dialog['id']: dialog for dialog in dialogs}
+        for dialog in refreshed:
+            if dialog['id'] in known:
+                known[dialog['id']].update(dialog)
+            else:
+                dialogs.append(dialog)
     
     def display_loading_animation(self, message):
         """顯示載入動畫"""
@@ -218,6 +165,11 @@ class CommandLineInterface:
             group: 群組信息
             args: 命令行參數
         """
+        with tracing.group_context(group['id']), tracing.span(f"group {group['name']}", 'group'):
+            await self._analyze_group(group, args)
+    
+    async def _analyze_group(self, group, args):
+        """analyze_group 的實作"""
         # 根據參數顯示不同的訊息提示
         if args.start_date is not None:
             # 顯示指定日期範圍
@@ -232,14 +184,15 @@ class CommandLineInterface:
         entity = None
         try:
             # 如果是從歷史記錄載入的，需要重新獲取實體
-            if 'entity' in group:
-                entity = group['entity']
-            else:
-                entity = await self.client_manager.get_entity(group['id'])
+            entity = await self.pipeline.resolve_entity(group)
         except Exception as e:
             print(f"\n❌ 無法獲取群組 {group['name']} 的資訊: {e}")
             return
         
+        if entity is None:
+            print(f"\n❌ 無法獲取群組 {group['name']} 的資訊")
+            return
+        
         # 獲取訊息
         messages = await self.message_fetcher.get_recent_messages(
             entity,
@@ -247,6 +200,7 @@ class CommandLineInterface:
             start_date=args.start_date,
             end_date=args.end_date
         )
+        profiling.checkpoint(f"fetch {group['name']}")
         
         if not messages:
             # 根據不同條件顯示不同的提示訊息
@@ -260,7 +214,10 @@ class CommandLineInterface:
         
         # 分析訊息 - 將 args.top 參數傳遞給 analyze_messages 函數
         print(f"正在分析 {len(messages)} 則訊息...")
-        analysis_results = self.message_analyzer.analyze_messages(messages, top_limit=args.top)
+        with metrics.stage('analyze', group=group['id']):
+            analysis_results = self.message_analyzer.analyze_messages(messages, top_limit=args.top, rank_by=args.rank_by)
+        profiling.checkpoint(f"analyze {group['name']}")
+        self.message_analyzer.record_metrics(analysis_results, group['id'])
         
         # 顯示分析結果
         self.clear_screen()
@@ -269,61 +226,33 @@ class CommandLineInterface:
         
         # 保存分析結果（如果需要）
         if hasattr(args, 'save') and args.save and self.results_storage:
-            saved_path = self.message_analyzer.save_analysis_results(
-                analysis_results, 
-                group['name'],
-                self.results_storage
-            )
+            with metrics.stage('save', group=group['id']):
+                saved_path = self.message_analyzer.save_analysis_results(
+                    analysis_results, 
+                    group['name'],
+                    self.results_storage,
+                    group_id=group['id']
+                )
             if saved_path:
                 print(f"\n✅ 分析結果已保存到: {saved_path}")
         
         # 取得要轉發的熱門訊息清單
-        top_messages = []
-        if 'most_reactions' in analysis_results and len(analysis_results['most_reactions']) > 0:
-            # 取得最多反應的訊息，使用 args.top 參數限制數量
-            top_df = analysis_results['most_reactions'].head(args.top)
-            
-            # 尋找原始訊息對象
-            for _, row in top_df.iterrows():
-                msg_id = row['id']
-                for orig_msg in messages:
-                    if orig_msg['id'] == msg_id:
-                        # 將完整的原始訊息添加到列表中
-                        top_messages.append({
-                            'id': msg_id,
-                            'text': orig_msg['text'],
-                            'message': msg_id  # 只保存訊息ID，稍後使用ID在目標群組中找到對應訊息
-                        })
-                        break
+        top_messages = self.pipeline.build_top_messages(analysis_results, messages, args.top)
         
         # 將熱門訊息轉發到專屬的儲存群組
         print("\n正在將熱門訊息轉發到專屬儲存群組...")
         
         # 決定要傳遞的時間範圍參數
-        days_for_forwarding = None
-        if args.start_date is not None and args.end_date is not None:
-            # 如果指定了起始日期，計算日期範圍
-            days_for_forwarding = (args.end_date - args.start_date).days + 1
-        elif args.days is not None:
-            days_for_forwarding = args.days
-        else:
-            # 如果沒有指定天數，則使用分析結果中的時間範圍
-            if 'period' in analysis_results:
-                from datetime import datetime
-                period = analysis_results['period']
-                start_date = period['start']
-                end_date = period['end']
-                days_for_forwarding = (end_date - start_date).days + 1
-            else:
-                days_for_forwarding = 30  # 預設值
+        days_for_forwarding = self.pipeline.get_forwarding_days(args, analysis_results)
         
-        success = await self.message_forwarder.forward_top_messages_to_storage_group(
-            entity,                # 目標群組
-            top_messages,          # 熱門訊息列表
-            days_for_forwarding,   # 時間範圍
-            all_messages=messages, # 傳入已獲取的訊息集合
-            analysis_results=analysis_results  # 傳入分析結果
-        )
+        with metrics.stage('forward', group=group['id']):
+            success = await self.message_forwarder.forward_top_messages_to_storage_group(
+                entity,                # 目標群組
+                top_messages,          # 熱門訊息列表
+                days_for_forwarding,   # 時間範圍
+                all_messages=messages, # 傳入已獲取的訊息集合
+                analysis_results=analysis_results  # 傳入分析結果
+            )
         
         if success:
             storage_name = f"TG分析-{entity.title}" if hasattr(entity, 'title') else "儲存群組"
@@ -331,6 +260,32 @@ class CommandLineInterface:
         else:
             print("\n❌ 轉發失敗。請檢查是否有足夠權限創建或使用儲存群組。")
 
+    async def run_pending_groups(self, args):
+        """分析執行期間由其他排程加入待處理檔案的群組
+
+        重疊的排程通常來自同一個排程設定，因此沿用本次的參數；
+        多次加入的同一群組只分析一次，處理期間再加入的群組會在下一輪處理
+        
+        Args:
+            args: 解析後的命令行參數
+        """
+        if self.run_coordinator is None:
+            return
+        
+        while True:
+            jobs = self.run_coordinator.take_pending()
+            groups = list({group['id']: group for job in jobs for group in job['groups']}.values())
+            if not groups:
+                return
+            
+            logger.info(f"處理執行期間加入的 {len(groups)} 個群組")
+            await self.pipeline.prepare_groups(groups)
+            for i, group in enumerate(groups):
+                self.clear_screen()
+                self.print_header()
+                print(f"\n[合併 {i+1}/{len(groups)}] 正在處理群組: {group['name']}")
+                await self.analyze_group(group, args)
+
     async def run(self, args):
         """運行主程式流程
         
@@ -348,16 +303,26 @@ class CommandLineInterface:
                 self.selected_groups = self.history_groups
                 print("\n使用歷史記錄中的群組...")
             else:
-                # 獲取所有群組和頻道
-                print("正在獲取群組列表...")
-                dialogs = await self.client_manager.get_all_dialogs()
+                # 優先顯示快取的群組列表，並在背景增量更新
+                refresh_task = None
+                dialogs = self.client_manager.get_cached_dialogs()
+                if dialogs:
+                    refresh_task = asyncio.create_task(self.refresh_dialogs_in_background(dialogs))
+                else:
+                    # 沒有快取時獲取所有群組和頻道
+                    print("正在獲取群組列表...")
+                    dialogs = await self.client_manager.get_all_dialogs()
                 
                 if not dialogs:
                     print("\n❌ 沒有找到任何群組或頻道，請確認您的帳號已加入至少一個群組或頻道。")
                     return
                 
-                # 使用鍵盤介面讓用戶選擇多個群組
-                self.selected_groups = self.select_groups_by_keyboard(dialogs)
+                # 使用鍵盤介面讓用戶選擇多個群組（在獨立執行緒中讀取按鍵，讓背景更新可以繼續進行）
+                loop = asyncio.get_running_loop()
+                self.selected_groups = await loop.run_in_executor(None, self.select_groups_by_keyboard, dialogs)
+                
+                if refresh_task:
+                    await refresh_task
                 
                 if not self.selected_groups:
                     print("\n已取消操作。")
@@ -366,6 +331,9 @@ class CommandLineInterface:
                 # 保存選擇的群組到歷史記錄
                 self.save_group_history(self.selected_groups)
             
+            # 批次解析群組實體
+            await self.pipeline.prepare_groups(self.selected_groups)
+            
             # 逐個分析選擇的群組
             for i, group in enumerate(self.selected_groups):
                 self.clear_screen()
@@ -373,6 +341,9 @@ class CommandLineInterface:
                 print(f"\n[{i+1}/{len(self.selected_groups)}] 正在處理群組: {group['name']}")
                 await self.analyze_group(group, args)
             
+            # 分析執行期間其他排程加入的群組
+            await self.run_pending_groups(args)
+            
             # 所有群組分析完成後，顯示完成訊息並直接退出程式
             print("\n✅ 所有群組分析完成！")
             sys.exit(0)  # 直接退出程式，返回狀態碼0表示正常結束
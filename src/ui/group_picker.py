@@ -0,0 +1,431 @@
+"""
+群組選擇器模組
+只繪製可見範圍內的群組並以 ANSI 游標移動更新有變動的行，支援輸入文字即時模糊搜尋
+"""
+import os
+import sys
+import codecs
+import select
+import shutil
+import unicodedata
+from typing import List, Dict, Any, Optional
+
+# ANSI 控制序列
+_ALT_SCREEN_ON = "\033[?1049h"
+_ALT_SCREEN_OFF = "\033[?1049l"
+_CURSOR_HIDE = "\033[?25l"
+_CURSOR_SHOW = "\033[?25h"
+_CLEAR_SCREEN = "\033[2J\033[H"
+_CLEAR_LINE_END = "\033[K"
+
+# 方向鍵、翻頁鍵等控制序列對應的按鍵名稱
+_ESCAPE_KEYS = {
+    '\x1b[A': 'up', '\x1bOA': 'up',
+    '\x1b[B': 'down', '\x1bOB': 'down',
+    '\x1b[5~': 'page_up', '\x1b[6~': 'page_down',
+    '\x1b[H': 'home', '\x1bOH': 'home', '\x1b[1~': 'home',
+    '\x1b[F': 'end', '\x1bOF': 'end', '\x1b[4~': 'end',
+}
+
+_CONTROL_KEYS = {
+    '\r': 'enter', '\n': 'enter',
+    ' ': 'space',
+    '\x7f': 'backspace', '\x08': 'backspace',
+    '\x01': 'select_all',  # Ctrl+A
+    '\x03': 'quit',        # Ctrl+C
+}
+
+# 沒有按鍵時檢查背景更新的間隔（秒）
+_IDLE_REFRESH_SECONDS = 0.5
+
+
+def parse_keys(text: str) -> List[str]:
+    """將一次讀到的輸入拆解為按鍵
+
+    Args:
+        text: 終端輸入（可能包含多個按鍵或貼上的文字）
+
+    Returns:
+        List[str]: 按鍵名稱（如 up、enter），一般字元則為字元本身
+    """
+    keys = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\x1b':
+            for sequence, name in _ESCAPE_KEYS.items():
+                if text.startswith(sequence, i):
+                    keys.append(name)
+                    i += len(sequence)
+                    break
+            else:
+                if text.startswith('\x1b[', i) or text.startswith('\x1bO', i):
+                    # 不支援的控制序列：略過到結尾字元
+                    i += 2
+                    while i < len(text) and not ('@' <= text[i] <= '~'):
+                        i += 1
+                    i += 1
+                else:
+                    keys.append('escape')
+                    i += 1
+            continue
+
+        if char in _CONTROL_KEYS:
+            keys.append(_CONTROL_KEYS[char])
+        elif char.isprintable():
+            keys.append(char)
+        i += 1
+    return keys
+
+
+def display_width(text: str) -> int:
+    """計算文字在終端中佔用的欄數（全形字與 emoji 佔兩欄）"""
+    return sum(_char_width(char) for char in text)
+
+
+def _char_width(char: str) -> int:
+    """計算單一字元佔用的欄數"""
+    if unicodedata.combining(char) or char == '\ufe0f':
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def truncate_to_width(text: str, width: int) -> str:
+    """將文字截短到指定欄數以內，超出時以 ... 結尾
+
+    Args:
+        text: 文字
+        width: 最大欄數
+
+    Returns:
+        str: 截短後的文字
+    """
+    if display_width(text) <= width:
+        return text
+    result = []
+    used = 0
+    for char in text:
+        char_width = _char_width(char)
+        if used + char_width > width - 3:
+            break
+        result.append(char)
+        used += char_width
+    return ''.join(result) + '...'
+
+
+def fuzzy_score(query: str, text: str) -> Optional[int]:
+    """計算模糊比對分數
+
+    連續出現的子字串分數最高（越靠前越高），其次是依序出現的字元（間隔越少越高）
+
+    Args:
+        query: 搜尋字串（小寫）
+        text: 比對對象（小寫）
+
+    Returns:
+        Optional[int]: 分數，不符合時返回 None
+    """
+    position = text.find(query)
+    if position >= 0:
+        return 10000 - position
+
+    score = 0
+    last = -1
+    for char in query:
+        index = text.find(char, last + 1)
+        if index < 0:
+            return None
+        score -= index - last - 1
+        last = index
+    return score
+
+
+class FuzzyIndex:
+    """群組名稱的遞增式模糊搜尋索引
+
+    每次輸入多一個字元時只從上一次的結果中篩選，刪除字元時直接取回先前的結果
+    """
+
+    def __init__(self, names: List[str]):
+        """初始化搜尋索引
+
+        Args:
+            names: 群組名稱列表
+        """
+        self._names = [name.lower() for name in names]
+        # 依序保存每個前綴搜尋字串的結果，例如 [("", 全部), ("a", ...), ("ab", ...)]
+        self._stack = [('', list(range(len(self._names))))]
+
+    def extend(self, names: List[str]):
+        """加入新的群組名稱（背景更新時）
+
+        Args:
+            names: 新群組的名稱
+        """
+        start = len(self._names)
+        self._names.extend(name.lower() for name in names)
+        new_indices = range(start, len(self._names))
+        # 新項目加入每一層的結果，維持各層的篩選關係
+        for level, (query, results) in enumerate(self._stack):
+            results.extend(index for index in new_indices if fuzzy_score(query, self._names[index]) is not None)
+            self._stack[level] = (query, self._rank(query, results) if query else results)
+
+    def _rank(self, query: str, candidates: List[int]) -> List[int]:
+        """依分數排序符合的項目"""
+        scored = []
+        for index in candidates:
+            score = fuzzy_score(query, self._names[index])
+            if score is not None:
+                scored.append((-score, index))
+        scored.sort()
+        return [index for _, index in scored]
+
+    def search(self, query: str) -> List[int]:
+        """搜尋群組名稱
+
+        Args:
+            query: 搜尋字串
+
+        Returns:
+            List[int]: 符合的群組索引，依分數由高到低排序
+        """
+        query = query.lower()
+        # 找到與新搜尋字串共同的最長前綴結果，從該層開始篩選
+        while not query.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        if self._stack[-1][0] != query:
+            self._stack.append((query, self._rank(query, self._stack[-1][1])))
+        return self._stack[-1][1]
+
+
+class GroupPicker:
+    """群組選擇器
+
+    按鍵：方向鍵移動、PgUp/PgDn 翻頁、Home/End 跳至頭尾、輸入文字搜尋、Backspace 刪除搜尋字元、
+    空白鍵選擇/取消、Ctrl+A 選擇/取消全部符合搜尋的群組、Enter 確認、Esc 清除搜尋或離開
+    """
+
+    def __init__(self, groups: List[Dict[str, Any]], header_lines: Optional[List[str]] = None, output=None):
+        """初始化群組選擇器
+
+        Args:
+            groups: 群組列表（背景更新時可能在尾端增加項目）
+            header_lines: 顯示在最上方的標頭
+            output: 輸出串流，預設為標準輸出
+        """
+        self.groups = groups
+        self.header_lines = header_lines or []
+        self.output = output or sys.stdout
+
+        self.index = FuzzyIndex([group['name'] for group in groups])
+        self._indexed_count = len(groups)
+        self.query = ''
+        self.matches = self.index.search('')
+        self.cursor = 0
+        self.offset = 0
+        self.selected_ids = set()
+
+        self._screen: List[str] = []
+        self._screen_size = None
+
+    # ---- 狀態更新 ----
+
+    def sync_groups(self) -> bool:
+        """將背景更新新增的群組加入索引
+
+        Returns:
+            bool: 是否有新群組
+        """
+        if len(self.groups) == self._indexed_count:
+            return False
+        new_groups = self.groups[self._indexed_count:]
+        self._indexed_count = len(self.groups)
+        self.index.extend([group['name'] for group in new_groups])
+        self.matches = self.index.search(self.query)
+        return True
+
+    def _set_query(self, query: str):
+        """更新搜尋字串並將游標移回第一筆"""
+        self.query = query
+        self.matches = self.index.search(query)
+        self.cursor = 0
+        self.offset = 0
+
+    def handle_key(self, key: str, page_size: int) -> Optional[List[Dict[str, Any]]]:
+        """處理一個按鍵
+
+        Args:
+            key: parse_keys 產生的按鍵
+            page_size: 一頁的行數
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 結束選擇時返回選擇的群組（離開時為空列表），否則返回 None
+        """
+        last = len(self.matches) - 1
+        if key == 'quit' or (key == 'escape' and not self.query):
+            return []
+        if key == 'escape':
+            self._set_query('')
+        elif key == 'backspace':
+            if self.query:
+                self._set_query(self.query[:-1])
+        elif key == 'up':
+            self.cursor = max(0, self.cursor - 1)
+        elif key == 'down':
+            self.cursor = max(0, min(last, self.cursor + 1))
+        elif key == 'page_up':
+            self.cursor = max(0, self.cursor - page_size)
+        elif key == 'page_down':
+            self.cursor = max(0, min(last, self.cursor + page_size))
+        elif key == 'home':
+            self.cursor = 0
+        elif key == 'end':
+            self.cursor = max(0, last)
+        elif key == 'space':
+            if self.matches:
+                group_id = self.groups[self.matches[self.cursor]]['id']
+                self.selected_ids.symmetric_difference_update({group_id})
+        elif key == 'select_all':
+            filtered_ids = {self.groups[index]['id'] for index in self.matches}
+            if filtered_ids <= self.selected_ids:
+                self.selected_ids -= filtered_ids
+            else:
+                self.selected_ids |= filtered_ids
+        elif key == 'enter':
+            if self.selected_ids:
+                return [group for group in self.groups if group['id'] in self.selected_ids]
+            if self.matches:
+                # 沒有選擇任何群組時，選擇游標所在的群組
+                return [self.groups[self.matches[self.cursor]]]
+        elif len(key) == 1:
+            self._set_query(self.query + key)
+        return None
+
+    # ---- 繪製 ----
+
+    def _fixed_lines(self) -> List[str]:
+        """標頭與說明文字"""
+        return self.header_lines + [
+            "",
+            "👉 輸入文字搜尋，方向鍵/PgUp/PgDn 移動，空白鍵選擇，Ctrl+A 選擇全部符合項目",
+            "   Enter: 確認選擇並開始分析   Esc: 清除搜尋/退出",
+            "",
+        ]
+
+    def page_size(self, height: int) -> int:
+        """計算可顯示的群組行數"""
+        # 固定行數 + 搜尋列 + 空行 + 狀態列
+        return max(3, height - len(self._fixed_lines()) - 3)
+
+    def _format_row(self, index: int, is_current: bool, width: int) -> str:
+        """格式化一行群組"""
+        group = self.groups[index]
+        group_type_icon = "📢" if group.get('type') == '頻道' else "👥"
+        members_count = group.get('members_count') or 0
+        members_info = f" - {members_count}人" if members_count > 0 else ""
+        prefix = "▶ " if is_current else "  "
+        checkbox = "[✓]" if group['id'] in self.selected_ids else "[ ]"
+        return truncate_to_width(f"{prefix}{checkbox} {index + 1}. {group_type_icon} {group['name']}{members_info}", width)
+
+    def render(self, width: int, height: int) -> List[str]:
+        """產生目前畫面的每一行
+
+        只處理可見範圍內的群組，繪製成本與群組總數無關
+
+        Args:
+            width: 終端寬度
+            height: 終端高度
+
+        Returns:
+            List[str]: 畫面內容
+        """
+        page_size = self.page_size(height)
+        # 讓游標維持在可見範圍內
+        if self.cursor < self.offset:
+            self.offset = self.cursor
+        elif self.cursor >= self.offset + page_size:
+            self.offset = self.cursor - page_size + 1
+
+        lines = [truncate_to_width(line, width) for line in self._fixed_lines()]
+        lines.append(truncate_to_width(f"🔎 搜尋: {self.query}", width))
+        visible = self.matches[self.offset:self.offset + page_size]
+        for row, index in enumerate(visible):
+            lines.append(self._format_row(index, self.offset + row == self.cursor, width))
+        lines.extend([""] * (page_size - len(visible)))
+
+        status = f"符合 {len(self.matches)}/{len(self.groups)} 個群組"
+        if self.selected_ids:
+            status += f"，已選擇 {len(self.selected_ids)} 個"
+        lines.append("")
+        lines.append(truncate_to_width(status, width))
+        return lines
+
+    def draw(self, lines: List[str], size) -> str:
+        """產生只更新變動行的輸出
+
+        Args:
+            lines: 新畫面內容
+            size: 終端大小，大小改變時重繪整個畫面
+
+        Returns:
+            str: 要寫入終端的控制序列與文字
+        """
+        output = []
+        if size != self._screen_size:
+            output.append(_CLEAR_SCREEN)
+            self._screen = []
+            self._screen_size = size
+
+        for row, line in enumerate(lines):
+            if row >= len(self._screen) or self._screen[row] != line:
+                output.append(f"\033[{row + 1};1H{line}{_CLEAR_LINE_END}")
+        for row in range(len(lines), len(self._screen)):
+            output.append(f"\033[{row + 1};1H{_CLEAR_LINE_END}")
+        self._screen = lines
+        return ''.join(output)
+
+    def _refresh(self):
+        """依目前狀態更新畫面"""
+        size = shutil.get_terminal_size()
+        self.output.write(self.draw(self.render(size.columns, size.lines), tuple(size)))
+        self.output.flush()
+
+    # ---- 主迴圈 ----
+
+    def run(self) -> List[Dict[str, Any]]:
+        """顯示選擇器並等待使用者選擇
+
+        Returns:
+            List[Dict[str, Any]]: 選擇的群組，取消時為空列表
+        """
+        import termios
+        import tty
+
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+
+        try:
+            tty.setraw(fd)
+            self.output.write(_ALT_SCREEN_ON + _CURSOR_HIDE)
+            self._refresh()
+
+            while True:
+                # 等待按鍵，期間定期檢查背景更新是否加入了新群組
+                readable, _, _ = select.select([fd], [], [], _IDLE_REFRESH_SECONDS)
+                if not readable:
+                    if self.sync_groups():
+                        self._refresh()
+                    continue
+
+                self.sync_groups()
+                page_size = self.page_size(shutil.get_terminal_size().lines)
+                for key in parse_keys(decoder.decode(os.read(fd, 1024))):
+                    result = self.handle_key(key, page_size)
+                    if result is not None:
+                        return result
+                self._refresh()
+        finally:
+            self.output.write(_CURSOR_SHOW + _ALT_SCREEN_OFF)
+            self.output.flush()
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
@@ -2,12 +2,164 @@
 Telegram Reviewer 日誌模組
 此模組處理所有日誌相關功能
 """
+import copy
+import json
+import time
+import queue
+import atexit
 import logging
+import logging.handlers
 import sys
+from datetime import datetime
 from pathlib import Path
 
 # 更新導入路徑
 from config.settings import LOG_FORMAT, LOG_LEVEL, LOG_FILE
+from config.constants import LOG_FORMAT_JSON, LOG_PROGRESS_EVERY, LOG_PROGRESS_INTERVAL_SECONDS
+
+# LogRecord 本身的屬性，其餘屬性視為透過 extra 傳入的結構化欄位
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+_exception_formatter = logging.Formatter()
+
+# 背景寫入日誌的監聽器與其佇列處理器，由 configure_logging 啟動
+_listener = None
+_queue_handler = None
+
+
+class DeferredFileHandler(logging.FileHandler):
+    """第一次寫入日誌時才建立目錄並開啟檔案的檔案處理器
+
+    匯入日誌模組時不會建立目錄或開啟檔案，只顯示 --help 或查詢索引等不寫日誌的執行不會產生日誌檔
+    """
+
+    def __init__(self, filename, encoding='utf-8'):
+        super().__init__(filename, encoding=encoding, delay=True)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class JsonFormatter(logging.Formatter):
+    """將日誌記錄輸出為單行 JSON，透過 extra 傳入的欄位會一併輸出"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """放入佇列前只預先格式化訊息本身，例外追蹤另外保存在 exc_text，JSON 格式可將其輸出為獨立欄位"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class ProgressLogger:
+    """彙總大量重複事件的進度日誌
+
+    熱點迴圈中每個項目只呼叫 update()，每處理一定數量或經過一定時間才輸出一行包含累計數量與速率的日誌，
+    避免為每個項目格式化並寫入一行日誌
+    """
+
+    def __init__(self, log, stage: str, event: str, labels: dict = None, every: int = LOG_PROGRESS_EVERY,
+                 interval: float = LOG_PROGRESS_INTERVAL_SECONDS, **fields):
+        """初始化進度日誌
+
+        Args:
+            log: 日誌記錄器
+            stage: 階段名稱，顯示在日誌訊息中（例如 "獲取訊息"）
+            event: 結構化日誌的事件名稱（例如 "fetch_progress"）
+            labels: 累計數量在日誌訊息中顯示的名稱（例如 {'kept': '保留'}）
+            every: 每處理多少個項目輸出一次
+            interval: 最多間隔多少秒輸出一次
+            **fields: 每行日誌都附帶的結構化欄位（例如群組名稱）
+        """
+        self.log = log
+        self.stage = stage
+        self.event = event
+        self.every = every
+        self.interval = interval
+        self.labels = labels or {}
+        self.fields = fields
+        self.count = 0
+        self.counters = {}
+        self.started = time.monotonic()
+        self._last_count = 0
+        self._last_time = self.started
+
+    def update(self, count: int = 1, **counters):
+        """記錄處理了 count 個項目
+
+        Args:
+            count: 本次處理的項目數
+            **counters: 要一併報告的其他累計數量（例如保留的訊息數），以最新值為準
+        """
+        self.count += count
+        if counters:
+            self.counters.update(counters)
+        if self.count - self._last_count >= self.every:
+            self._emit(time.monotonic())
+        elif self.count & 0xFF == 0:
+            # 每 256 個項目才檢查一次時間，處理速度慢時仍會定期輸出
+            now = time.monotonic()
+            if now - self._last_time >= self.interval:
+                self._emit(now)
+
+    def _counter_text(self) -> str:
+        """將累計數量格式化為日誌訊息的一部分"""
+        return ''.join(f"，{self.labels.get(key, key)} {value:,}" for key, value in self.counters.items())
+
+    def _emit(self, now: float):
+        """輸出一行進度日誌"""
+        rate = (self.count - self._last_count) / max(now - self._last_time, 1e-9)
+        extra_text = self._counter_text()
+        self.log.info(
+            f"{self.stage}: 已處理 {self.count:,} 個{extra_text}，{rate:,.0f} 個/秒",
+            extra={'event': self.event, 'count': self.count, 'rate': round(rate, 1), **self.counters, **self.fields}
+        )
+        self._last_count = self.count
+        self._last_time = now
+
+    def finish(self, **counters) -> float:
+        """輸出總結日誌
+
+        Args:
+            **counters: 要一併報告的最終數量
+
+        Returns:
+            float: 整個階段的平均速率（個/秒）
+        """
+        self.counters.update(counters)
+        elapsed = time.monotonic() - self.started
+        rate = self.count / max(elapsed, 1e-9)
+        extra_text = self._counter_text()
+        self.log.info(
+            f"{self.stage}完成: 共處理 {self.count:,} 個{extra_text}，耗時 {elapsed:.1f} 秒，平均 {rate:,.0f} 個/秒",
+            extra={'event': f"{self.event}_done", 'count': self.count, 'rate': round(rate, 1),
+                   'elapsed_seconds': round(elapsed, 3), **self.counters, **self.fields}
+        )
+        return rate
+
 
 def setup_logger(name='telegram_reviewer'):
     """設置和配置日誌記錄器
@@ -18,15 +170,11 @@ def setup_logger(name='telegram_reviewer'):
     Returns:
         logging.Logger: 配置好的日誌記錄器
     """
-    # 確保日誌目錄存在
-    log_dir = LOG_FILE.parent
-    log_dir.mkdir(exist_ok=True)
-    
     # 創建日誌格式器
     log_formatter = logging.Formatter(LOG_FORMAT)
 
-    # 創建檔案處理器
-    file_handler = logging.FileHandler(filename=LOG_FILE, encoding='utf-8')
+    # 創建檔案處理器（第一次寫入時才開啟檔案）
+    file_handler = DeferredFileHandler(LOG_FILE)
     file_handler.setFormatter(log_formatter)
     file_handler.setLevel(LOG_LEVEL)
 
@@ -46,5 +194,55 @@ def setup_logger(name='telegram_reviewer'):
     
     return logger
 
+
+def configure_logging(log_format: str = None, name='telegram_reviewer'):
+    """將日誌寫入移到背景執行緒，並選擇日誌檔的格式
+
+    日誌記錄器改為只有一個 QueueHandler，呼叫端只需將記錄放入佇列；
+    格式化與寫入檔案、終端機由 QueueListener 在背景執行緒完成，不會阻塞事件迴圈。
+    重複呼叫時只更新日誌檔格式
+
+    Args:
+        log_format: 日誌檔格式，'json' 為每行一個 JSON 物件，其他值為文字格式
+        name: 日誌記錄器名稱
+    """
+    global _listener, _queue_handler
+    log = logging.getLogger(name)
+    if _listener is None:
+        handlers = list(log.handlers)
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_handler = _StructuredQueueHandler(log_queue)
+        for handler in handlers:
+            log.removeHandler(handler)
+        log.addHandler(_queue_handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    # 終端機維持文字格式，只有日誌檔改為 JSON
+    for handler in _listener.handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.setFormatter(JsonFormatter() if log_format == LOG_FORMAT_JSON else logging.Formatter(LOG_FORMAT))
+
+
+def shutdown_logging(name='telegram_reviewer'):
+    """停止背景寫入，寫出佇列中剩餘的日誌，之後的日誌恢復為直接寫入
+
+    Args:
+        name: 日誌記錄器名稱
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    log = logging.getLogger(name)
+    log.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.flush()
+        log.addHandler(handler)
+    _listener = None
+    _queue_handler = None
+
+
 # 創建一個默認日誌記錄器
 logger = setup_logger()
\ No newline at end of file
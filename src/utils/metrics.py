@@ -0,0 +1,245 @@
+"""
+Telegram Reviewer 執行指標模組
+記錄各階段耗時與關鍵計數（請求、訊息、快取命中、傳輸位元組等），執行結束時輸出為 Prometheus 文字檔與 JSON 摘要
+"""
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# 更新導入路徑
+from config.settings import RESULTS_DIR, METRICS_PROM_FILE
+from src.utils.logger import logger
+from src.utils import tracing
+from data.atomic_io import atomic_write_text, atomic_write_json
+
+# Prometheus 指標名稱的前綴
+METRIC_PREFIX = 'telegram_reviewer'
+
+# 標籤以排序後的 (名稱, 值) 元組表示，可作為字典鍵
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """將標籤字典轉換為可雜湊的鍵"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    """將標籤格式化為 Prometheus 文字格式，例如 {stage="fetch",group="123"}"""
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class TimerStats:
+    """單一計時器的累計耗時"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        """加入一次耗時"""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為 JSON 可序列化的字典"""
+        return {'count': self.count, 'total_seconds': round(self.total, 6), 'max_seconds': round(self.max, 6)}
+
+
+class MetricsRegistry:
+    """執行指標登錄處
+
+    計數器與計時器都以名稱加標籤區分，例如 inc('messages_fetched', 500, group=123)；
+    可在事件迴圈與背景執行緒中同時使用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.timers: Dict[str, Dict[LabelKey, TimerStats]] = {}
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """增加計數器
+
+        Args:
+            name: 計數器名稱（例如 'messages_fetched'）
+            value: 增加的數量
+            **labels: 標籤（例如 group=123、method='GetHistoryRequest'）
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """記錄一次耗時
+
+        Args:
+            name: 計時器名稱（例如 'stage'、'rpc'）
+            seconds: 耗時（秒）
+            **labels: 標籤
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self.timers.setdefault(name, {})
+            stats = series.get(key)
+            if stats is None:
+                stats = series[key] = TimerStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """計時區塊，可用於同步與非同步程式碼；啟用 --trace 時同時記錄為追蹤區段
+
+        用法:
+            with metrics.timer('stage', stage='fetch', group=group_id):
+                messages = await fetcher.get_recent_messages(...)
+
+        Args:
+            name: 計時器名稱
+            **labels: 標籤
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed, **labels)
+            tracing.record(labels.get('stage') or name, name, elapsed, **labels)
+
+    def stage(self, stage: str, **labels):
+        """計時一個流程階段（connect、dialogs、fetch、senders、analyze、forward 等）"""
+        return self.timer('stage', stage=stage, **labels)
+
+    def reset(self):
+        """清除所有指標，開始新的一次執行"""
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+            self.started_at = datetime.now()
+            self._started = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """取得目前指標的摘要
+
+        Returns:
+            Dict[str, Any]: started_at、duration_seconds、counters 與 timers，
+                每個指標為 [{'labels': {...}, ...數值}] 的列表
+        """
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'duration_seconds': round(time.monotonic() - self._started, 3),
+                'counters': {
+                    name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                    for name, series in sorted(self.counters.items())
+                },
+                'timers': {
+                    name: [{'labels': dict(key), **stats.to_dict()} for key, stats in sorted(series.items())]
+                    for name, series in sorted(self.timers.items())
+                },
+            }
+
+    def to_prometheus(self, run_labels: Optional[Dict[str, str]] = None) -> str:
+        """將指標轉換為 Prometheus 文字格式（可供 node_exporter 的 textfile collector 讀取）
+
+        計數器輸出為 <前綴>_<名稱>_total，計時器輸出為 <前綴>_<名稱>_seconds 的 summary（_sum、_count）
+        與 <前綴>_<名稱>_seconds_max
+
+        Args:
+            run_labels: 附加到每個指標的標籤（例如執行模式）
+
+        Returns:
+            str: Prometheus 文字格式內容
+        """
+        lines = []
+        with self._lock:
+            name = f"{METRIC_PREFIX}_run_duration_seconds"
+            lines += [f"# HELP {name} 本次執行的總耗時", f"# TYPE {name} gauge",
+                      f"{name}{_format_labels((), run_labels)} {time.monotonic() - self._started:.3f}"]
+            name = f"{METRIC_PREFIX}_run_timestamp_seconds"
+            lines += [f"# HELP {name} 本次執行的開始時間", f"# TYPE {name} gauge",
+                      f"{name}{_format_labels((), run_labels)} {self.started_at.timestamp():.0f}"]
+
+            for counter, series in sorted(self.counters.items()):
+                name = f"{METRIC_PREFIX}_{counter}_total"
+                lines += [f"# TYPE {name} counter"]
+                lines += [f"{name}{_format_labels(key, run_labels)} {value:g}" for key, value in sorted(series.items())]
+
+            for timer, series in sorted(self.timers.items()):
+                name = f"{METRIC_PREFIX}_{timer}_seconds"
+                lines += [f"# TYPE {name} summary"]
+                for key, stats in sorted(series.items()):
+                    labels = _format_labels(key, run_labels)
+                    lines += [f"{name}_sum{labels} {stats.total:.6f}", f"{name}_count{labels} {stats.count}"]
+                lines += [f"# TYPE {name}_max gauge"]
+                lines += [f"{name}_max{_format_labels(key, run_labels)} {stats.max:.6f}"
+                          for key, stats in sorted(series.items())]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, mode: str = 'run', results_dir: Path = RESULTS_DIR,
+               prom_file: Path = METRICS_PROM_FILE) -> Optional[Path]:
+        """將指標寫入 results/：JSON 摘要保存每次執行的記錄，Prometheus 文字檔只保留最近一次
+
+        Args:
+            mode: 執行模式（run、batch、daemon、worker 等），寫入標籤與檔名
+            results_dir: JSON 摘要的目錄
+            prom_file: Prometheus 文字檔路徑
+
+        Returns:
+            Optional[Path]: JSON 摘要的路徑，沒有任何指標時返回 None
+        """
+        if not self.counters and not self.timers:
+            return None
+        results_dir = Path(results_dir)
+        results_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.snapshot()
+        summary['mode'] = mode
+        json_path = results_dir / f"metrics_{self.started_at.strftime('%Y%m%d_%H%M%S')}_{mode}.json"
+        atomic_write_json(json_path, summary)
+        atomic_write_text(Path(prom_file), self.to_prometheus({'mode': mode}))
+        return json_path
+
+
+# 整個程序共用的指標登錄處
+metrics = MetricsRegistry()
+
+
+def export_metrics(mode: str = 'run', reset: bool = False) -> Optional[Path]:
+    """輸出目前的指標並視需要清除，寫入失敗只記錄日誌而不影響分析結果
+
+    Args:
+        mode: 執行模式
+        reset: 輸出後是否清除指標（常駐服務與工作者在每個工作後使用）
+
+    Returns:
+        Optional[Path]: JSON 摘要的路徑
+    """
+    try:
+        path = metrics.export(mode)
+        if path is not None:
+            logger.info(f"執行指標已寫入 {path}")
+        return path
+    except OSError as e:
+        logger.warning(f"寫入執行指標失敗: {e}")
+        return None
+    finally:
+        if reset:
+            metrics.reset()
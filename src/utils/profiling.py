@@ -0,0 +1,289 @@
+"""
+Telegram Reviewer 效能分析模組
+以 --profile 啟用：cProfile 記錄函數耗時、tracemalloc 在各階段結束時記錄記憶體配置、
+asyncio 除錯模式與監看執行緒找出阻塞事件迴圈的回呼，執行結束時寫入 results/profiles/
+"""
+import io
+import sys
+import time
+import pstats
+import asyncio
+import logging
+import threading
+import traceback
+import cProfile
+import linecache
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+
+# 更新導入路徑
+from config.settings import PROFILES_DIR
+from config.constants import (
+    PROFILE_CPU, PROFILE_MEMORY, PROFILE_LOOP, PROFILE_SLOW_CALLBACK_SECONDS,
+    PROFILE_TOP_COUNT, PROFILE_TRACEMALLOC_FRAMES
+)
+from src.utils.logger import logger
+
+# 執行中的效能分析器，未啟用時為 None
+_active = None
+
+# asyncio 套件所在目錄，擷取堆疊時略過
+_ASYNCIO_DIR = str(Path(asyncio.__file__).parent)
+
+# 分析器本身造成的記憶體配置，不列入報告
+_IGNORED_ALLOCATION_FILES = {tracemalloc.__file__, linecache.__file__, traceback.__file__, __file__}
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """收集 asyncio 除錯模式回報的慢回呼（"Executing <Handle ...> took 1.002 seconds"）"""
+
+    def __init__(self, profiler: 'RunProfiler'):
+        super().__init__(logging.WARNING)
+        self.profiler = profiler
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith('Executing '):
+            self.profiler.record_slow_callback(message)
+
+
+class RunProfiler:
+    """單次執行的效能分析器"""
+
+    def __init__(self, modes: List[str], output_dir: Path = PROFILES_DIR,
+                 slow_callback_seconds: float = PROFILE_SLOW_CALLBACK_SECONDS, top_count: int = PROFILE_TOP_COUNT):
+        """初始化效能分析器
+
+        Args:
+            modes: 要啟用的分析：cpu（cProfile）、memory（tracemalloc）、loop（慢回呼偵測）
+            output_dir: 報告輸出目錄
+            slow_callback_seconds: 回呼佔用事件迴圈超過此秒數即回報
+            top_count: 報告中列出的函數與配置位置數量
+        """
+        self.modes = set(modes)
+        self.output_dir = Path(output_dir)
+        self.slow_callback_seconds = slow_callback_seconds
+        self.top_count = top_count
+        self.started_at = datetime.now()
+
+        self._profile: Optional[cProfile.Profile] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_handler: Optional[_SlowCallbackHandler] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog_stop = threading.Event()
+        self._last_beat = time.monotonic()
+        # 分析器自己的工作（記憶體快照）會暫時阻塞事件迴圈，期間不回報
+        self._suspended = False
+        self.memory_checkpoints: List[Dict[str, Any]] = []
+        self.slow_callbacks: List[str] = []
+        self.blocking_stacks: List[str] = []
+
+    def start(self):
+        """開始記錄 CPU 與記憶體"""
+        if PROFILE_MEMORY in self.modes:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        if PROFILE_CPU in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        logger.info(f"效能分析已啟用: {', '.join(sorted(self.modes))}")
+
+    def install_loop(self, loop: asyncio.AbstractEventLoop):
+        """在事件迴圈上啟用慢回呼偵測
+
+        asyncio 除錯模式會記錄每個回呼的執行時間，超過 slow_callback_duration 時以警告回報所在的任務；
+        但任務只顯示最外層協程的位置，因此另以監看執行緒在事件迴圈停止回應時擷取主執行緒的堆疊，
+        指出實際阻塞的程式行（例如協程中的 time.sleep）
+
+        Args:
+            loop: 執行中的事件迴圈
+        """
+        if PROFILE_LOOP not in self.modes:
+            return
+        self._loop = loop
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_callback_seconds
+        self._loop_handler = _SlowCallbackHandler(self)
+        logging.getLogger('asyncio').addHandler(self._loop_handler)
+
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        threading.Thread(
+            target=self._watchdog, args=(threading.get_ident(),), name='profile-watchdog', daemon=True
+        ).start()
+
+    async def _heartbeat(self):
+        """事件迴圈正常運作時定期更新心跳時間"""
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.slow_callback_seconds / 4)
+
+    def _watchdog(self, loop_thread_id: int):
+        """心跳停止超過門檻時擷取事件迴圈執行緒的堆疊，每次停頓只記錄一次
+
+        Args:
+            loop_thread_id: 執行事件迴圈的執行緒 ID
+        """
+        reported_beat = None
+        while not self._watchdog_stop.wait(self.slow_callback_seconds / 4):
+            beat = self._last_beat
+            if self._suspended or beat == reported_beat or time.monotonic() - beat < self.slow_callback_seconds:
+                continue
+            frame = sys._current_frames().get(loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            # 略過 asyncio 本身的框架，只保留應用程式的呼叫位置
+            frames = [entry for entry in traceback.extract_stack(frame) if not entry.filename.startswith(_ASYNCIO_DIR)]
+            stack = ''.join(traceback.format_list(frames[-8:]))
+            self.blocking_stacks.append(stack)
+            logger.warning(f"事件迴圈已停止回應超過 {self.slow_callback_seconds * 1000:.0f} ms，目前執行位置:\n{stack}")
+
+    def record_slow_callback(self, message: str):
+        """記錄一個阻塞事件迴圈的回呼"""
+        self.slow_callbacks.append(message)
+        logger.warning(f"事件迴圈被阻塞: {message}")
+
+    def checkpoint(self, stage: str):
+        """在階段結束時記錄記憶體用量與主要配置位置
+
+        Args:
+            stage: 階段名稱（例如 fetch、analyze）
+        """
+        if not tracemalloc.is_tracing():
+            return
+        self._suspended = True
+        if self._profile is not None:
+            self._profile.disable()
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            # 先依程式行彙總再略過分析器自己的配置，比逐筆過濾配置記錄快得多
+            top = [
+                stat for stat in tracemalloc.take_snapshot().statistics('lineno')
+                if stat.traceback[0].filename not in _IGNORED_ALLOCATION_FILES
+            ][:self.top_count]
+        finally:
+            if self._profile is not None:
+                self._profile.enable()
+            self._last_beat = time.monotonic()
+            self._suspended = False
+        self.memory_checkpoints.append({
+            'stage': stage,
+            'time': datetime.now(),
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [(str(stat.traceback[0]), stat.size, stat.count) for stat in top],
+        })
+        logger.info(f"[profile] {stage} 結束: 目前配置 {current / 1048576:.1f} MiB，峰值 {peak / 1048576:.1f} MiB")
+
+    def stop(self) -> Optional[Path]:
+        """停止記錄並寫出報告
+
+        Returns:
+            Optional[Path]: 文字報告的路徑
+        """
+        if self._profile is not None:
+            self._profile.disable()
+        if self._loop is not None:
+            self._watchdog_stop.set()
+            if self._heartbeat_task is not None:
+                self._heartbeat_task.cancel()
+            # 寫出報告本身需要一些時間，不要把它回報為慢回呼
+            self._loop.slow_callback_duration = float('inf')
+            self._loop.set_debug(False)
+        if self._loop_handler is not None:
+            logging.getLogger('asyncio').removeHandler(self._loop_handler)
+        if tracemalloc.is_tracing():
+            self.checkpoint('end')
+            tracemalloc.stop()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = self.output_dir / f"profile_{self.started_at.strftime('%Y%m%d_%H%M%S')}"
+        report_path = prefix.with_suffix('.txt')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_report(prefix.with_suffix('.pstats')))
+        logger.info(f"效能分析報告已寫入 {report_path}")
+        return report_path
+
+    def render_report(self, pstats_path: Path) -> str:
+        """產生文字報告，cProfile 的原始資料另存為 pstats 檔
+
+        Args:
+            pstats_path: pstats 檔路徑
+
+        Returns:
+            str: 報告內容
+        """
+        elapsed = (datetime.now() - self.started_at).total_seconds()
+        sections = [f"效能分析報告 {self.started_at.isoformat(timespec='seconds')}，耗時 {elapsed:.1f} 秒\n"]
+
+        if PROFILE_LOOP in self.modes:
+            sections.append(f"== 阻塞事件迴圈超過 {self.slow_callback_seconds * 1000:.0f} ms 的回呼 "
+                            f"({len(self.slow_callbacks)} 次) ==")
+            sections.extend(self.slow_callbacks or ['（無）'])
+            sections.append('')
+            sections.append(f"== 事件迴圈停止回應時的執行位置 ({len(self.blocking_stacks)} 次) ==")
+            sections.extend(self.blocking_stacks or ['（無）'])
+            sections.append('')
+
+        for checkpoint in self.memory_checkpoints:
+            sections.append(f"== 記憶體: {checkpoint['stage']} 結束時 "
+                            f"（目前 {checkpoint['current_bytes'] / 1048576:.1f} MiB，"
+                            f"峰值 {checkpoint['peak_bytes'] / 1048576:.1f} MiB）==")
+            for location, size, count in checkpoint['top']:
+                sections.append(f"{size / 1024:10.1f} KiB {count:8d} 個  {location}")
+            sections.append('')
+
+        if self._profile is not None:
+            self._profile.dump_stats(str(pstats_path))
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(self.top_count)
+            stats.sort_stats('tottime').print_stats(self.top_count)
+            sections.append(f"== CPU（完整資料: {pstats_path.name}，可用 python -m pstats 開啟）==")
+            sections.append(stream.getvalue())
+
+        return '\n'.join(sections)
+
+
+def start_profiling(modes: List[str], slow_callback_seconds: float = PROFILE_SLOW_CALLBACK_SECONDS) -> RunProfiler:
+    """啟用效能分析，並在目前的事件迴圈上啟用慢回呼偵測
+
+    Args:
+        modes: 要啟用的分析
+        slow_callback_seconds: 慢回呼的門檻（秒）
+
+    Returns:
+        RunProfiler: 效能分析器
+    """
+    global _active
+    _active = RunProfiler(modes, slow_callback_seconds=slow_callback_seconds)
+    _active.start()
+    try:
+        _active.install_loop(asyncio.get_running_loop())
+    except RuntimeError:
+        pass
+    return _active
+
+
+def stop_profiling() -> Optional[Path]:
+    """停止效能分析並寫出報告（未啟用時不做任何事）
+
+    Returns:
+        Optional[Path]: 報告路徑
+    """
+    global _active
+    if _active is None:
+        return None
+    profiler, _active = _active, None
+    return profiler.stop()
+
+
+def checkpoint(stage: str):
+    """在階段結束時記錄記憶體配置，未啟用效能分析時不做任何事
+
+    Args:
+        stage: 階段名稱
+    """
+    if _active is not None:
+        _active.checkpoint(stage)
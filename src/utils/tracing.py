@@ -0,0 +1,233 @@
+"""
+Telegram Reviewer 追蹤模組
+以 --trace 啟用：記錄各群組的階段、每個 RPC 與轉發發送的時間區段，
+輸出為 Chrome trace-event JSON，可在 chrome://tracing 或 Perfetto (ui.perfetto.dev) 開啟，
+以時間軸呈現各任務的重疊、閒置與互相等待
+"""
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 更新導入路徑
+from config.settings import TRACES_DIR
+from config.constants import TRACE_MAX_EVENTS
+from src.utils.logger import logger
+from data.atomic_io import atomic_write_json
+
+# 執行中的追蹤器，未啟用時為 None
+_active = None
+
+# 目前正在分析的群組，RPC 等區段會自動帶上此標籤（子任務會繼承）
+current_group: ContextVar[Optional[str]] = ContextVar('trace_group', default=None)
+
+# 未啟用追蹤時 span() 返回的空區塊
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """收集 trace-event 格式的時間區段
+
+    每個 asyncio 任務顯示為時間軸上的一列（以 tid 區分並以任務名稱命名），
+    同一任務中巢狀的區段（群組 > 階段 > RPC）會疊在一起
+    """
+
+    def __init__(self, max_events: int = TRACE_MAX_EVENTS):
+        """初始化追蹤器
+
+        Args:
+            max_events: 最多保留的事件數，超過後不再記錄（避免常駐模式無限增長）
+        """
+        self.max_events = max_events
+        self.started_at = datetime.now()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._lanes: Dict[str, int] = {}
+        self._dropped = 0
+
+    def _lane(self) -> int:
+        """取得目前任務（或執行緒）在時間軸上的列號，第一次出現時加入列名稱
+
+        以名稱而非物件 ID 區分，已結束任務的 ID 可能被新任務重複使用
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        name = task.get_name() if task is not None else threading.current_thread().name
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = self._lanes[name] = len(self._lanes) + 1
+            self._events.append({'ph': 'M', 'name': 'thread_name', 'pid': self._pid, 'tid': lane,
+                                 'args': {'name': name}})
+        return lane
+
+    @staticmethod
+    def _with_group(args: Dict[str, Any]) -> Dict[str, Any]:
+        """加上目前的群組標籤（呼叫端已指定時不覆寫）"""
+        group = current_group.get()
+        if group is not None and 'group' not in args:
+            args['group'] = group
+        return args
+
+    def complete(self, name: str, category: str, started: float, duration: float, args: Dict[str, Any]):
+        """記錄一個已結束的區段
+
+        Args:
+            name: 區段名稱（例如 fetch、GetHistoryRequest）
+            category: 類別（例如 stage、rpc、group）
+            started: 開始時間 (time.perf_counter)
+            duration: 持續秒數
+            args: 附加資訊（例如群組 ID）
+        """
+        args = self._with_group(args)
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self._dropped += 1
+                return
+            self._events.append({
+                'ph': 'X', 'name': name, 'cat': category, 'pid': self._pid, 'tid': self._lane(),
+                'ts': round((started - self._origin) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                'args': args,
+            })
+
+    def instant(self, name: str, category: str, args: Dict[str, Any]):
+        """記錄一個瞬間事件（例如 FloodWait）"""
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self._dropped += 1
+                return
+            self._events.append({
+                'ph': 'i', 's': 't', 'name': name, 'cat': category, 'pid': self._pid, 'tid': self._lane(),
+                'ts': round((time.perf_counter() - self._origin) * 1e6, 1), 'args': self._with_group(args),
+            })
+
+    def write(self, path: Path) -> Path:
+        """寫出 trace-event JSON 檔案
+
+        Args:
+            path: 輸出路徑
+
+        Returns:
+            Path: 輸出路徑
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self._events)
+        atomic_write_json(path, {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'started_at': self.started_at.isoformat(timespec='seconds'), 'dropped_events': self._dropped},
+        }, indent=None, default=str)
+        if self._dropped:
+            logger.warning(f"追蹤事件超過上限 {self.max_events}，已略過 {self._dropped} 個事件")
+        return path
+
+
+def start_tracing(max_events: int = TRACE_MAX_EVENTS) -> Tracer:
+    """啟用追蹤
+
+    Args:
+        max_events: 最多保留的事件數
+
+    Returns:
+        Tracer: 追蹤器
+    """
+    global _active
+    _active = Tracer(max_events)
+    logger.info("已啟用追蹤，結束時寫出 trace-event 檔案")
+    return _active
+
+
+def stop_tracing(path: Optional[Path] = None) -> Optional[Path]:
+    """停止追蹤並寫出檔案（未啟用時不做任何事）
+
+    Args:
+        path: 輸出路徑，預設為 results/traces/trace_<時間>.json
+
+    Returns:
+        Optional[Path]: 輸出路徑
+    """
+    global _active
+    if _active is None:
+        return None
+    tracer, _active = _active, None
+    path = path or TRACES_DIR / f"trace_{tracer.started_at.strftime('%Y%m%d_%H%M%S')}.json"
+    try:
+        tracer.write(path)
+    except OSError as e:
+        logger.warning(f"寫出追蹤檔案失敗: {e}")
+        return None
+    logger.info(f"追蹤檔案已寫入 {path}（可在 chrome://tracing 或 ui.perfetto.dev 開啟）")
+    return path
+
+
+def is_enabled() -> bool:
+    """是否已啟用追蹤"""
+    return _active is not None
+
+
+@contextmanager
+def _span(tracer: Tracer, name: str, category: str, args: Dict[str, Any]):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.complete(name, category, started, time.perf_counter() - started, args)
+
+
+def span(name: str, category: str = 'span', **args):
+    """記錄一個時間區段，可用於同步與非同步程式碼；未啟用追蹤時幾乎沒有額外成本
+
+    Args:
+        name: 區段名稱
+        category: 類別
+        **args: 附加資訊
+    """
+    tracer = _active
+    if tracer is None:
+        return _NULL_SPAN
+    return _span(tracer, name, category, args)
+
+
+def record(name: str, category: str, duration: float, **args):
+    """記錄一個剛結束、持續 duration 秒的區段（供已自行計時的程式碼使用）
+
+    Args:
+        name: 區段名稱
+        category: 類別
+        duration: 持續秒數
+        **args: 附加資訊
+    """
+    tracer = _active
+    if tracer is not None:
+        tracer.complete(name, category, time.perf_counter() - duration, duration, args)
+
+
+def instant(name: str, category: str = 'event', **args):
+    """記錄一個瞬間事件，未啟用追蹤時不做任何事"""
+    tracer = _active
+    if tracer is not None:
+        tracer.instant(name, category, args)
+
+
+@contextmanager
+def group_context(group_id):
+    """在區塊內將群組標籤套用到所有區段（包括其中建立的子任務）
+
+    Args:
+        group_id: 群組 ID
+    """
+    token = current_group.set(str(group_id))
+    try:
+        yield
+    finally:
+        current_group.reset(token)
@@ -4,22 +4,22 @@ Telegram群組熱門訊息分析工具主程式
 """
 import os
 import sys
+import signal
 import asyncio
 import argparse
 from datetime import datetime, timedelta
+from pathlib import Path
 
 # 導入新目錄結構下的模組
 from config.constants import (
-    DEFAULT_DAYS, DEFAULT_MESSAGE_LIMIT, DEFAULT_TOP_COUNT, DEFAULT_USE_HISTORY
+    DEFAULT_DAYS, DEFAULT_MESSAGE_LIMIT, DEFAULT_TOP_COUNT, DEFAULT_USE_HISTORY,
+    FORWARD_MODES, DEFAULT_FORWARD_MODE, RESULTS_FORMATS, DEFAULT_RESULTS_FORMAT,
+    OVERLAP_MODES, OVERLAP_QUEUE, DEFAULT_OVERLAP_MODE, RANK_METRICS, DEFAULT_RANK_METRIC,
+    LOG_FORMATS, DEFAULT_LOG_FILE_FORMAT, PROFILE_MODES, PROFILE_SLOW_CALLBACK_SECONDS
 )
-from config.settings import SESSION_NAME, RESULTS_DIR
-from src.utils.logger import setup_logger
-from src.api.telegram_client import TelegramClientManager
-from src.services.message_fetcher import MessageFetcher
-from src.services.message_analyzer import MessageAnalyzer
-from src.services.message_forwarder import MessageForwarder
-from src.ui.cli import CommandLineInterface
-from data.storage import ResultsStorage
+from config.settings import SESSION_NAME, RESULTS_DIR, SCHEDULE_FILE, JOB_QUEUE_FILE, ensure_directories
+from src.utils.logger import setup_logger, configure_logging, shutdown_logging
+# Telethon、pandas 與各服務在實際用到的函數中才匯入，--help、--submit、--enqueue 與子命令不必載入它們
 
 # 獲取日誌器
 logger = setup_logger("telegram_reviewer")
@@ -42,9 +42,30 @@ def valid_date(date_string):
         msg = f"'{date_string}' 不是有效的日期格式，請使用 YYYYMMDD 格式"
         raise argparse.ArgumentTypeError(msg)
 
-def parse_arguments():
+def profile_modes(value):
+    """解析 --profile 的分析項目列表
+    
+    Args:
+        value: 以逗號分隔的分析項目，例如 "cpu,loop"
+        
+    Returns:
+        list: 分析項目列表
+        
+    Raises:
+        ArgumentTypeError: 包含未知的分析項目時
+    """
+    modes = [mode.strip() for mode in value.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in PROFILE_MODES]
+    if unknown or not modes:
+        raise argparse.ArgumentTypeError(f"未知的分析項目: {', '.join(unknown) or value}，可用: {','.join(PROFILE_MODES)}")
+    return modes
+
+def parse_arguments(argv=None):
     """解析命令行參數
     
+    Args:
+        argv: 要解析的參數列表，None 表示使用 sys.argv
+    
     Returns:
         argparse.Namespace: 解析後的參數
     """
@@ -57,14 +78,55 @@ def parse_arguments():
                         help=f'分析的訊息數量上限 (預設: {DEFAULT_MESSAGE_LIMIT})')
     parser.add_argument('--top', type=int, default=DEFAULT_TOP_COUNT, 
                         help=f'顯示和轉發的熱門訊息數量 (預設: {DEFAULT_TOP_COUNT})')
+    parser.add_argument('--rank-by', dest='rank_by', choices=RANK_METRICS, default=DEFAULT_RANK_METRIC,
+                        help=f'熱門訊息的排序指標: total_reactions 反應數, reply_count 回覆數, views 瀏覽數, forwards 轉發數 (預設: {DEFAULT_RANK_METRIC})')
     parser.add_argument('--use-history', dest='use_history', action='store', 
                         choices=['yes', 'no', 'ask'],
                         default='ask' if DEFAULT_USE_HISTORY is None else 'yes' if DEFAULT_USE_HISTORY else 'no',
                         help='是否使用上次選擇的群組 (預設: ask - 詢問用戶)')
     parser.add_argument('--save', action='store_true',
                         help='將分析結果儲存為JSON檔案')
+    parser.add_argument('--save-format', dest='save_format', choices=RESULTS_FORMATS,
+                        default=DEFAULT_RESULTS_FORMAT,
+                        help=f'分析結果的保存格式: json 單一檔案, ndjson 每個表格一個壓縮檔, parquet 每個表格一個 Parquet 檔 (預設: {DEFAULT_RESULTS_FORMAT})')
+    parser.add_argument('--forward-mode', dest='forward_mode', choices=FORWARD_MODES,
+                        default=DEFAULT_FORWARD_MODE,
+                        help=f'熱門訊息轉發模式: digest 打包為最少訊息, append 逐則附加, edit 就地編輯置頂摘要 (預設: {DEFAULT_FORWARD_MODE})')
+    parser.add_argument('--daemon', action='store_true',
+                        help='以常駐模式執行，維持連線並透過本機 socket 接收分析工作')
+    parser.add_argument('--submit', action='store_true',
+                        help='將分析工作提交給執行中的常駐服務，若常駐服務未執行則直接分析')
+    parser.add_argument('--schedule', nargs='?', const=str(SCHEDULE_FILE), default=None, metavar='CONFIG',
+                        help=f'以常駐模式執行內建排程器，依設定檔錯開執行各群組，設定檔修改後自動重新載入 (預設設定檔: {SCHEDULE_FILE.name})')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='將歷史記錄中的群組加入工作佇列後結束，由 --worker 程序執行（其餘參數作為工作的分析參數）')
+    parser.add_argument('--worker', action='store_true',
+                        help='以工作者模式執行，持續從工作佇列領取群組分析工作')
+    parser.add_argument('--queue', type=str, default=str(JOB_QUEUE_FILE), metavar='DB',
+                        help=f'工作佇列資料庫路徑，多台主機可指向共用目錄 (預設: {JOB_QUEUE_FILE.name})')
+    parser.add_argument('--live', action='store_true',
+                        help='搭配 --daemon 使用，即時收錄歷史記錄中群組的訊息，報告直接從本機資料庫產生')
+    parser.add_argument('--sessions', type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+                        default=[],
+                        help='額外使用的 Telegram 會話名稱，以逗號分隔 (例如: account2,account3)，獲取訊息時分散到各帳號')
+    parser.add_argument('--if-running', dest='if_running', choices=OVERLAP_MODES, default=DEFAULT_OVERLAP_MODE,
+                        help=f'同一會話已有執行中的分析時: queue 將歷史記錄中的群組交給執行中的工作一併處理, skip 直接結束 (預設: {DEFAULT_OVERLAP_MODE})')
+    parser.add_argument('--profile', type=profile_modes, nargs='?', const=list(PROFILE_MODES), default=None,
+                        metavar='MODES',
+                        help=f'啟用效能分析並將報告寫入 results/profiles/: cpu 函數耗時 (cProfile), memory 各階段的記憶體配置 (tracemalloc), loop 找出阻塞事件迴圈的回呼；可用逗號組合 (預設: {",".join(PROFILE_MODES)})')
+    parser.add_argument('--slow-callback-ms', dest='slow_callback_ms', type=float,
+                        default=PROFILE_SLOW_CALLBACK_SECONDS * 1000,
+                        help=f'搭配 --profile loop，回呼佔用事件迴圈超過此毫秒數即回報 (預設: {PROFILE_SLOW_CALLBACK_SECONDS * 1000:.0f})')
+    parser.add_argument('--trace', nargs='?', const='', default=None, metavar='FILE',
+                        help='記錄各群組的階段、每個 RPC 與轉發發送的時間軸，結束時寫出 Chrome trace-event 檔案，可在 chrome://tracing 或 ui.perfetto.dev 開啟 (預設: results/traces/trace_<時間>.json)')
+    parser.add_argument('--log-format', dest='log_format', choices=LOG_FORMATS, default=DEFAULT_LOG_FILE_FORMAT,
+                        help=f'日誌檔格式: text 文字, json 每行一個 JSON 物件，方便匯入日誌系統；終端機輸出維持文字 (預設: {DEFAULT_LOG_FILE_FORMAT})')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    
+    # 內建排程器在常駐服務中執行，共用同一個連線
+    if args.schedule:
+        args.daemon = True
     
     # 處理起始日期與天數的關係
     if args.start_date is not None and args.days is not None:
@@ -91,30 +153,232 @@ def parse_arguments():
         
     return args
 
+async def submit_to_daemon(args):
+    """將本次執行的參數提交給常駐服務
+    
+    Args:
+        args: 解析後的命令行參數
+        
+    Returns:
+        Optional[int]: 結束代碼，若常駐服務未執行則返回 None
+    """
+    from src.daemon.client import submit_job
+    
+    # 常駐服務依相同的參數執行，只移除提交模式本身的旗標
+    argv = [arg for arg in sys.argv[1:] if arg != '--submit']
+    response = await submit_job(argv)
+    if response is None:
+        return None
+    
+    if 'results' not in response:
+        print(f"❌ 常駐服務回報錯誤: {response.get('error')}")
+        return 1
+    
+    for result in response['results']:
+        if result['status'] == 'ok':
+            print(f"✅ {result['name']}: {result.get('total_messages', 0)} 則訊息")
+        elif result['status'] == 'no_messages':
+            print(f"⚠️ {result['name']}: 沒有找到訊息")
+        else:
+            print(f"❌ {result['name']}: {result.get('error')}")
+    return 0 if response.get('ok') else 1
+
+def enqueue_jobs(args):
+    """將歷史記錄中的群組加入工作佇列
+    
+    Args:
+        args: 解析後的命令行參數
+        
+    Returns:
+        int: 結束代碼
+    """
+    from data.storage import GroupHistoryManager
+    from data.job_queue import JobQueue
+    
+    groups = GroupHistoryManager.load_group_history()
+    if not groups:
+        print("❌ 沒有歷史記錄中的群組，請先以互動模式選擇群組")
+        return 1
+    
+    # 工作使用相同的分析參數，只移除佇列相關的參數
+    argv = []
+    skip_next = False
+    for arg in sys.argv[1:]:
+        if skip_next:
+            skip_next = False
+        elif arg == '--queue':
+            skip_next = True
+        elif arg != '--enqueue' and not arg.startswith('--queue='):
+            argv.append(arg)
+    
+    job_queue = JobQueue(args.queue)
+    try:
+        added = [job_id for job_id in (job_queue.enqueue(group, argv) for group in groups) if job_id is not None]
+        counts = job_queue.counts()
+    finally:
+        job_queue.close()
+    print(f"✅ 已加入 {len(added)} 個工作（{len(groups) - len(added)} 個群組已在佇列中等待）")
+    print(f"   佇列狀態: 等待 {counts['queued']}，執行中 {counts['leased']}，完成 {counts['done']}，失敗 {counts['failed']}")
+    return 0
+
+def handle_overlap(args, run_coordinator):
+    """同一會話已有執行中的分析時，依 --if-running 合併或略過本次執行
+    
+    Args:
+        args: 解析後的命令行參數
+        run_coordinator: 執行協調器實例
+        
+    Returns:
+        int: 結束代碼
+    """
+    holder = run_coordinator.describe_holder()
+    if args.daemon or args.worker:
+        print(f"❌ 無法以{'常駐' if args.daemon else '工作者'}模式啟動，此會話正在使用中: {holder}")
+        return 1
+    
+    # 只有使用歷史記錄的非互動執行才知道要分析哪些群組，可以交給執行中的工作
+    if args.if_running == OVERLAP_QUEUE and args.use_history == 'yes':
+        # 批次執行只處理自己設定檔中的群組，不會讀取待處理檔案
+        if (run_coordinator.holder_info() or {}).get('mode') == 'batch':
+            logger.info(f"已有執行中的批次分析 ({holder})，批次執行不會接手其他排程的群組，略過本次執行")
+            print("ℹ️ 已有執行中的批次分析，無法一併處理本次的群組，略過本次執行")
+            return 0
+        from data.storage import GroupHistoryManager
+        groups = GroupHistoryManager.load_group_history()
+        argv = [arg for arg in sys.argv[1:] if arg != '--submit']
+        added = run_coordinator.enqueue(argv, groups)
+        logger.info(f"已有執行中的分析 ({holder})，已將 {added} 個新群組交給該工作處理")
+        print(f"ℹ️ 已有執行中的分析，本次的 {len(groups)} 個群組將由該工作一併處理")
+        return 0
+    
+    logger.info(f"已有執行中的分析 ({holder})，略過本次執行")
+    print("ℹ️ 已有執行中的分析，略過本次執行")
+    return 0
+
+def create_services(args):
+    """依命令行參數建立各執行模式共用的服務
+    
+    Args:
+        args: 解析後的命令行參數
+        
+    Returns:
+        tuple: (客戶端管理器, 訊息獲取器, 訊息分析器, 訊息轉發器, 結果儲存管理器或 None)
+    """
+    from src.api.telegram_client import TelegramClientManager
+    from src.api.client_pool import TelegramClientPool
+    from src.services.message_fetcher import MessageFetcher
+    from src.services.message_analyzer import MessageAnalyzer
+    from src.services.message_forwarder import MessageForwarder
+    from data.storage import ResultsStorage, ForwardLedger, DigestSlotStore
+    from data.timeseries import MetricSeries
+    
+    client_manager = TelegramClientManager(session_name=SESSION_NAME)
+    if args.sessions:
+        # 多帳號模式：獲取訊息時分散到各帳號，遇到 FloodWait 時自動換帳號
+        client_manager = TelegramClientPool.from_session_names(client_manager, args.sessions)
+    message_fetcher = MessageFetcher(client_manager)
+    message_analyzer = MessageAnalyzer(metric_series=MetricSeries())
+    message_forwarder = MessageForwarder(
+        client_manager,
+        ledger=ForwardLedger(),
+        forward_mode=args.forward_mode,
+        slot_store=DigestSlotStore()
+    )
+    
+    # 如果需要儲存分析結果，初始化儲存管理器
+    results_storage = None
+    if args.save:
+        results_storage = ResultsStorage(RESULTS_DIR, output_format=args.save_format)
+    return client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage
+
 async def main():
     """主程式入口點"""
     try:
         # 解析命令行參數
         args = parse_arguments()
+        ensure_directories()
+        # 日誌在背景執行緒寫入，不阻塞事件迴圈
+        configure_logging(args.log_format)
+        
+        if args.profile:
+            from src.utils.profiling import start_profiling
+            start_profiling(args.profile, slow_callback_seconds=args.slow_callback_ms / 1000)
+        
+        if args.trace is not None:
+            from src.utils.tracing import start_tracing
+            start_tracing()
+        
+        # 加入佇列模式：不需要連線到 Telegram
+        if args.enqueue:
+            return enqueue_jobs(args)
+        
+        # 提交模式：交給常駐服務執行，省去連線與登入
+        if args.submit:
+            exit_code = await submit_to_daemon(args)
+            if exit_code is not None:
+                return exit_code
+            logger.warning("常駐服務未執行，改為直接執行分析")
+        
+        # 同一會話同時只允許一個程序執行，避免搶用 Telethon 會話檔案
+        from src.services.run_coordinator import RunCoordinator
+        run_coordinator = RunCoordinator(SESSION_NAME)
+        if not run_coordinator.acquire(mode='daemon' if args.daemon else 'worker' if args.worker else 'run'):
+            return handle_overlap(args, run_coordinator)
+        run_coordinator.start_heartbeat()
         
         # 初始化模組
-        client_manager = TelegramClientManager(session_name=SESSION_NAME)
-        message_fetcher = MessageFetcher(client_manager)
-        message_analyzer = MessageAnalyzer()
-        message_forwarder = MessageForwarder(client_manager)
+        client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage = create_services(args)
+        from src.services.analysis_pipeline import AnalysisPipeline
         
-        # 如果需要儲存分析結果，初始化儲存管理器
-        results_storage = None
-        if args.save:
-            results_storage = ResultsStorage(RESULTS_DIR)
+        # 常駐模式：維持連線並等待分析工作
+        if args.daemon:
+            from src.services.live_ingestor import LiveIngestor
+            from src.daemon.server import ReviewerDaemon
+            from src.daemon.scheduler import GroupScheduler
+            from data.live_store import LiveMessageStore
+            
+            live_ingestor = None
+            if args.live:
+                live_ingestor = LiveIngestor(client_manager, message_fetcher, LiveMessageStore())
+            pipeline = AnalysisPipeline(
+                client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage,
+                live_ingestor=live_ingestor
+            )
+            scheduler = None
+            if args.schedule:
+                scheduler = GroupScheduler(pipeline, parse_arguments, config_path=args.schedule)
+            daemon = ReviewerDaemon(client_manager, pipeline, parse_arguments, live_ingestor=live_ingestor,
+                                    run_coordinator=run_coordinator, scheduler=scheduler)
+            await daemon.serve_forever()
+            return
+        
+        # 工作者模式：從工作佇列領取工作，直到收到停止信號
+        if args.worker:
+            from src.services.queue_worker import QueueWorker
+            from data.job_queue import JobQueue
+            
+            pipeline = AnalysisPipeline(
+                client_manager, message_fetcher, message_analyzer, message_forwarder, results_storage
+            )
+            worker = QueueWorker(pipeline, JobQueue(args.queue), parse_arguments, run_coordinator=run_coordinator)
+            await client_manager.connect()
+            stop_event = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+            try:
+                await worker.run(stop_event)
+            finally:
+                worker.job_queue.close()
+            return
         
         # 初始化命令行介面
+        from src.ui.cli import CommandLineInterface
         cli = CommandLineInterface(
             client_manager=client_manager,
             message_fetcher=message_fetcher,
             message_analyzer=message_analyzer,
             message_forwarder=message_forwarder,
-            results_storage=results_storage
+            results_storage=results_storage,
+            run_coordinator=run_coordinator
         )
         
         # 運行主流程
@@ -126,9 +390,40 @@ async def main():
         logger.error(f"程式執行出錯: {e}", exc_info=True)
         print(f"\n❌ 發生錯誤: {str(e)}")
     finally:
+        # 輸出本次執行的請求統計與執行指標
+        if 'client_manager' in locals():
+            client_manager.log_request_stats()
+            from src.utils.metrics import export_metrics
+            export_metrics('daemon' if args.daemon else 'worker' if args.worker else 'run')
+        
         # 確保關閉客戶端連接
         if 'client_manager' in locals() and hasattr(client_manager, 'client') and client_manager.client.is_connected():
             await client_manager.close()
+        
+        # 關閉連接後才釋放執行鎖，讓下一次排程可以使用會話
+        if 'run_coordinator' in locals():
+            run_coordinator.release()
+        
+        # 寫出效能分析報告
+        if 'args' in locals() and args.profile:
+            from src.utils.profiling import stop_profiling
+            stop_profiling()
+        
+        # 寫出追蹤檔案
+        if 'args' in locals() and args.trace is not None:
+            from src.utils.tracing import stop_tracing
+            stop_tracing(Path(args.trace) if args.trace else None)
+        
+        # 寫出背景佇列中剩餘的日誌
+        shutdown_logging()
             
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # 子命令：查詢分析結果索引，不需連線到 Telegram
+    if len(sys.argv) > 1 and sys.argv[1] == 'catalog':
+        from src.ui.catalog_cli import run_catalog_command
+        sys.exit(run_catalog_command(sys.argv[2:]))
+    # 子命令：依群組設定檔以非互動方式批次分析
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from src.ui.batch_cli import run_batch_command
+        sys.exit(run_batch_command(sys.argv[2:], parse_arguments, create_services))
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
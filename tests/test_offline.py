@@ -0,0 +1,399 @@
+"""
+離線回歸測試
+以模擬客戶端 (src/api/fake_client.py) 與暫存目錄驗證不需要 Telegram 帳號的部分：
+合成歷史的時間與 ID 對應、iter_messages 的分頁、RequestScheduler 的 FloodWait 重試、
+轉發到儲存群組、工作佇列的租約、失敗處理與待處理群組的接手，以及群組選單的模糊搜尋
+
+用法:
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 更新導入路徑
+from src.api.fake_client import FakeTelegramClient, SyntheticHistory
+from src.api.request_scheduler import RequestScheduler
+from src.api.telegram_client import TelegramClientManager
+from src.services.message_fetcher import MessageFetcher
+from src.services.message_forwarder import MessageForwarder
+from src.services.queue_worker import QueueWorker
+from src.services.run_coordinator import RunCoordinator
+from src.ui.group_picker import FuzzyIndex
+from config.constants import FORWARD_MODE_EDIT, FORWARD_MODE_DIGEST
+from data.job_queue import JobQueue, JOB_QUEUED, JOB_LEASED, JOB_FAILED
+from data.storage import EntityCache, DialogCache, DigestSlotStore, ForwardLedger
+from data.atomic_io import state_writer
+
+# 固定的結束時間，每次產生相同的訊息
+END_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def collect(client, entity, **kwargs):
+    """以 iter_messages 取得全部訊息"""
+    async def run():
+        return [message async for message in client.iter_messages(entity, **kwargs)]
+    return asyncio.run(run())
+
+
+class SyntheticHistoryTest(unittest.TestCase):
+    """合成歷史的時間與 ID 對應"""
+
+    def setUp(self):
+        self.history = SyntheticHistory(messages=1000, days=10, end_date=END_DATE, seed=3)
+
+    def test_dates_increase_with_id(self):
+        dates = [self.history.date_of(message_id) for message_id in range(1, 1001)]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(dates[-1], END_DATE)
+        self.assertEqual(END_DATE - dates[0], timedelta(days=10) / 1000 * 999)
+
+    def test_id_before_is_strictly_earlier(self):
+        for message_id in [1, 2, 500, 999, 1000]:
+            date = self.history.date_of(message_id)
+            self.assertEqual(self.history.id_before(date), message_id - 1)
+            self.assertEqual(self.history.id_before(date + timedelta(seconds=1)), message_id)
+
+    def test_id_before_out_of_range(self):
+        self.assertEqual(self.history.id_before(END_DATE + timedelta(days=1)), 1000)
+        self.assertEqual(self.history.id_before(END_DATE - timedelta(days=30)), 0)
+        # 未指定時區時視為 UTC
+        self.assertEqual(self.history.id_before(END_DATE.replace(tzinfo=None)), 999)
+
+    def test_messages_are_deterministic(self):
+        other = SyntheticHistory(messages=1000, days=10, end_date=END_DATE, seed=3, channel_id=1900000001)
+        for message_id in [1, 17, 1000]:
+            first = self.history.build_message(None, message_id)
+            second = other.build_message(None, message_id)
+            self.assertEqual(first.sender.id, second.sender.id)
+            self.assertEqual(first.views, second.views)
+            self.assertEqual(first.forwards, second.forwards)
+        self.assertIsNone(self.history.build_message(None, 0))
+        self.assertIsNone(self.history.build_message(None, 1001))
+
+
+class IterMessagesTest(unittest.TestCase):
+    """iter_messages 的分頁與篩選"""
+
+    def setUp(self):
+        self.history = SyntheticHistory(messages=250, days=5, end_date=END_DATE)
+        self.client = FakeTelegramClient([self.history], rtt=0, page_size=100)
+
+    def test_pages_newest_first(self):
+        messages = collect(self.client, self.history.entity)
+        self.assertEqual([message.id for message in messages], list(range(250, 0, -1)))
+        # 100 + 100 + 50，最後一頁不足 page_size 時結束
+        self.assertEqual(self.client.request_counts['GetHistoryRequest'], 3)
+
+    def test_limit(self):
+        messages = collect(self.client, self.history.entity, limit=120)
+        self.assertEqual([message.id for message in messages], list(range(250, 130, -1)))
+        self.assertEqual(self.client.request_counts['GetHistoryRequest'], 2)
+
+    def test_offset_date_and_min_id(self):
+        offset_date = self.history.date_of(200)
+        messages = collect(self.client, self.history.entity, offset_date=offset_date, min_id=50)
+        self.assertEqual([message.id for message in messages], list(range(199, 50, -1)))
+        self.assertTrue(all(message.date < offset_date for message in messages))
+
+    def test_unknown_peer_returns_nothing(self):
+        other = SyntheticHistory(messages=10, end_date=END_DATE)
+        self.assertEqual(collect(self.client, other.entity), [])
+
+
+class RequestSchedulerTest(unittest.TestCase):
+    """RequestScheduler 經由模擬客戶端的 FloodWait 處理"""
+
+    def test_flood_wait_is_retried(self):
+        history = SyntheticHistory(messages=500, end_date=END_DATE)
+        client = FakeTelegramClient([history], rtt=0, page_size=100, flood_every=2, flood_seconds=0,
+                                    flood_methods=['GetHistoryRequest'])
+        scheduler = RequestScheduler(min_interval=0.001, max_interval=0.01)
+        scheduler.install(client)
+
+        messages = collect(client, history.entity)
+        self.assertEqual(len(messages), 500)
+        self.assertEqual(len({message.id for message in messages}), 500)
+
+        stats = scheduler.get_stats()['GetHistoryRequest']
+        # 5 頁 + 最後一次空頁共 6 次成功，每第 2 個請求拋出 FloodWait 後重試
+        self.assertEqual(stats['calls'], client.request_counts['GetHistoryRequest'])
+        self.assertEqual(stats['calls'] - stats['flood_waits'], 6)
+        self.assertEqual(stats['flood_waits'], 5)
+        self.assertEqual(stats['retries'], 5)
+
+    def test_long_flood_wait_is_raised(self):
+        from telethon.errors import FloodWaitError
+
+        history = SyntheticHistory(messages=10, end_date=END_DATE)
+        client = FakeTelegramClient([history], rtt=0, flood_every=1, flood_seconds=1000)
+        scheduler = RequestScheduler(max_retry_seconds=300)
+        scheduler.install(client)
+
+        with self.assertRaises(FloodWaitError):
+            collect(client, history.entity)
+        self.assertEqual(scheduler.get_stats()['GetHistoryRequest']['retries'], 0)
+
+
+class SenderCacheTest(unittest.TestCase):
+    """MessageFetcher 的發送者資訊快取"""
+
+    def setUp(self):
+        self.history = SyntheticHistory(messages=100, senders=20, end_date=END_DATE)
+        self.client = FakeTelegramClient([self.history], rtt=0)
+
+    def lookup(self, fetcher, message_id):
+        return asyncio.run(fetcher._get_sender_info(self.history.build_message(self.client, message_id)))
+
+    def test_cache_is_bounded(self):
+        fetcher = MessageFetcher(None, use_colors=False, sender_cache_max_entries=3)
+        senders = set()
+        for message_id in range(1, 101):
+            senders.add(self.lookup(fetcher, message_id)['id'])
+            self.assertLessEqual(len(fetcher._sender_cache), 3)
+        self.assertEqual(fetcher.sender_lookups + fetcher.sender_cache_hits, 100)
+        self.assertGreater(len(senders), 3)
+
+    def test_expired_entries_are_refetched(self):
+        fetcher = MessageFetcher(None, use_colors=False)
+        first = self.lookup(fetcher, 1)
+        self.assertEqual(self.lookup(fetcher, 1), first)
+        self.assertEqual((fetcher.sender_lookups, fetcher.sender_cache_hits), (1, 1))
+
+        fetcher = MessageFetcher(None, use_colors=False, sender_cache_ttl_hours=0)
+        self.lookup(fetcher, 1)
+        self.lookup(fetcher, 1)
+        self.assertEqual((fetcher.sender_lookups, fetcher.sender_cache_hits), (2, 0))
+
+
+class ForwarderTestCase(unittest.TestCase):
+    """以模擬客戶端與暫存目錄中的記錄檔測試轉發"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.history = SyntheticHistory(messages=100, end_date=END_DATE, media_ratio=0)
+        self.client = FakeTelegramClient([self.history], rtt=0)
+        self.client_manager = TelegramClientManager(
+            client=self.client, entity_cache=EntityCache(self.tmp / 'entities.json'),
+            dialog_cache=DialogCache(self.tmp / 'dialogs.json')
+        )
+
+    def tearDown(self):
+        state_writer.flush()
+        self._tmp.cleanup()
+
+    @staticmethod
+    def top_messages(ids):
+        return [{'id': message_id, 'total_reactions': 100 - rank, 'reply_count': rank, 'text': f"訊息 {message_id}",
+                 'date': END_DATE, 'has_media': False} for rank, message_id in enumerate(ids)]
+
+    def forward(self, forwarder, top_messages, storage_target=None):
+        """執行一次轉發，並等待記錄檔寫入（下一次執行以新的實例讀取，模擬新的程序）"""
+        ok = asyncio.run(forwarder.forward_top_messages_to_storage_group(
+            self.history.entity, top_messages, 7, storage_target=storage_target
+        ))
+        state_writer.flush()
+        return ok
+
+
+class EditModeTest(ForwarderTestCase):
+    """就地編輯模式"""
+
+    def edit(self, top_messages):
+        forwarder = MessageForwarder(self.client_manager, forward_mode=FORWARD_MODE_EDIT,
+                                     slot_store=DigestSlotStore(self.tmp / 'slots.json'))
+        self.assertTrue(self.forward(forwarder, top_messages))
+        return DigestSlotStore(self.tmp / 'slots.json').get(self.history.entity.id)
+
+    def test_second_run_edits_instead_of_sending(self):
+        top_messages = self.top_messages([5, 6, 7])
+        state = self.edit(top_messages)
+        # 摘要 + 3 個欄位
+        self.assertEqual(self.client.sent_count, 4)
+        self.assertLess(state['storage_id'], 0)
+
+        # 新的程序經由對話列表找到儲存群組，內容相同時不發送也不編輯
+        self.assertEqual(self.edit(top_messages)['storage_id'], state['storage_id'])
+        self.assertEqual(self.client.sent_count, 4)
+        self.assertEqual(self.client.request_counts['EditMessageRequest'], 0)
+
+        # 排名變動時只編輯欄位
+        self.edit(self.top_messages([7, 5, 6]))
+        self.assertEqual(self.client.sent_count, 4)
+        self.assertGreater(self.client.request_counts['EditMessageRequest'], 0)
+
+    def test_state_with_unmarked_storage_id_is_kept(self):
+        top_messages = self.top_messages([5, 6])
+        state = self.edit(top_messages)
+        # 舊版本記錄的是不帶 -100 標記的頻道 ID
+        store = DigestSlotStore(self.tmp / 'slots.json')
+        store.set(self.history.entity.id, dict(state, storage_id=int(str(state['storage_id'])[4:])))
+        store.save()
+        state_writer.flush()
+
+        self.assertEqual(self.edit(top_messages)['storage_id'], state['storage_id'])
+        self.assertEqual(self.client.sent_count, 3)
+
+
+class ForwardTargetTest(ForwarderTestCase):
+    """轉發到指定的目標（批次設定的 forward_to）"""
+
+    def setUp(self):
+        super().setUp()
+        self.target = SyntheticHistory(title='摘要頻道', messages=0, end_date=END_DATE)
+        self.target.entity.username = 'my_digest_channel'
+        self.client.add_history(self.target)
+
+    def test_username_and_id_targets(self):
+        for storage_target in ['@my_digest_channel', self.target.marked_id]:
+            forwarder = MessageForwarder(self.client_manager, forward_mode=FORWARD_MODE_DIGEST)
+            self.assertTrue(self.forward(forwarder, self.top_messages([5, 6]), storage_target))
+            storage_group = forwarder._storage_groups[f"target:{storage_target}"]
+            self.assertEqual(storage_group['id'], self.target.marked_id)
+        self.assertEqual(set(self.client.outboxes), {self.target.marked_id})
+
+    def digest(self, top_messages, storage_target=None):
+        forwarder = MessageForwarder(self.client_manager, ledger=ForwardLedger(self.tmp / 'ledger.json'),
+                                     forward_mode=FORWARD_MODE_DIGEST)
+        self.assertTrue(self.forward(forwarder, top_messages, storage_target))
+        return ForwardLedger(self.tmp / 'ledger.json')
+
+    def sent_texts(self, chat_id):
+        return '\n'.join(message.text for message in self.client.outboxes.get(chat_id, {}).values())
+
+    def test_ledger_is_per_storage_group(self):
+        source_id = self.history.entity.id
+        ledger = self.digest(self.top_messages([5, 6]))
+        default_id = next(chat_id for chat_id in self.client.outboxes if chat_id != self.target.marked_id)
+        self.assertIsNotNone(ledger.get(source_id, 5, default_id))
+        self.assertIsNone(ledger.get(source_id, 5, self.target.marked_id))
+
+        # 已發布到預設儲存群組的訊息，轉發到其他目標時仍發送完整內容，不連結到私人的預設儲存群組
+        ledger = self.digest(self.top_messages([5, 6]), self.target.marked_id)
+        self.assertNotIn('持續熱門', self.sent_texts(self.target.marked_id))
+        self.assertIsNotNone(ledger.get(source_id, 5, self.target.marked_id))
+        self.assertEqual(ledger.get(source_id, 5, default_id)['times_seen'], 1)
+
+        # 同一個目標再次出現時才連結到先前發布的訊息
+        self.digest(self.top_messages([5, 6]), self.target.marked_id)
+        self.assertIn('持續熱門', self.sent_texts(self.target.marked_id))
+        self.assertEqual(ForwardLedger(self.tmp / 'ledger.json').get(source_id, 5, self.target.marked_id)['times_seen'], 2)
+
+    def test_legacy_entries_match_only_their_storage_group(self):
+        source_id = self.history.entity.id
+        raw_target_id = int(str(self.target.marked_id)[4:])
+        # 舊版本的鍵值不含儲存群組，儲存群組 ID 可能不帶 -100 標記
+        state_writer.submit(self.tmp / 'ledger.json', {f"{source_id}:5": {
+            'source_id': source_id, 'message_id': 5, 'storage_id': raw_target_id, 'storage_message_ids': [9],
+            'times_seen': 1, 'stats': {}
+        }}, merge=True)
+        state_writer.flush()
+
+        ledger = ForwardLedger(self.tmp / 'ledger.json')
+        self.assertIsNone(ledger.get(source_id, 5, -1009999999999))
+        self.assertEqual(ledger.get(source_id, 5, self.target.marked_id)['storage_id'], self.target.marked_id)
+        self.assertEqual(ledger.filter_unforwarded(source_id, [5, 6], self.target.marked_id), [6])
+
+
+class JobQueueTest(unittest.TestCase):
+    """工作佇列的租約、過期與失敗"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(Path(self._tmp.name) / 'jobs.db')
+        self.group = {'id': -1001000000001, 'name': '測試群組'}
+
+    def tearDown(self):
+        self.queue.close()
+        self._tmp.cleanup()
+
+    def test_enqueue_skips_waiting_duplicate(self):
+        self.assertIsNotNone(self.queue.enqueue(self.group, ['--days', '7']))
+        self.assertIsNone(self.queue.enqueue(self.group, ['--days', '1']))
+        self.assertEqual(self.queue.counts()[JOB_QUEUED], 1)
+
+    def test_lease_complete(self):
+        job_id = self.queue.enqueue(self.group, ['--days', '7'])
+        job = self.queue.lease('worker-a')
+        self.assertEqual((job['job_id'], job['attempts'], job['argv']), (job_id, 1, ['--days', '7']))
+        self.assertIsNone(self.queue.lease('worker-b'))
+        self.assertFalse(self.queue.complete(job_id, 'worker-b', {'status': 'ok'}))
+        self.assertTrue(self.queue.complete(job_id, 'worker-a', {'status': 'ok'}))
+        self.assertEqual(self.queue.jobs()[0]['result'], {'status': 'ok'})
+
+    def test_fail_backs_off_then_gives_up(self):
+        job_id = self.queue.enqueue(self.group, [], max_attempts=2)
+        self.queue.lease('worker-a')
+        self.assertEqual(self.queue.fail(job_id, 'worker-a', '錯誤'), JOB_QUEUED)
+        # 退避期間不能領取
+        self.assertIsNone(self.queue.lease('worker-a'))
+
+        self.queue._conn.execute("UPDATE jobs SET available_at = 0")
+        self.queue.lease('worker-a')
+        self.assertEqual(self.queue.fail(job_id, 'worker-a', '錯誤'), JOB_FAILED)
+        self.assertIsNone(self.queue.lease('worker-a'))
+
+    def test_expired_lease_is_reclaimed_until_max_attempts(self):
+        job_id = self.queue.enqueue(self.group, [], max_attempts=2)
+        self.queue.lease('worker-a', lease_seconds=-1)
+        job = self.queue.lease('worker-b', lease_seconds=-1)
+        self.assertEqual((job['lease_owner'], job['attempts'], job['status']), ('worker-b', 2, JOB_LEASED))
+        # 原工作者已失去租約
+        self.assertFalse(self.queue.heartbeat(job_id, 'worker-a'))
+        self.assertIsNone(self.queue.fail(job_id, 'worker-a', '錯誤'))
+
+        # 已達嘗試次數上限的過期租約標記為失敗，不再領取
+        self.assertIsNone(self.queue.lease('worker-c'))
+        self.assertEqual(self.queue.counts()[JOB_FAILED], 1)
+
+    def test_worker_queues_pending_groups(self):
+        # 工作者持有執行鎖時，重疊排程寫入待處理檔案的群組由工作者轉入佇列
+        coordinator = RunCoordinator('test', lock_dir=Path(self._tmp.name))
+        other = {'id': -1001000000002, 'name': '其他群組'}
+        coordinator.enqueue(['--days', '3'], [self.group, other])
+        coordinator.enqueue(['--days', '1'], [self.group])
+        worker = QueueWorker(None, self.queue, None, worker_id='worker-a', run_coordinator=coordinator)
+
+        self.assertEqual(worker.queue_pending_groups(), 2)
+        self.assertEqual(coordinator.take_pending(), [])
+        self.assertEqual(sorted(job['argv'] for job in self.queue.jobs()), [['--days', '3'], ['--days', '3']])
+        self.assertEqual(worker.queue_pending_groups(), 0)
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    """群組選單的遞增式模糊搜尋"""
+
+    def setUp(self):
+        self.names = ['Python 台灣', '台灣新聞', 'pytest 討論', 'Rust 社群', 'PyPI 公告']
+        self.index = FuzzyIndex(self.names)
+
+    def test_substring_ranks_before_subsequence(self):
+        results = [self.names[index] for index in self.index.search('py')]
+        self.assertEqual(results[:3], ['Python 台灣', 'pytest 討論', 'PyPI 公告'])
+
+        # 「yo」不是連續子字串，只在 Python 中依序出現；「pt」在兩者中間隔相同，分數相同時維持原本順序
+        self.assertEqual([self.names[index] for index in self.index.search('yo')], ['Python 台灣'])
+        self.assertEqual([self.names[index] for index in self.index.search('pt')], ['Python 台灣', 'pytest 討論'])
+
+    def test_earlier_substring_ranks_higher(self):
+        self.assertEqual([self.names[index] for index in self.index.search('台灣')], ['台灣新聞', 'Python 台灣'])
+
+    def test_backspace_and_new_query_match_fresh_index(self):
+        for query in ['p', 'py', 'pyt', 'py', 'r', 'ru', '']:
+            self.assertEqual(self.index.search(query), FuzzyIndex(self.names).search(query), query)
+
+    def test_extend_updates_cached_levels(self):
+        self.index.search('p')
+        self.index.search('py')
+        self.index.extend(['pygame 交流'])
+        self.assertIn(5, self.index.search('py'))
+        self.assertIn(5, self.index.search('p'))
+        self.assertEqual(len(self.index.search('')), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()